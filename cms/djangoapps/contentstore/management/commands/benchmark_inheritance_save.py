@@ -0,0 +1,133 @@
+"""
+A command to benchmark the latency of saving blocks in the Mongo modulestore.
+
+It builds a synthetic course (by default 10 chapters x 10 sequentials x 10 verticals x 4 problems,
+i.e. ~5k blocks) and times saving blocks at each level of the course both with a full recomputation
+of the metadata inheritance tree (the old behavior) and with the incremental subtree recomputation.
+The synthetic course is deleted afterwards.
+"""
+import optparse
+import time
+from uuid import uuid4
+
+from django.core.management.base import NoArgsCommand
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import modulestore
+from opaque_keys.edx.locations import SlashSeparatedCourseKey
+
+
+class Command(NoArgsCommand):
+    """Benchmark saving blocks with full vs incremental metadata inheritance recomputation."""
+
+    help = "Benchmarks block save latency w/ full vs incremental metadata inheritance recomputation."
+
+    option_list = NoArgsCommand.option_list + (
+        optparse.make_option(
+            '--fanout',
+            type='int',
+            default=10,
+            help="Number of children of each chapter, sequential, and the course.",
+        ),
+        optparse.make_option(
+            '--problems',
+            type='int',
+            default=4,
+            help="Number of problems in each vertical.",
+        ),
+        optparse.make_option(
+            '--repeat',
+            type='int',
+            default=5,
+            help="Number of saves to time for each level and mode.",
+        ),
+    )
+
+    def handle_noargs(self, **options):
+        store = modulestore()
+        if hasattr(store, '_get_modulestore_by_type'):
+            store = store._get_modulestore_by_type(ModuleStoreEnum.Type.mongo)  # pylint: disable=protected-access
+
+        course_key = SlashSeparatedCourseKey('benchmark', uuid4().hex[:8], 'inheritance')
+        samples = build_synthetic_course(store, course_key, options['fanout'], options['problems'])
+        print "Built {} with {} blocks".format(course_key, store.collection.find(
+            {'_id.org': course_key.org, '_id.course': course_key.course}
+        ).count())
+
+        try:
+            # warm the cached tree
+            store.refresh_cached_metadata_inheritance_tree(course_key)
+            print "{:<12} {:>14} {:>14}".format('level', 'full (ms)', 'incremental (ms)')
+            for category, location in samples:
+                full = time_saves(store, course_key, location, options['repeat'], incremental=False)
+                incremental = time_saves(store, course_key, location, options['repeat'], incremental=True)
+                print "{:<12} {:>14.2f} {:>14.2f}".format(category, full * 1000, incremental * 1000)
+        finally:
+            store.collection.remove({'_id.org': course_key.org, '_id.course': course_key.course})
+
+
+def build_synthetic_course(store, course_key, fanout, problems):
+    """
+    Insert the synthetic course directly into the store's collection. Returns a list of
+    (category, location) pairs with one sample location per level of the course.
+    """
+    documents = []
+
+    def _add(category, name, children=(), metadata=None):
+        """
+        Queue the document for the block and return its location
+        """
+        location = course_key.make_usage_key(category, name)
+        documents.append({
+            '_id': location.to_deprecated_son(),
+            'metadata': metadata or {'display_name': name},
+            'definition': {
+                'data': '<problem></problem>' if category == 'problem' else {},
+                'children': [child.to_deprecated_string() for child in children],
+            },
+        })
+        return location
+
+    def _build_level(categories, prefix):
+        """
+        Build the blocks for the given categories (top down) and return their locations
+        """
+        category = categories[0]
+        count = problems if category == 'problem' else fanout
+        locations = []
+        for index in range(count):
+            name = '{}_{}'.format(prefix, index)
+            children = _build_level(categories[1:], name) if len(categories) > 1 else []
+            locations.append(_add(category, name, children))
+        return locations
+
+    chapters = _build_level(['chapter', 'sequential', 'vertical', 'problem'], 'b')
+    course = _add('course', course_key.run, chapters, {'display_name': 'Benchmark', 'start': '2013-01-01T00:00'})
+    store.collection.insert(documents)
+    return [
+        ('course', course),
+        ('chapter', chapters[0]),
+        ('sequential', course_key.make_usage_key('sequential', 'b_0_0')),
+        ('vertical', course_key.make_usage_key('vertical', 'b_0_0_0')),
+        ('problem', course_key.make_usage_key('problem', 'b_0_0_0_0')),
+    ]
+
+
+def time_saves(store, course_key, location, repeat, incremental):
+    """
+    Return the mean time to change and save the block at location.
+    """
+    total = 0
+    for index in range(repeat):
+        block = store.get_item(location)
+        block.display_name = 'saved {}'.format(index)
+        start = time.time()
+        if incremental:
+            store.update_item(block, None)
+        else:
+            # the old behavior: save then recompute the whole course's tree
+            store.begin_bulk_write_operation_on_course(course_key)
+            store.update_item(block, None)
+            store.end_bulk_write_operation_on_course(course_key)
+        total += time.time() - start
+    return total / repeat
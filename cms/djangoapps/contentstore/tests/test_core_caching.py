@@ -1,4 +1,9 @@
-from cache_toolbox.core import get_cached_content, set_cached_content, del_cached_content
+import datetime
+
+from cache_toolbox.core import (
+    get_cached_content, set_cached_content, del_cached_content, get_cached_content_metadata,
+    set_cached_content_metadata, set_cached_content_not_found, CONTENT_NOT_FOUND
+)
 from opaque_keys.edx.locations import Location
 from xmodule.contentstore.content import StaticContent
 from django.test import TestCase
@@ -34,3 +39,25 @@ class CachingTestCase(TestCase):
                          'should not be stored in cache with unicodeLocation')
         self.assertEqual(None, get_cached_content(self.nonUnicodeLocation),
                          'should not be stored in cache with nonUnicodeLocation')
+
+    def test_metadata(self):
+        content = StaticContent(
+            self.unicodeLocation, 'monsters.jpg', 'image/jpeg', 'my content',
+            last_modified_at=datetime.datetime(2014, 1, 1), length=10, locked=True, content_digest='abc123'
+        )
+        set_cached_content_metadata(content)
+        self.assertEqual(get_cached_content_metadata(self.nonUnicodeLocation), {
+            'content_type': 'image/jpeg',
+            'length': 10,
+            'locked': True,
+            'last_modified_at': datetime.datetime(2014, 1, 1),
+            'content_digest': 'abc123',
+        })
+        del_cached_content(self.unicodeLocation)
+        self.assertIsNone(get_cached_content_metadata(self.unicodeLocation))
+
+    def test_not_found(self):
+        set_cached_content_not_found(self.unicodeLocation)
+        self.assertEqual(get_cached_content_metadata(self.unicodeLocation), CONTENT_NOT_FOUND)
+        del_cached_content(self.unicodeLocation)
+        self.assertIsNone(get_cached_content_metadata(self.unicodeLocation))
@@ -231,6 +231,7 @@ if AWS_SECRET_ACCESS_KEY == "":
 DATABASES = AUTH_TOKENS['DATABASES']
 MODULESTORE = convert_module_store_setting_if_needed(AUTH_TOKENS['MODULESTORE'])
 CONTENTSTORE = AUTH_TOKENS['CONTENTSTORE']
+STATIC_CONTENT_DISK_CACHE = ENV_TOKENS.get('STATIC_CONTENT_DISK_CACHE', STATIC_CONTENT_DISK_CACHE)
 DOC_STORE_CONFIG = AUTH_TOKENS['DOC_STORE_CONFIG']
 # Datadog for events!
 DATADOG = AUTH_TOKENS.get("DATADOG", {})
@@ -249,6 +249,11 @@ XBLOCK_SELECT_FUNCTION = prefer_xmodules
 ############################ Modulestore Configuration ################################
 MODULESTORE_BRANCH = 'draft-preferred'
 
+# A local on-disk cache of static assets too large for memcached, e.g.
+# {'DIRECTORY': '/tmp/static_content_cache', 'MAX_SIZE': 1024 * 1024 * 1024} (bytes).
+# None disables it; large assets then get streamed from the contentstore each time.
+STATIC_CONTENT_DISK_CACHE = None
+
 ############################ DJANGO_BUILTINS ################################
 # Change DEBUG/TEMPLATE_DEBUG in your environment settings files, not here
 DEBUG = False
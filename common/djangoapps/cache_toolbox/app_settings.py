@@ -6,3 +6,10 @@ CACHE_TOOLBOX_DEFAULT_TIMEOUT = getattr(
     'CACHE_TOOLBOX_DEFAULT_TIMEOUT',
     60 * 60 * 24 * 3,
 )
+
+# How long to remember that static content doesn't exist
+CACHE_TOOLBOX_CONTENT_NOT_FOUND_TIMEOUT = getattr(
+    settings,
+    'CACHE_TOOLBOX_CONTENT_NOT_FOUND_TIMEOUT',
+    60,
+)
@@ -109,6 +109,10 @@ def instance_key(model, instance_or_pk):
     )
 
 
+# The cached metadata of content which doesn't exist
+CONTENT_NOT_FOUND = 'not found'
+
+
 def set_cached_content(content):
     cache.set(unicode(content.location).encode("utf-8"), content)
 
@@ -117,10 +121,47 @@ def get_cached_content(location):
     return cache.get(unicode(location).encode("utf-8"))
 
 
+def content_metadata_key(location):
+    return u"content_metadata:{}".format(location).encode("utf-8")
+
+
+def set_cached_content_metadata(content):
+    """
+    Cache the metadata of the content (i.e. everything needed to check access to it and
+    whether the client's copy is current) apart from its data, so that it can be cached
+    even when the data is too large to be.
+    """
+    cache.set(content_metadata_key(content.location), {
+        'content_type': content.content_type,
+        'length': content.length,
+        # getattr b/c caching may mean some pickled instances don't have these attrs
+        'locked': getattr(content, 'locked', False),
+        'last_modified_at': content.last_modified_at,
+        'content_digest': getattr(content, 'content_digest', None),
+    })
+
+
+def set_cached_content_not_found(location):
+    """
+    Remember for a little while that there's no content at the location.
+    """
+    cache.set(content_metadata_key(location), CONTENT_NOT_FOUND, app_settings.CACHE_TOOLBOX_CONTENT_NOT_FOUND_TIMEOUT)
+
+
+def get_cached_content_metadata(location):
+    """
+    Return the dictionary of the cached metadata of the content at the location,
+    CONTENT_NOT_FOUND if there's known to be none, or None if it's not cached.
+    """
+    return cache.get(content_metadata_key(location))
+
+
 def del_cached_content(location):
-    # delete content for the given location, as well as for content with run=None.
-    # it's possible that the content could have been cached without knowing the
-    # course_key - and so without having the run.
+    # delete content and its metadata for the given location, as well as for content
+    # with run=None. it's possible that the content could have been cached without
+    # knowing the course_key - and so without having the run.
+    locations = [location, location.replace(run=None)]
     cache.delete_many(
-        [unicode(loc).encode("utf-8") for loc in [location, location.replace(run=None)]]
+        [unicode(loc).encode("utf-8") for loc in locations] +
+        [content_metadata_key(loc) for loc in locations]
     )
@@ -0,0 +1,140 @@
+"""
+A local on-disk cache of large static assets, which memcached can't hold (nor stream), so
+that serving them doesn't refetch them from GridFS every time.
+
+Assets are cached in files named by their md5 digests; so, a changed asset gets a new file
+rather than needing the old one invalidated. The least recently served files get deleted
+when the cache grows beyond its maximum size.
+"""
+import logging
+import os
+import re
+import tempfile
+
+from django.conf import settings
+
+from xmodule.contentstore.content import StaticContentStream
+
+log = logging.getLogger(__name__)
+
+# only cache assets whose digests are safe to use as file names
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]+$')
+
+
+class AssetDiskCache(object):
+    """
+    A directory of cached asset files holding at most max_size bytes (give or take the
+    assets being added concurrently).
+    """
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, content):
+        """
+        The path of the cached file of the content or None if it can't be cached
+        """
+        digest = getattr(content, 'content_digest', None)
+        if not digest or not DIGEST_PATTERN.match(digest):
+            return None
+        return os.path.join(self.directory, digest)
+
+    def get(self, content):
+        """
+        Return a StaticContentStream of the content's cached file (marking it as recently
+        served), or None if it's not cached.
+        """
+        path = self._path(content)
+        if path is None:
+            return None
+        try:
+            cached_file = open(path, 'rb')
+        except IOError:
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            # evicted since opening it, which doesn't matter to this request
+            pass
+        return StaticContentStream(
+            content.location, content.name, content.content_type, cached_file,
+            last_modified_at=content.last_modified_at, thumbnail_location=content.thumbnail_location,
+            import_path=content.import_path, length=content.length, locked=getattr(content, 'locked', False),
+            content_digest=content.content_digest
+        )
+
+    def add(self, content):
+        """
+        Copy the streamed content to the cache a chunk at a time, and return a StaticContentStream
+        of its cached file. Return None, leaving the content's stream wherever it got to, if the
+        content can't be cached.
+        """
+        path = self._path(content)
+        if path is None:
+            return None
+        # write to a temporary file which gets renamed when complete so no one serves a partial file
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.')
+        try:
+            with os.fdopen(handle, 'wb') as temp_file:
+                for chunk in content.stream_data():
+                    temp_file.write(chunk)
+            if os.path.getsize(temp_path) != content.length:
+                log.warning(u"Not caching %s: read %d of its %d bytes",
+                            content.location, os.path.getsize(temp_path), content.length)
+                os.remove(temp_path)
+                return None
+            os.rename(temp_path, path)
+        except (IOError, OSError):
+            log.exception(u"Failed to cache %s on disk", content.location)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return None
+
+        self.evict()
+        return self.get(content)
+
+    def evict(self):
+        """
+        Delete the least recently served files until the cache holds at most max_size bytes
+        """
+        files = []
+        total_size = 0
+        for name in os.listdir(self.directory):
+            if name.startswith('.'):
+                # being written
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, name))
+            total_size += stat.st_size
+
+        for __, size, name in sorted(files):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                # another process evicted it
+                pass
+            total_size -= size
+
+
+_DISK_CACHE = {}
+
+
+def get_disk_cache():
+    """
+    Return the AssetDiskCache configured by settings.STATIC_CONTENT_DISK_CACHE (a dictionary of
+    its DIRECTORY and MAX_SIZE in bytes), or None if there isn't one.
+    """
+    config = getattr(settings, 'STATIC_CONTENT_DISK_CACHE', None)
+    if not config:
+        return None
+    key = (config['DIRECTORY'], config['MAX_SIZE'])
+    if key not in _DISK_CACHE:
+        _DISK_CACHE[key] = AssetDiskCache(config['DIRECTORY'], config['MAX_SIZE'])
+    return _DISK_CACHE[key]
@@ -1,3 +1,5 @@
+import re
+
 from django.http import (HttpResponse, HttpResponseNotModified,
     HttpResponseForbidden)
 from student.models import CourseEnrollment
@@ -6,12 +8,68 @@ from xmodule.contentstore.django import contentstore
 from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG
 from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
-from cache_toolbox.core import get_cached_content, set_cached_content
+from cache_toolbox.core import (
+    get_cached_content, set_cached_content, get_cached_content_metadata, set_cached_content_metadata,
+    set_cached_content_not_found, CONTENT_NOT_FOUND
+)
 from xmodule.exceptions import NotFoundError
+from contentserver.disk_cache import get_disk_cache
 
 # TODO: Soon as we have a reasonable way to serialize/deserialize AssetKeys, we need
 # to change this file so instead of using course_id_partial, we're just using asset keys
 
+# Assets smaller than this get cached in memcached; larger ones on disk, if there's a disk cache
+MAX_CACHED_CONTENT_LENGTH = 1048576
+
+# A single byte range, e.g. bytes=0-499, bytes=500- or bytes=-500 (the last 500 bytes)
+BYTE_RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_byte_range(range_header, content_length):
+    """
+    Return the (first byte, last byte) of the content the Range header asks for, clamped to the
+    content, or None if the header isn't a single byte range, in which case it should be ignored
+    and the whole content sent. The first byte is at least content_length if the range is
+    unsatisfiable.
+    """
+    match = BYTE_RANGE_PATTERN.match(range_header.replace(' ', ''))
+    if match is None:
+        return None
+    first_byte, last_byte = match.groups()
+    if not first_byte:
+        if not last_byte:
+            return None
+        # the last so many bytes of the content
+        suffix_length = int(last_byte)
+        if suffix_length == 0:
+            return (content_length, content_length - 1)
+        return (max(content_length - suffix_length, 0), content_length - 1)
+
+    first_byte = int(first_byte)
+    if not last_byte:
+        return (first_byte, content_length - 1)
+    last_byte = int(last_byte)
+    if last_byte < first_byte:
+        # syntactically invalid
+        return None
+    return (first_byte, min(last_byte, content_length - 1))
+
+
+def http_last_modified(last_modified_at):
+    """
+    Convert over the DB persistent last modified timestamp to a HTTP compatible
+    timestamp, so we can simply compare the strings
+    """
+    return last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
+
+
+def http_etag(content_digest):
+    """
+    The ETag of content with the given md5 (which identifies its version), if known
+    """
+    return '"{}"'.format(content_digest) if content_digest else None
+
+
 class StaticContentServer(object):
     def process_request(self, request):
         # look to see if the request is prefixed with 'c4x' tag
@@ -24,13 +82,29 @@ class StaticContentServer(object):
                 response.status_code = 400
                 return response
 
-            # first look in our cache so we don't have to round-trip to the DB
+            # first look in our cache of content metadata, which may answer the request
+            # (not found, forbidden or not modified) without fetching the content
+            metadata = get_cached_content_metadata(loc)
+            if metadata == CONTENT_NOT_FOUND:
+                response = HttpResponse()
+                response.status_code = 404
+                return response
+            if metadata is not None:
+                response = self.get_metadata_response(
+                    request, loc, metadata['locked'], metadata['last_modified_at'], metadata['content_digest']
+                )
+                if response is not None:
+                    return response
+
+            # then look in our cache so we don't have to round-trip to the DB
             content = get_cached_content(loc)
             if content is None:
                 # nope, not in cache, let's fetch from DB
                 try:
                     content = contentstore().find(loc, as_stream=True)
                 except NotFoundError:
+                    # remember that it's missing so broken links don't keep hitting the DB
+                    set_cached_content_not_found(loc)
                     response = HttpResponse()
                     response.status_code = 404
                     return response
@@ -38,35 +112,104 @@ class StaticContentServer(object):
                 # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
                 # this is because I haven't been able to find a means to stream data out of memcached
                 if content.length is not None:
-                    if content.length < 1048576:
+                    if content.length < MAX_CACHED_CONTENT_LENGTH:
                         # since we've queried as a stream, let's read in the stream into memory to set in cache
                         content = content.copy_to_in_mem()
                         set_cached_content(content)
+                    else:
+                        # stream larger content from the local disk cache (filling it if need be)
+                        content = self.get_disk_cached_content(content)
             else:
                 # NOP here, but we may wish to add a "cache-hit" counter in the future
                 pass
 
-            # Check that user has access to content
-            if getattr(content, "locked", False):
-                if not hasattr(request, "user") or not request.user.is_authenticated():
-                    return HttpResponseForbidden('Unauthorized')
-                if not request.user.is_staff and not CourseEnrollment.is_enrolled_by_partial(
-                        request.user, loc.course_key
-                ):
-                    return HttpResponseForbidden('Unauthorized')
-
-            # convert over the DB persistent last modified timestamp to a HTTP compatible
-            # timestamp, so we can simply compare the strings
-            last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
-
-            # see if the client has cached this content, if so then compare the
-            # timestamps, if they are the same then just return a 304 (Not Modified)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
-                if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
-                if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
-
-            response = HttpResponse(content.stream_data(), content_type=content.content_type)
+            content_digest = getattr(content, 'content_digest', None)
+            if metadata is None:
+                set_cached_content_metadata(content)
+                response = self.get_metadata_response(
+                    request, loc, getattr(content, "locked", False), content.last_modified_at, content_digest
+                )
+                if response is not None:
+                    return response
+
+            last_modified_at_str = http_last_modified(content.last_modified_at)
+            etag = http_etag(content_digest)
+
+            byte_range = None
+            if content.length is not None and 'HTTP_RANGE' in request.META:
+                byte_range = parse_byte_range(request.META['HTTP_RANGE'], content.length)
+
+            if byte_range is None:
+                response = HttpResponse(content.stream_data(), content_type=content.content_type)
+                if content.length is not None:
+                    response['Content-Length'] = str(content.length)
+            elif byte_range[0] >= content.length:
+                # 416 Requested Range Not Satisfiable
+                response = HttpResponse()
+                response.status_code = 416
+                response['Content-Range'] = 'bytes */{}'.format(content.length)
+                return response
+            else:
+                first_byte, last_byte = byte_range
+                # 206 Partial Content
+                response = HttpResponse(
+                    content.stream_data_in_range(first_byte, last_byte), content_type=content.content_type
+                )
+                response.status_code = 206
+                response['Content-Range'] = 'bytes {}-{}/{}'.format(first_byte, last_byte, content.length)
+                response['Content-Length'] = str(last_byte - first_byte + 1)
+
+            response['Accept-Ranges'] = 'bytes'
             response['Last-Modified'] = last_modified_at_str
+            if etag is not None:
+                response['ETag'] = etag
 
             return response
+
+    def get_metadata_response(self, request, loc, locked, last_modified_at, content_digest):
+        """
+        Return the response to the request which the content's metadata alone determines, i.e.
+        403 (Forbidden) or 304 (Not Modified), or None if the content needs to be sent.
+        """
+        # Check that user has access to content
+        if locked:
+            if not hasattr(request, "user") or not request.user.is_authenticated():
+                return HttpResponseForbidden('Unauthorized')
+            if not request.user.is_staff and not CourseEnrollment.is_enrolled_by_partial(
+                    request.user, loc.course_key
+            ):
+                return HttpResponseForbidden('Unauthorized')
+
+        last_modified_at_str = http_last_modified(last_modified_at)
+        etag = http_etag(content_digest)
+
+        # see if the client has cached this content, if so then compare the
+        # ETags or timestamps, if they are the same then just return a 304 (Not Modified)
+        if etag is not None and 'HTTP_IF_NONE_MATCH' in request.META:
+            if_none_match = [tag.strip() for tag in request.META['HTTP_IF_NONE_MATCH'].split(',')]
+            if etag in if_none_match or '*' in if_none_match:
+                response = HttpResponseNotModified()
+                response['ETag'] = etag
+                return response
+        elif 'HTTP_IF_MODIFIED_SINCE' in request.META:
+            if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
+            if if_modified_since == last_modified_at_str:
+                return HttpResponseNotModified()
+
+        return None
+
+    def get_disk_cached_content(self, content):
+        """
+        Return a stream of the content from the local disk cache, adding it to the cache if it's
+        not there yet, or the content itself if there's no disk cache or it can't be cached.
+        """
+        disk_cache = get_disk_cache()
+        if disk_cache is None:
+            return content
+        cached_content = disk_cache.get(content)
+        if cached_content is None:
+            cached_content = disk_cache.add(content)
+        if cached_content is None:
+            return content
+        content.close()
+        return cached_content
@@ -3,8 +3,14 @@ Tests for StaticContentServer
 """
 import copy
 import logging
+import os
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
 from uuid import uuid4
 from path import path
+from mock import patch
 from pymongo import MongoClient
 
 from django.contrib.auth.models import User
@@ -14,6 +20,10 @@ from django.test.utils import override_settings
 
 from student.models import CourseEnrollment
 
+from cache_toolbox.core import del_cached_content
+from contentserver.disk_cache import AssetDiskCache
+from contentserver.middleware import parse_byte_range
+from xmodule.contentstore.content import StaticContentStream
 from xmodule.contentstore.django import contentstore, _CONTENTSTORE
 from xmodule.modulestore.django import modulestore
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
@@ -123,3 +133,133 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
         resp = self.client.get(self.url_locked)
         self.assertEqual(resp.status_code, 200) # pylint: disable=E1103
 
+
+    def test_range_request(self):
+        """
+        Test that a byte range of an asset gets served as partial content.
+        """
+        length = len(self.contentstore.find(self.unlocked_asset).data)
+        data = self.client.get(self.url_unlocked).content
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(resp.status_code, 206)  # pylint: disable=E1103
+        self.assertEqual(resp.content, data[10:20])  # pylint: disable=E1103
+        self.assertEqual(resp['Content-Range'], 'bytes 10-19/{}'.format(length))
+        self.assertEqual(resp['Content-Length'], '10')
+
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=-5')
+        self.assertEqual(resp.content, data[-5:])  # pylint: disable=E1103
+
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={}-'.format(length))
+        self.assertEqual(resp.status_code, 416)  # pylint: disable=E1103
+        self.assertEqual(resp['Content-Range'], 'bytes */{}'.format(length))
+
+    def test_etag(self):
+        """
+        Test that assets are served with their md5 as an ETag, which If-None-Match can match.
+        """
+        resp = self.client.get(self.url_unlocked)
+        etag = resp['ETag']
+        self.assertEqual(etag, '"{}"'.format(self.contentstore.find(self.unlocked_asset).content_digest))
+        self.assertEqual(resp['Accept-Ranges'], 'bytes')
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)  # pylint: disable=E1103
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"another-version"')
+        self.assertEqual(resp.status_code, 200)  # pylint: disable=E1103
+
+
+    def test_not_found_cached(self):
+        """
+        Test that requests for missing assets don't keep going to the contentstore.
+        """
+        missing_asset = self.course_key.make_asset_key('asset', 'missing.txt')
+        del_cached_content(missing_asset)
+        url_missing = missing_asset.to_deprecated_string()
+        with patch.object(self.contentstore, 'find', wraps=self.contentstore.find) as mock_find:
+            self.assertEqual(self.client.get(url_missing).status_code, 404)  # pylint: disable=E1103
+            self.assertEqual(self.client.get(url_missing).status_code, 404)  # pylint: disable=E1103
+        self.assertEqual(mock_find.call_count, 1)
+
+    def test_metadata_responses(self):
+        """
+        Test that the cached metadata answers 403s and 304s without the content.
+        """
+        resp = self.client.get(self.url_unlocked)
+        etag = resp['ETag']
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url_locked).status_code, 403)  # pylint: disable=E1103
+
+        with patch('contentserver.middleware.get_cached_content') as mock_get_cached_content:
+            with patch.object(self.contentstore, 'find') as mock_find:
+                resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(resp.status_code, 304)  # pylint: disable=E1103
+                resp = self.client.get(self.url_locked)
+                self.assertEqual(resp.status_code, 403)  # pylint: disable=E1103
+        self.assertFalse(mock_get_cached_content.called)
+        self.assertFalse(mock_find.called)
+
+
+class ParseByteRangeTest(unittest.TestCase):
+    """
+    Tests for parsing Range headers.
+    """
+    def test_parse_byte_range(self):
+        for range_header, expected in [
+                ('bytes=0-99', (0, 99)),
+                ('bytes=100-', (100, 999)),
+                ('bytes=900-2000', (900, 999)),
+                ('bytes=-100', (900, 999)),
+                ('bytes=-2000', (0, 999)),
+                # unsatisfiable
+                ('bytes=1000-', (1000, 999)),
+                ('bytes=-0', (1000, 999)),
+                # ignored
+                ('bytes=99-0', None),
+                ('bytes=0-9,20-29', None),
+                ('items=0-9', None),
+                ('bytes=-', None),
+        ]:
+            self.assertEqual(parse_byte_range(range_header, 1000), expected, range_header)
+
+
+class AssetDiskCacheTest(unittest.TestCase):
+    """
+    Tests for the local on-disk cache of large assets.
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.disk_cache = AssetDiskCache(self.directory, max_size=25)
+        self.course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+
+    def _content(self, name, data, digest):
+        """
+        Make a content stream of the data
+        """
+        return StaticContentStream(
+            self.course_key.make_asset_key('asset', name), name, 'text/plain', StringIO(data),
+            length=len(data), content_digest=digest
+        )
+
+    def test_add_and_get(self):
+        content = self._content('a.txt', 'a' * 10, 'aaaa')
+        self.assertIsNone(self.disk_cache.get(content))
+        cached = self.disk_cache.add(content)
+        self.assertEqual(''.join(cached.stream_data()), 'a' * 10)
+        self.assertEqual(''.join(cached.stream_data_in_range(2, 4)), 'aaa')
+        self.assertEqual(''.join(self.disk_cache.get(content).stream_data()), 'a' * 10)
+
+    def test_evicts_least_recently_used(self):
+        content_a = self._content('a.txt', 'a' * 10, 'aaaa')
+        content_b = self._content('b.txt', 'b' * 10, 'bbbb')
+        self.disk_cache.add(content_a)
+        self.disk_cache.add(content_b)
+        # make a the most recently served
+        os.utime(os.path.join(self.directory, 'bbbb'), (0, 0))
+        self.disk_cache.get(content_a)
+        self.disk_cache.add(self._content('c.txt', 'c' * 10, 'cccc'))
+        self.assertEqual(sorted(os.listdir(self.directory)), ['aaaa', 'cccc'])
+
+    def test_not_cached_without_digest(self):
+        self.assertIsNone(self.disk_cache.add(self._content('a.txt', 'a' * 10, None)))
+        self.assertEqual(os.listdir(self.directory), [])
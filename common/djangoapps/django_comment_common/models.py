@@ -17,6 +17,9 @@ FORUM_ROLE_MODERATOR = ugettext_noop('Moderator')
 FORUM_ROLE_COMMUNITY_TA = ugettext_noop('Community TA')
 FORUM_ROLE_STUDENT = ugettext_noop('Student')
 
+# the prefixes of the permissions students lose in courses which don't allow forum posts
+POSTING_PERMISSION_PREFIXES = ('edit', 'update', 'create')
+
 
 @receiver(post_save, sender=CourseEnrollment)
 def assign_default_role_on_enrollment(sender, instance, **kwargs):
@@ -80,12 +83,23 @@ class Role(models.Model):
         if course is None:
             raise ItemNotFoundError(self.course_id)
         if self.name == FORUM_ROLE_STUDENT and \
-           (permission.startswith('edit') or permission.startswith('update') or permission.startswith('create')) and \
+           permission.startswith(POSTING_PERMISSION_PREFIXES) and \
            (not course.forum_posts_allowed):
             return False
 
         return self.permissions.filter(name=permission).exists()
 
+    def get_permission_names(self, course):
+        """
+        Return the set of names of the permissions the role has in the course (the role's own
+        course, already loaded), as has_permission would answer for each of them. The
+        permissions are read with one query unless they've been prefetched.
+        """
+        names = set(permission.name for permission in self.permissions.all())
+        if self.name == FORUM_ROLE_STUDENT and not course.forum_posts_allowed:
+            names = set(name for name in names if not name.startswith(POSTING_PERMISSION_PREFIXES))
+        return names
+
 
 class Permission(models.Model):
     name = models.CharField(max_length=30, null=False, blank=False, primary_key=True)
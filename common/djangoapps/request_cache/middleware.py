@@ -2,19 +2,25 @@ import threading
 
 _request_cache_threadlocal = threading.local()
 _request_cache_threadlocal.data = {}
+# whether the thread is handling a request, i.e., whether anything will clear its data when it's done.
+# Celery tasks and management commands never are; so, things which are only good for the rest of a
+# request (e.g., modulestore prefetches) mustn't be cached in data there.
+_request_cache_threadlocal.in_request = False
 
 class RequestCache(object):
     @classmethod
     def get_request_cache(cls):
         return _request_cache_threadlocal
-            
+
     def clear_request_cache(self):
         _request_cache_threadlocal.data = {}
 
     def process_request(self, request):
         self.clear_request_cache()
+        _request_cache_threadlocal.in_request = True
         return None
 
     def process_response(self, request, response):
         self.clear_request_cache()
-        return response
\ No newline at end of file
+        _request_cache_threadlocal.in_request = False
+        return response
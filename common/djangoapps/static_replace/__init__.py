@@ -1,16 +1,22 @@
 import logging
 import re
+import threading
+from collections import OrderedDict
 
 from staticfiles.storage import staticfiles_storage
 from staticfiles import finders
 from django.conf import settings
 
+from request_cache.middleware import RequestCache
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.contentstore.content import StaticContent
 
 log = logging.getLogger(__name__)
 
+# The number of static url resolutions to remember
+STATIC_URL_CACHE_SIZE = 10000
+
 
 def _url_replace_regex(prefix):
     """
@@ -28,6 +34,102 @@ def _url_replace_regex(prefix):
         """.format(prefix=prefix)
 
 
+def _multi_url_replace_regex(static_prefix, course_prefix, jump_to_id_prefix):
+    """
+    Match urls in quotes which start with any of the (non-None) prefixes, naming the group
+    of the prefix that matched. Like _url_replace_regex, but for all the prefixes at once.
+    """
+    prefixes = [
+        u'(?P<{name}>{prefix})'.format(name=name, prefix=prefix)
+        for name, prefix in [
+            ('static_prefix', static_prefix),
+            ('course_prefix', course_prefix),
+            ('jump_to_id_prefix', jump_to_id_prefix),
+        ]
+        if prefix is not None
+    ]
+    return _url_replace_regex(u'|'.join(prefixes))
+
+
+_COMPILED_REGEXES = {}
+
+
+def _compiled_url_replace_regex(static_prefix, course_prefix, jump_to_id_prefix):
+    """
+    Return the compiled _multi_url_replace_regex, compiling it only the first time
+    """
+    key = (static_prefix, course_prefix, jump_to_id_prefix)
+    regex = _COMPILED_REGEXES.get(key)
+    if regex is None:
+        regex = _COMPILED_REGEXES[key] = re.compile(_multi_url_replace_regex(*key))
+    return regex
+
+
+class _LRUCache(object):
+    """
+    A thread-safe mapping which holds at most `size` items, evicting the least recently used one when full
+    """
+    def __init__(self, size):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the value for `key` (marking it as the most recently used), or `default`
+        """
+        with self._lock:
+            try:
+                value = self._items.pop(key)
+            except KeyError:
+                return default
+            self._items[key] = value
+            return value
+
+    def set(self, key, value):
+        """
+        Set the value for `key`, evicting the least recently used item if need be
+        """
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = value
+            if len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all the items
+        """
+        with self._lock:
+            self._items.clear()
+
+
+# The urls which static paths resolved to, by (path, course or data directory, ...). The static
+# files don't change while the process runs and neither do the contentstore's urls; so, these
+# needn't ever be invalidated.
+_STATIC_URL_CACHE = _LRUCache(STATIC_URL_CACHE_SIZE)
+
+
+def clear_static_url_cache():
+    """
+    Forget the resolved static urls (e.g. after the static files change, as in tests)
+    """
+    _STATIC_URL_CACHE.clear()
+
+
+def _get_modulestore_type(course_id):
+    """
+    Return the type of the modulestore which has the course, looking it up once per request
+    """
+    request_cache = getattr(RequestCache.get_request_cache(), 'data', None)
+    if request_cache is None:
+        return modulestore().get_modulestore_type(course_id)
+    key = ('static_replace.modulestore_type', course_id)
+    if key not in request_cache:
+        request_cache[key] = modulestore().get_modulestore_type(course_id)
+    return request_cache[key]
+
+
 def try_staticfiles_lookup(path):
     """
     Try to lookup a path in staticfiles_storage.  If it fails, return
@@ -63,13 +165,7 @@ def replace_jump_to_id_urls(text, course_id, jump_to_id_base_url):
 
     output: <text> after the link rewriting rules are applied
     """
-
-    def replace_jump_to_id_url(match):
-        quote = match.group('quote')
-        rest = match.group('rest')
-        return "".join([quote, jump_to_id_base_url + rest, quote])
-
-    return re.sub(_url_replace_regex('/jump_to_id/'), replace_jump_to_id_url, text)
+    return replace_urls(text, course_id=course_id, jump_to_id_base_url=jump_to_id_base_url, static=False, course=False)
 
 
 def replace_course_urls(text, course_key):
@@ -81,15 +177,7 @@ def replace_course_urls(text, course_key):
 
     returns: text with the links replaced
     """
-
-    course_id = course_key.to_deprecated_string()
-
-    def replace_course_url(match):
-        quote = match.group('quote')
-        rest = match.group('rest')
-        return "".join([quote, '/courses/' + course_id + '/', rest, quote])
-
-    return re.sub(_url_replace_regex('/course/'), replace_course_url, text)
+    return replace_urls(text, course_id=course_key, static=False)
 
 
 def replace_static_urls(text, data_directory, course_id=None, static_asset_path=''):
@@ -104,10 +192,32 @@ def replace_static_urls(text, data_directory, course_id=None, static_asset_path=
     course_id: The course identifier used to distinguish static content for this course in studio
     static_asset_path: Path for static assets, which overrides data_directory and course_namespace, if nonempty
     """
+    return replace_urls(text, data_directory, course_id, static_asset_path, course=False)
+
+
+def replace_urls(text, data_directory=None, course_id=None, static_asset_path='', jump_to_id_base_url=None,
+                 static=True, course=True):
+    """
+    Replace the /static/ urls (see replace_static_urls), the /course/ urls (see replace_course_urls)
+    and, if given a jump_to_id_base_url, the /jump_to_id/ urls (see replace_jump_to_id_urls) in one
+    pass over the text.
+
+    static: whether to replace /static/ urls
+    course: whether to replace /course/ urls (needs the course_id)
+    """
+    modulestore_type = []
+
+    def is_xml_course():
+        """
+        Whether the course is in an XML modulestore (looked up only if there are static urls)
+        """
+        if not modulestore_type:
+            modulestore_type.append(_get_modulestore_type(course_id))
+        return modulestore_type[0] == ModuleStoreEnum.Type.xml
 
     def replace_static_url(match):
         original = match.group(0)
-        prefix = match.group('prefix')
+        prefix = match.group('static_prefix')
         quote = match.group('quote')
         rest = match.group('rest')
 
@@ -119,47 +229,65 @@ def replace_static_urls(text, data_directory, course_id=None, static_asset_path=
         if settings.DEBUG and finders.find(rest, True):
             return original
         # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls
-        elif (not static_asset_path) \
-                and course_id \
-                and modulestore().get_modulestore_type(course_id) != ModuleStoreEnum.Type.xml:
-            # first look in the static file pipeline and see if we are trying to reference
-            # a piece of static content which is in the edx-platform repo (e.g. JS associated with an xmodule)
-
-            exists_in_staticfiles_storage = False
-            try:
-                exists_in_staticfiles_storage = staticfiles_storage.exists(rest)
-            except Exception as err:
-                log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
-                    rest, str(err)))
-
-            if exists_in_staticfiles_storage:
-                url = staticfiles_storage.url(rest)
-            else:
-                # if not, then assume it's courseware specific content and then look in the
-                # Mongo-backed database
-                url = StaticContent.convert_legacy_static_url_with_course_id(rest, course_id)
+        elif (not static_asset_path) and course_id and not is_xml_course():
+            cache_key = (rest, course_id)
+            url = _STATIC_URL_CACHE.get(cache_key)
+            if url is None:
+                # first look in the static file pipeline and see if we are trying to reference
+                # a piece of static content which is in the edx-platform repo (e.g. JS associated with an xmodule)
+
+                exists_in_staticfiles_storage = False
+                try:
+                    exists_in_staticfiles_storage = staticfiles_storage.exists(rest)
+                except Exception as err:
+                    log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
+                        rest, str(err)))
+
+                if exists_in_staticfiles_storage:
+                    url = staticfiles_storage.url(rest)
+                else:
+                    # if not, then assume it's courseware specific content and then look in the
+                    # Mongo-backed database
+                    url = StaticContent.convert_legacy_static_url_with_course_id(rest, course_id)
+                _STATIC_URL_CACHE.set(cache_key, url)
         # Otherwise, look the file up in staticfiles_storage, and append the data directory if needed
         else:
             course_path = "/".join((static_asset_path or data_directory, rest))
-
-            try:
-                if staticfiles_storage.exists(rest):
-                    url = staticfiles_storage.url(rest)
-                else:
-                    url = staticfiles_storage.url(course_path)
-            # And if that fails, assume that it's course content, and add manually data directory
-            except Exception as err:
-                log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
-                    rest, str(err)))
-                url = "".join([prefix, course_path])
+            cache_key = (rest, prefix, course_path)
+            url = _STATIC_URL_CACHE.get(cache_key)
+            if url is None:
+                try:
+                    if staticfiles_storage.exists(rest):
+                        url = staticfiles_storage.url(rest)
+                    else:
+                        url = staticfiles_storage.url(course_path)
+                # And if that fails, assume that it's course content, and add manually data directory
+                except Exception as err:
+                    log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
+                        rest, str(err)))
+                    url = "".join([prefix, course_path])
+                _STATIC_URL_CACHE.set(cache_key, url)
 
         return "".join([quote, url, quote])
 
-    return re.sub(
-        _url_replace_regex(u'(?:{static_url}|/static/)(?!{data_dir})'.format(
+    def replace_url(match):
+        if match.group('static_prefix') is not None:
+            return replace_static_url(match)
+
+        quote = match.group('quote')
+        rest = match.group('rest')
+        if match.group('course_prefix') is not None:
+            return "".join([quote, '/courses/' + course_id.to_deprecated_string() + '/', rest, quote])
+        return "".join([quote, jump_to_id_base_url + rest, quote])
+
+    if not (static or course or jump_to_id_base_url is not None):
+        return text
+    regex = _compiled_url_replace_regex(
+        u'(?:{static_url}|/static/)(?!{data_dir})'.format(
             static_url=settings.STATIC_URL,
             data_dir=static_asset_path or data_directory
-        )),
-        replace_static_url,
-        text
+        ) if static else None,
+        '/course/' if course else None,
+        '/jump_to_id/' if jump_to_id_base_url is not None else None,
     )
+    return regex.sub(replace_url, text)
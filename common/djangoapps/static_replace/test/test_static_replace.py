@@ -1,10 +1,12 @@
 import re
 
-from nose.tools import assert_equals, assert_true, assert_false  # pylint: disable=E0611
-from static_replace import (replace_static_urls, replace_course_urls,
-                            _url_replace_regex)
+from nose.tools import assert_equals, assert_true, assert_false, with_setup  # pylint: disable=E0611
+from static_replace import (replace_static_urls, replace_course_urls, replace_jump_to_id_urls, replace_urls,
+                            clear_static_url_cache, _url_replace_regex)
 from mock import patch, Mock
 
+from request_cache.middleware import RequestCache
+
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from xmodule.modulestore.mongo import MongoModuleStore
 from xmodule.modulestore.xml import XMLModuleStore
@@ -14,6 +16,15 @@ COURSE_KEY = SlashSeparatedCourseKey('org', 'course', 'run')
 STATIC_SOURCE = '"/static/file.png"'
 
 
+def clear_caches():
+    """
+    Forget the resolved static urls and modulestore types so that each test's mocks get used
+    """
+    clear_static_url_cache()
+    RequestCache().clear_request_cache()
+
+
+@with_setup(clear_caches)
 def test_multi_replace():
     course_source = '"/course/file.png"'
 
@@ -27,6 +38,7 @@ def test_multi_replace():
     )
 
 
+@with_setup(clear_caches)
 @patch('static_replace.staticfiles_storage')
 def test_storage_url_exists(mock_storage):
     mock_storage.exists.return_value = True
@@ -37,6 +49,7 @@ def test_storage_url_exists(mock_storage):
     mock_storage.url.called_once_with('data_dir/file.png')
 
 
+@with_setup(clear_caches)
 @patch('static_replace.staticfiles_storage')
 def test_storage_url_not_exists(mock_storage):
     mock_storage.exists.return_value = False
@@ -47,6 +60,7 @@ def test_storage_url_not_exists(mock_storage):
     mock_storage.url.called_once_with('file.png')
 
 
+@with_setup(clear_caches)
 @patch('static_replace.StaticContent')
 @patch('static_replace.modulestore')
 def test_mongo_filestore(mock_modulestore, mock_static_content):
@@ -66,6 +80,7 @@ def test_mongo_filestore(mock_modulestore, mock_static_content):
     mock_static_content.convert_legacy_static_url_with_course_id.assert_called_once_with('file.png', COURSE_KEY)
 
 
+@with_setup(clear_caches)
 @patch('static_replace.settings')
 @patch('static_replace.modulestore')
 @patch('static_replace.staticfiles_storage')
@@ -80,6 +95,7 @@ def test_data_dir_fallback(mock_storage, mock_modulestore, mock_settings):
     assert_equals('"/static/data_dir/file.png"', replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY))
 
 
+@with_setup(clear_caches)
 def test_raw_static_check():
     """
     Make sure replace_static_urls leaves alone things that end in '.raw'
@@ -91,6 +107,7 @@ def test_raw_static_check():
     assert_equals(path, replace_static_urls(path, text))
 
 
+@with_setup(clear_caches)
 @patch('static_replace.staticfiles_storage')
 @patch('static_replace.modulestore')
 def test_static_url_with_query(mock_modulestore, mock_storage):
@@ -125,3 +142,46 @@ def test_regex():
     for s in no:
         print 'Should not match: {0!r}'.format(s)
         assert_false(re.match(regex, s))
+
+
+@with_setup(clear_caches)
+@patch('static_replace.staticfiles_storage')
+@patch('static_replace.modulestore')
+def test_replace_urls(mock_modulestore, mock_storage):
+    """
+    Make sure replace_urls replaces in one pass what the separate replacements do
+    """
+    mock_storage.exists.return_value = False
+    mock_modulestore.return_value = Mock(MongoModuleStore)
+    jump_to_id_base_url = '/courses/org/course/run/jump_to_id/'
+
+    text = '<img src="/static/file.png"/><a href="/course/info">i</a><a href=\'/jump_to_id/abc\'>j</a>'
+    assert_equals(
+        replace_urls(text, DATA_DIRECTORY, COURSE_KEY, jump_to_id_base_url=jump_to_id_base_url),
+        replace_jump_to_id_urls(
+            replace_course_urls(replace_static_urls(text, DATA_DIRECTORY, COURSE_KEY), COURSE_KEY),
+            COURSE_KEY, jump_to_id_base_url
+        )
+    )
+    assert_equals(
+        replace_urls(text, DATA_DIRECTORY, COURSE_KEY, jump_to_id_base_url=jump_to_id_base_url),
+        '<img src="/c4x/org/course/asset/file.png"/><a href="/courses/org/course/run/info">i</a>'
+        '<a href=\'/courses/org/course/run/jump_to_id/abc\'>j</a>'
+    )
+
+
+@with_setup(clear_caches)
+@patch('static_replace.staticfiles_storage')
+@patch('static_replace.modulestore')
+def test_static_urls_memoized(mock_modulestore, mock_storage):
+    """
+    Make sure static urls are resolved, and the modulestore type looked up, only once
+    """
+    mock_storage.exists.return_value = False
+    mock_modulestore.return_value = Mock(MongoModuleStore)
+
+    text = '"/static/file.png" "/static/file.png" "/static/other.png"'
+    replace_static_urls(text, DATA_DIRECTORY, COURSE_KEY)
+    replace_static_urls(text, DATA_DIRECTORY, COURSE_KEY)
+    assert_equals(mock_storage.exists.call_count, 2)
+    assert_equals(mock_modulestore.return_value.get_modulestore_type.call_count, 1)
@@ -26,3 +26,13 @@ class BaseBackend(object):
     def send(self, event):
         """Send event to tracker."""
         pass
+
+    def send_batch(self, events):
+        """
+        Send several events to tracker. Backends which can store many
+        events at once should override this, letting errors propagate
+        so that the caller (e.g. the BufferedBackend) can count the
+        events as failed.
+        """
+        for event in events:
+            self.send(event)
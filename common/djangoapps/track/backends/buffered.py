@@ -0,0 +1,179 @@
+"""
+Event tracker backend wrapper which queues events in memory and sends
+them to the wrapped backend in batches from a background thread, so
+that tracking doesn't add the backend's latency to every request.
+
+"""
+
+from __future__ import absolute_import
+
+import atexit
+import logging
+import os
+import threading
+import time
+from Queue import Queue, Empty, Full
+
+from dogapi import dog_stats_api
+from django.db import close_connection
+
+from track.backends import BaseBackend
+
+
+log = logging.getLogger(__name__)
+
+
+class BufferedBackend(BaseBackend):
+    """
+    Queues the events sent to it and sends them to the wrapped backend's
+    `send_batch` from a background thread.
+
+    A batch gets sent when it has `batch_size` events or when its first
+    event has waited `flush_interval` seconds, whichever comes first.
+    When the queue is full, `send` waits up to `block_timeout` seconds
+    for room (applying backpressure to the request) and then drops the
+    event; the counts of both are kept in `blocked_count` and
+    `dropped_count` (and reported to datadog). Events in batches the
+    wrapped backend fails to send are counted in `failed_count`.
+
+    Nothing ends a request on the background thread, so it closes its
+    database connection itself after each batch; otherwise a backend
+    such as the DjangoBackend would keep failing on a connection the
+    database had dropped.
+
+    """
+
+    # the most seconds to wait at exit for the queued events to be sent
+    EXIT_FLUSH_TIMEOUT = 5
+
+    def __init__(self, backend, name='buffered', max_queue_size=10000, batch_size=100, flush_interval=1.0,
+                 block_timeout=0, **kwargs):
+        """
+        :Parameters:
+
+          - `backend`: the backend to send batches of events to
+          - `name`: the name of the backend, for logs and metrics
+          - `max_queue_size`: the most events to hold at once
+          - `batch_size`: the most events to send at once
+          - `flush_interval`: the most seconds an event waits to be sent
+          - `block_timeout`: the most seconds `send` waits when the queue is full
+
+        """
+        super(BufferedBackend, self).__init__(**kwargs)
+        self.backend = backend
+        self.name = name
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+
+        self.sent_count = 0
+        self.blocked_count = 0
+        self.dropped_count = 0
+        self.failed_count = 0
+
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        atexit.register(self.flush, timeout=self.EXIT_FLUSH_TIMEOUT)
+
+    def _ensure_flusher(self):
+        """
+        Start the queue and the background thread which empties it, if this
+        process doesn't have them yet (threads don't survive forking, so a
+        forked worker starts its own).
+        """
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._queue = Queue(self.max_queue_size)
+            self._thread = threading.Thread(target=self._run, name='track-{0}'.format(self.name))
+            self._thread.daemon = True
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def send(self, event):
+        """Queue the event to be sent in a batch"""
+        self._ensure_flusher()
+        try:
+            self._queue.put_nowait(event)
+            return
+        except Full:
+            pass
+
+        if self.block_timeout:
+            self.blocked_count += 1
+            dog_stats_api.increment('track.buffered.blocked', tags=['backend:{0}'.format(self.name)])
+            try:
+                self._queue.put(event, timeout=self.block_timeout)
+                return
+            except Full:
+                pass
+
+        self.dropped_count += 1
+        dog_stats_api.increment('track.buffered.dropped', tags=['backend:{0}'.format(self.name)])
+        log.warning('Dropped an event for the %s event tracker backend: its queue is full', self.name)
+
+    def send_batch(self, events):
+        """Queue the events to be sent"""
+        for event in events:
+            self.send(event)
+
+    def _next_batch(self):
+        """
+        Wait for the next batch of events from the queue: up to batch_size
+        events, taken within flush_interval seconds of the first
+        """
+        batch = [self._queue.get()]
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except Empty:
+                break
+        return batch
+
+    def _send(self, batch):
+        """Send the batch to the wrapped backend"""
+        try:
+            with dog_stats_api.timer('track.buffered.send_batch', tags=['backend:{0}'.format(self.name)]):
+                self.backend.send_batch(batch)
+            self.sent_count += len(batch)
+        except Exception:  # pylint: disable=broad-except
+            self.failed_count += len(batch)
+            dog_stats_api.increment('track.buffered.failed', len(batch), tags=['backend:{0}'.format(self.name)])
+            log.exception('Error sending a batch of %d events to the %s event tracker backend', len(batch), self.name)
+        finally:
+            close_connection()
+
+    def _run(self):
+        """Send the queued events in batches, forever"""
+        while True:
+            batch = self._next_batch()
+            try:
+                self._send(batch)
+            finally:
+                for __ in batch:
+                    self._queue.task_done()
+
+    def flush(self, timeout=None):
+        """
+        Wait until every event queued so far has been sent (e.g. at exit,
+        or in tests), or until `timeout` seconds have passed. Return
+        whether the queue got emptied.
+        """
+        if self._queue is None or self._pid != os.getpid() or not self._thread.is_alive():
+            return True
+        deadline = None if timeout is None else time.time() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
@@ -81,3 +81,8 @@ class DjangoBackend(BaseBackend):
             tldat.save(using=self.name)
         except Exception as e:  # pylint: disable=broad-except
             log.exception(e)
+
+    def send_batch(self, events):
+        """Save the events with one bulk insert; errors are left to the caller"""
+        tracking_logs = [TrackingLog(**{x: event.get(x, '') for x in LOGFIELDS}) for event in events]
+        TrackingLog.objects.using(self.name).bulk_create(tracking_logs)
@@ -95,3 +95,12 @@ class MongoBackend(BaseBackend):
             # during the next event.
             msg = 'Error inserting to MongoDB event tracker backend'
             log.exception(msg)
+
+    def send_batch(self, events):
+        """
+        Insert the events in to the Mongo collection in one bulk insert.
+        Errors are left to the caller, which logs them and counts the
+        batch as failed (with continue_on_error, some of its events may
+        still have been inserted).
+        """
+        self.collection.insert(events, manipulate=False, continue_on_error=True)
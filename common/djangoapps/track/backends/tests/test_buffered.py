@@ -0,0 +1,104 @@
+from __future__ import absolute_import
+
+import threading
+
+from django.db import DatabaseError
+from django.test import TestCase
+from mock import patch
+
+from track.backends import BaseBackend
+from track.backends.buffered import BufferedBackend
+from track.backends.django import DjangoBackend
+
+
+class RecordingBackend(BaseBackend):
+    """Records the batches of events sent to it, optionally waiting to be released first"""
+    def __init__(self, **options):
+        super(RecordingBackend, self).__init__(**options)
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def send(self, event):
+        self.send_batch([event])
+
+    def send_batch(self, events):
+        self.release.wait()
+        self.batches.append(list(events))
+
+
+class TestBufferedBackend(TestCase):
+    def setUp(self):
+        self.recorder = RecordingBackend()
+
+    def test_batches(self):
+        backend = BufferedBackend(self.recorder, batch_size=5, flush_interval=0.05)
+        events = [{'test': i} for i in range(12)]
+        for event in events:
+            backend.send(event)
+
+        self.assertTrue(backend.flush(timeout=5))
+        self.assertEqual([event for batch in self.recorder.batches for event in batch], events)
+        self.assertTrue(all(len(batch) <= 5 for batch in self.recorder.batches))
+        self.assertEqual(backend.sent_count, 12)
+        self.assertEqual(backend.dropped_count, 0)
+
+    def test_flushes_partial_batch_after_interval(self):
+        backend = BufferedBackend(self.recorder, batch_size=100, flush_interval=0.05)
+        backend.send({'test': 1})
+        self.assertTrue(backend.flush(timeout=5))
+        self.assertEqual(self.recorder.batches, [[{'test': 1}]])
+
+    def test_drops_when_full(self):
+        self.recorder.release.clear()
+        backend = BufferedBackend(self.recorder, max_queue_size=2, batch_size=1, flush_interval=0)
+        backend.send({'test': 0})
+        # wait for the flusher to take the first event and get stuck sending it
+        while backend._queue.qsize():  # pylint: disable=protected-access
+            pass
+        for i in range(1, 5):
+            backend.send({'test': i})
+        self.assertEqual(backend.dropped_count, 2)
+        self.assertEqual(backend.blocked_count, 0)
+
+        backend.block_timeout = 0.01
+        backend.send({'test': 5})
+        self.assertEqual(backend.blocked_count, 1)
+        self.assertEqual(backend.dropped_count, 3)
+
+        self.recorder.release.set()
+        self.assertTrue(backend.flush(timeout=5))
+        self.assertEqual(self.recorder.batches, [[{'test': 0}], [{'test': 1}], [{'test': 2}]])
+
+    def test_backend_errors_are_logged(self):
+        def fail(events):
+            raise Exception('down')
+        self.recorder.send_batch = fail
+        backend = BufferedBackend(self.recorder, flush_interval=0)
+        backend.send({'test': 1})
+        self.assertTrue(backend.flush(timeout=5))
+        self.assertEqual(backend.sent_count, 0)
+        self.assertEqual(backend.failed_count, 1)
+
+    def test_closes_connection_after_each_batch(self):
+        def fail(events):
+            if events[0]['test'] == 1:
+                raise Exception('connection lost')
+            self.recorder.batches.append(list(events))
+        self.recorder.send_batch = fail
+        with patch('track.backends.buffered.close_connection') as mock_close:
+            backend = BufferedBackend(self.recorder, batch_size=1, flush_interval=0)
+            for i in range(3):
+                backend.send({'test': i})
+            self.assertTrue(backend.flush(timeout=5))
+        self.assertEqual(mock_close.call_count, 3)
+        self.assertEqual(self.recorder.batches, [[{'test': 0}], [{'test': 2}]])
+        self.assertEqual((backend.sent_count, backend.failed_count), (2, 1))
+
+    def test_counts_django_backend_failures(self):
+        backend = BufferedBackend(DjangoBackend(), batch_size=2, flush_interval=0.05)
+        with patch('django.db.models.query.QuerySet.bulk_create', side_effect=DatabaseError('down')):
+            for i in range(2):
+                backend.send({'username': 'test{}'.format(i), 'time': '2013-01-01T12:01:00-05:00'})
+            self.assertTrue(backend.flush(timeout=5))
+        self.assertEqual((backend.sent_count, backend.failed_count), (0, 2))
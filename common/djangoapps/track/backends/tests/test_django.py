@@ -1,6 +1,8 @@
 from __future__ import absolute_import
 
+from django.db import DatabaseError
 from django.test import TestCase
+from mock import patch
 
 from track.backends.django import DjangoBackend, TrackingLog
 
@@ -23,3 +25,21 @@ class TestDjangoBackend(TestCase):
 
         # Check if time is stored in UTC
         self.assertEqual(str(results[0].time), '2013-01-01 17:01:00+00:00')
+
+    def test_send_batch(self):
+        events = [
+            {'username': 'test{}'.format(i), 'time': '2013-01-01T12:01:00-05:00'}
+            for i in range(3)
+        ]
+        with self.assertNumQueries(1):
+            self.backend.send_batch(events)
+
+        self.assertEqual(
+            sorted(log.username for log in TrackingLog.objects.all()),
+            ['test0', 'test1', 'test2']
+        )
+
+    def test_send_batch_raises_errors(self):
+        with patch('django.db.models.query.QuerySet.bulk_create', side_effect=DatabaseError('down')):
+            with self.assertRaises(DatabaseError):
+                self.backend.send_batch([{'username': 'test', 'time': '2013-01-01T12:01:00-05:00'}])
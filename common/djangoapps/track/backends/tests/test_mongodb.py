@@ -5,6 +5,7 @@ from uuid import uuid4
 from mock import patch
 
 from django.test import TestCase
+from pymongo.errors import PyMongoError
 
 from track.backends.mongodb import MongoBackend
 
@@ -38,3 +39,16 @@ class TestMongoBackend(TestCase):
 
         self.assertEqual(events[0], first_argument(calls[0]))
         self.assertEqual(events[1], first_argument(calls[1]))
+
+    def test_send_batch(self):
+        events = [{'test': 1}, {'test': 2}]
+
+        self.backend.send_batch(events)
+
+        # One bulk insert of all the events
+        self.backend.collection.insert.assert_called_once_with(events, manipulate=False, continue_on_error=True)
+
+    def test_send_batch_raises_errors(self):
+        self.backend.collection.insert.side_effect = PyMongoError('down')
+        with self.assertRaises(PyMongoError):
+            self.backend.send_batch([{'test': 1}])
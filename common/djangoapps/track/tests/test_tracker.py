@@ -4,6 +4,7 @@ from django.test.utils import override_settings
 
 import track.tracker as tracker
 from track.backends import BaseBackend
+from track.backends.buffered import BufferedBackend
 
 
 SIMPLE_SETTINGS = {
@@ -25,6 +26,17 @@ MULTI_SETTINGS = {
 }
 
 
+BUFFERED_SETTINGS = {
+    'default': {
+        'ENGINE': 'track.tests.test_tracker.DummyBackend',
+        'BUFFER': {
+            'batch_size': 10,
+            'flush_interval': 0.01,
+        }
+    }
+}
+
+
 class TestTrackerInstantiation(TestCase):
     """Test that a helper function can instantiate backends from their name."""
     def setUp(self):
@@ -87,6 +99,21 @@ class TestTrackerDjangoInstantiation(TestCase):
         self.assertEqual(backends[0].count, event_count)
         self.assertEqual(backends[1].count, event_count)
 
+    @override_settings(TRACKING_BACKENDS=BUFFERED_SETTINGS)
+    def test_django_buffered_settings(self):
+        """Test that a backend with a BUFFER gets its events in batches."""
+
+        backend = self._reload_backends()['default']
+        self.assertIsInstance(backend, BufferedBackend)
+        self.assertEqual(backend.batch_size, 10)
+
+        event_count = 25
+        for _ in xrange(event_count):
+            tracker.send({})
+        self.assertTrue(backend.flush(timeout=5))
+
+        self.assertEqual(backend.backend.count, event_count)
+
     @override_settings(TRACKING_BACKENDS=MULTI_SETTINGS)
     def test_django_remove_settings(self):
         """Test if a backend can be remove by setting it to None."""
@@ -12,10 +12,20 @@ below::
               'host': ... ,
               'port': ... ,
               ...
+          },
+          'BUFFER': {
+              'max_queue_size': ... ,
+              'batch_size': ... ,
+              'flush_interval': ... ,
+              'block_timeout': ... ,
           }
       }
   }
 
+A backend with a `BUFFER` (which may be empty to use the defaults) gets
+its events queued and sent in batches from a background thread; see
+:class:`track.backends.buffered.BufferedBackend`.
+
 """
 
 import inspect
@@ -26,6 +36,7 @@ from dogapi import dog_stats_api
 from django.conf import settings
 
 from track.backends import BaseBackend
+from track.backends.buffered import BufferedBackend
 
 
 __all__ = ['send']
@@ -49,7 +60,10 @@ def _initialize_backends_from_django_settings():
         if values:
             engine = values['ENGINE']
             options = values.get('OPTIONS', {})
-            backends[name] = _instantiate_backend_from_name(engine, options)
+            backend = _instantiate_backend_from_name(engine, options)
+            if values.get('BUFFER') is not None:
+                backend = BufferedBackend(backend, name=name, **values['BUFFER'])
+            backends[name] = backend
 
 
 def _instantiate_backend_from_name(name, options):
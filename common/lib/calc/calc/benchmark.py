@@ -0,0 +1,88 @@
+"""
+A microbenchmark of evaluating math expressions with calc.
+
+Run it with `python -m calc.benchmark [repetitions]`. For each expression it reports the
+microseconds per evaluation of:
+  parse+reduce: parsing the expression anew and reducing its tree w/ the eval_* actions (what
+      the evaluator did before parses got cached and compiled)
+  evaluator: calc.evaluator, which reuses the cached parse and compiled tree
+  compiled: calling the compiled tree directly (e.g. once per sample point)
+"""
+import sys
+import timeit
+
+import numpy
+
+import calc
+
+# Expressions like those the tests and problems use
+EXPRESSIONS = [
+    "13",
+    "-.618033989",
+    "2.25k",
+    "1||1||2",
+    "5*pi/4",
+    "sin(pi/6)",
+    "arcsin(1.298 + 0.635*j)",
+    "x^2 + 3*x - 7",
+    "(R1 || R2) * 2 + R1/R2",
+    "sqrt(x^2 + y^2) / (1 + exp(-x*y))",
+    "x^y^2 - 4*x*y + cos(x)*sin(y) - tan(x/y)",
+]
+
+VARIABLES = {'x': 1.5, 'y': 0.75, 'R1': 3.3e3, 'R2': 4.7e3}
+
+
+def parse_and_reduce(variables, functions, math_expr):
+    """
+    Evaluate `math_expr` as the evaluator did before parses got cached and compiled
+    """
+    all_variables, all_functions = calc.add_defaults(variables, functions, False)
+    # the ParseAugmenter built its grammar for every parse
+    parsed = calc.ParsedExpression(calc.build_grammar().parseString(math_expr)[0])
+    math_interpreter = calc.ParseAugmenter(math_expr)
+    math_interpreter.tree = parsed.tree
+    math_interpreter.variables_used = parsed.variables_used
+    math_interpreter.functions_used = parsed.functions_used
+    math_interpreter.check_variables(all_variables, all_functions)
+    return math_interpreter.reduce_tree({
+        'number': calc.eval_number,
+        'variable': lambda x: all_variables[x[0].lower()],
+        'function': lambda x: all_functions[x[0].lower()](x[1]),
+        'atom': calc.eval_atom,
+        'power': calc.eval_power,
+        'parallel': calc.eval_parallel,
+        'product': calc.eval_product,
+        'sum': calc.eval_sum,
+    })
+
+
+def time_expression(math_expr, repetitions):
+    """
+    Return the microseconds per evaluation of `math_expr` each way
+    """
+    all_variables, all_functions = calc.add_defaults(VARIABLES, {}, False)
+    parsed = calc.ParseAugmenter(math_expr)
+    parsed.parse_algebra()
+    compiled = parsed.compile_tree()
+
+    timings = [
+        timeit.timeit(lambda: parse_and_reduce(VARIABLES, {}, math_expr), number=repetitions),
+        timeit.timeit(lambda: calc.evaluator(VARIABLES, {}, math_expr), number=repetitions),
+        timeit.timeit(lambda: compiled(all_variables, all_functions), number=repetitions),
+    ]
+    return [timing * 1e6 / repetitions for timing in timings]
+
+
+def main(repetitions=1000):
+    """
+    Print the timings of every expression
+    """
+    numpy.seterr(all='ignore')
+    print "{:<45}{:>15}{:>15}{:>15}".format("expression (usec per evaluation)", "parse+reduce", "evaluator", "compiled")
+    for math_expr in EXPRESSIONS:
+        print "{:<45}{:>15.1f}{:>15.1f}{:>15.1f}".format(math_expr, *time_expression(math_expr, repetitions))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
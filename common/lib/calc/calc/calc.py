@@ -2,11 +2,18 @@
 Parser and evaluator for FormulaResponse and NumericalResponse
 
 Uses pyparsing to parse. Main function as of now is evaluator().
+
+The grammar gets built once per process and the parses of the most recently used
+expressions are cached along with their compiled forms (trees of closures); so,
+evaluating an expression again (e.g. at another sample point) needn't reparse it.
 """
 
 import math
 import operator
 import numbers
+import threading
+from collections import OrderedDict
+
 import numpy
 import scipy.constants
 import functions
@@ -50,6 +57,11 @@ DEFAULT_FUNCTIONS = {
     'arccsch': functions.arccsch,
     'arccoth': functions.arccoth
 }
+# The default functions which aren't numpy ufuncs but take arrays all the same
+ARRAY_FUNCTIONS = frozenset([
+    functions.sec, functions.csc, functions.cot, functions.arcsec, functions.arccsc,
+    functions.sech, functions.csch, functions.coth, functions.arcsech, functions.arccsch, functions.arccoth,
+])
 DEFAULT_VARIABLES = {
     'i': numpy.complex(0, 1),
     'j': numpy.complex(0, 1),
@@ -72,6 +84,9 @@ SUFFIXES = {
     'c': 1e-2, 'm': 1e-3, 'u': 1e-6, 'n': 1e-9, 'p': 1e-12
 }
 
+# The number of parsed expressions to keep cached
+PARSE_CACHE_SIZE = 1024
+
 
 class UndefinedVariable(Exception):
     """
@@ -162,6 +177,17 @@ def eval_parallel(parse_result):
     return 1. / sum(reciprocals)
 
 
+def eval_parallel_arrays(values):
+    """
+    Compute the parallel resistors operator as `eval_parallel` does for
+    values some of which are numpy arrays, elementwise.
+    """
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        parallel = 1. / sum(1. / value for value in values)
+    has_zero = reduce(numpy.logical_or, [numpy.equal(value, 0) for value in values])
+    return numpy.where(has_zero, float('nan'), parallel)
+
+
 def eval_sum(parse_result):
     """
     Add the inputs, keeping in mind their sign.
@@ -238,24 +264,326 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     # ...and check them
     math_interpreter.check_variables(all_variables, all_functions)
 
-    # Create a recursion to evaluate the tree.
-    if case_sensitive:
-        casify = lambda x: x
-    else:
-        casify = lambda x: x.lower()  # Lowercase for case insens.
+    # Evaluate the compiled tree.
+    return math_interpreter.compile_tree()(all_variables, all_functions)
+
+
+def evaluate_samples(variables, functions, math_expr, case_sensitive=False):
+    """
+    Evaluate an expression at many samples at once; that is, take a string of
+    math and return a numpy array of the results, one per sample.
+
+    -Variables are passed as a dictionary from string to either a numpy array
+     of the values at each sample (all of the same length) or a python number
+     which is the same at every sample.
+    -Unary functions are passed as a dictionary from string to function. Those
+     which can't take arrays (anything but numpy ufuncs and ARRAY_FUNCTIONS)
+     get called on each sample's value in turn.
+
+    The expression gets evaluated once, with numpy doing the arithmetic over
+    all the samples. Where the evaluator would raise an error for a sample
+    (e.g. raising a negative number to a fractional power), numpy may give a
+    nan or inf result instead; so, callers that need the evaluator's errors
+    should evaluate the samples with non-finite results one at a time.
+    """
+    # (numpy 1.6 has no broadcast_to or full, and its broadcast needs two arrays)
+    shape = ()
+    for value in variables.itervalues():
+        if isinstance(value, numpy.ndarray):
+            shape = numpy.broadcast(numpy.empty(shape), value).shape
+
+    # No need to go further.
+    if math_expr.strip() == "":
+        nans = numpy.empty(shape)
+        nans.fill(float('nan'))
+        return nans
+
+    # Parse the tree.
+    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
+    math_interpreter.parse_algebra()
+
+    # Get our variables together.
+    all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
+
+    # ...and check them
+    math_interpreter.check_variables(all_variables, all_functions)
+
+    array_functions = dict(
+        (name, array_function(function)) for name, function in all_functions.iteritems()
+    )
+    result = math_interpreter.compile_tree()(all_variables, array_functions)
+    # An expression without any variables gives the same result for every sample.
+    return result * numpy.ones(shape)
+
+
+def array_function(function):
+    """
+    Return a version of the unary function `function` which takes numpy arrays.
+    """
+    if isinstance(function, numpy.ufunc) or function in ARRAY_FUNCTIONS:
+        return function
+
+    def elementwise(arg):
+        """
+        Call `function` on each element of an array
+        """
+        if not isinstance(arg, numpy.ndarray):
+            return function(arg)
+        return numpy.array([function(value) for value in arg.flat]).reshape(arg.shape)
+    return elementwise
+
+
+class LRUCache(object):
+    """
+    A thread-safe mapping which holds at most `size` items, evicting the least
+    recently used one when full.
+    """
+    def __init__(self, size):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the value for `key` (marking it as the most recently used), or `default`.
+        """
+        with self._lock:
+            try:
+                value = self._items.pop(key)
+            except KeyError:
+                return default
+            self._items[key] = value
+            return value
+
+    def set(self, key, value):
+        """
+        Set the value for `key`, evicting the least recently used item if need be.
+        """
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = value
+            if len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all the items.
+        """
+        with self._lock:
+            self._items.clear()
+
+
+class ParsedExpression(object):
+    """
+    The parse of a math expression: its tree and the variables and functions it
+    uses (as they're spelled in it), which don't depend on any evaluation.
+
+    Its compiled forms get cached on it, one per case sensitivity.
+    """
+    def __init__(self, tree):
+        self.tree = tree
+        self.variables_used = set()
+        self.functions_used = set()
+        self._compiled = {}
+
+        nodes = [tree]
+        while nodes:
+            node = nodes.pop()
+            if not isinstance(node, ParseResults):
+                continue
+            if node.getName() == 'variable':
+                self.variables_used.add(node[0])
+            elif node.getName() == 'function':
+                self.functions_used.add(node[0])
+            nodes.extend(node)
+
+    def compile(self, case_sensitive=False):
+        """
+        Return a function of `(variables, functions)`, dictionaries w/ the
+        defaults already added (see `add_defaults`), which evaluates the
+        expression w/ them as `evaluator` does.
+        """
+        compiled = self._compiled.get(case_sensitive)
+        if compiled is None:
+            casify = (lambda x: x) if case_sensitive else (lambda x: x.lower())
+            compiled = self._compiled[case_sensitive] = compile_node(self.tree, casify)
+        return compiled
 
-    evaluate_actions = {
-        'number': eval_number,
-        'variable': lambda x: all_variables[casify(x[0])],
-        'function': lambda x: all_functions[casify(x[0])](x[1]),
-        'atom': eval_atom,
-        'power': eval_power,
-        'parallel': eval_parallel,
-        'product': eval_product,
-        'sum': eval_sum
-    }
 
-    return math_interpreter.reduce_tree(evaluate_actions)
+def compile_node(node, casify):
+    """
+    Return a closure of `(variables, functions)` which evaluates the parse tree
+    `node` as the eval_* actions would, but w/ the tree's structure (which of a
+    node's children are operators and parentheses) worked out once, here.
+    """
+    node_name = node.getName()
+    if node_name == 'number':
+        value = eval_number(node)
+        return lambda variables, functions: value
+
+    if node_name == 'variable':
+        name = casify(node[0])
+        return lambda variables, functions: variables[name]
+
+    if node_name == 'function':
+        name = casify(node[0])
+        argument = compile_node(node[1], casify)
+        return lambda variables, functions: functions[name](argument(variables, functions))
+
+    # the compiled children which aren't operators or parentheses, and the operators preceding them
+    operands = []
+    operators = []
+    last_operator = None
+    for child in node:
+        if isinstance(child, ParseResults):
+            operands.append(compile_node(child, casify))
+            operators.append(last_operator)
+        else:
+            last_operator = child
+
+    if node_name == 'atom':
+        # The value of the number, function, variable or parenthesized expression
+        return operands[0]
+
+    if node_name == 'power':
+        if len(operands) == 1:
+            return operands[0]
+        reversed_operands = operands[::-1]
+
+        def evaluate_power(variables, functions):
+            """Exponentiate right to left"""
+            return reduce(lambda a, b: b ** a, [operand(variables, functions) for operand in reversed_operands])
+        return evaluate_power
+
+    if node_name == 'parallel':
+        if len(operands) == 1:
+            return operands[0]
+
+        def evaluate_parallel(variables, functions):
+            """Compute the parallel resistors operator"""
+            values = [operand(variables, functions) for operand in operands]
+            if any(isinstance(value, numpy.ndarray) for value in values):
+                return eval_parallel_arrays(values)
+            return eval_parallel(values)
+        return evaluate_parallel
+
+    if node_name == 'product':
+        steps = [
+            (operator.truediv if operator_name == '/' else operator.mul, operand)
+            for operator_name, operand in zip(operators, operands)
+        ]
+
+        def evaluate_product(variables, functions):
+            """Multiply and divide left to right"""
+            prod = 1.0
+            for operation, operand in steps:
+                prod = operation(prod, operand(variables, functions))
+            return prod
+        return evaluate_product
+
+    if node_name == 'sum':
+        steps = [
+            (operator.sub if operator_name == '-' else operator.add, operand)
+            for operator_name, operand in zip(operators, operands)
+        ]
+
+        def evaluate_sum(variables, functions):
+            """Add and subtract left to right"""
+            total = 0.0
+            for operation, operand in steps:
+                total = operation(total, operand(variables, functions))
+            return total
+        return evaluate_sum
+
+    raise Exception(u"Unknown branch name '{}'".format(node_name))  # pragma: no cover
+
+
+# The grammar, built by get_grammar
+_GRAMMAR = None
+# The ParsedExpressions of the most recently parsed expressions, by expression
+_PARSE_CACHE = LRUCache(PARSE_CACHE_SIZE)
+
+
+def get_grammar():
+    """
+    Return the pyparsing grammar for algebraic expressions, building it the
+    first time. It's stateless (it doesn't record what it parses); so, the
+    same one serves every parse.
+    """
+    global _GRAMMAR  # pylint: disable=global-statement
+    if _GRAMMAR is None:
+        _GRAMMAR = build_grammar()
+    return _GRAMMAR
+
+
+def build_grammar():
+    """
+    Build the pyparsing grammar which parses an algebraic expression into a tree
+    w/ proper groupings to reflect parenthesis and order of operations. It leaves
+    all operators in the tree and does not parse any strings of numbers into their
+    float versions.
+    """
+    # 0.33 or 7 or .34 or 16.
+    number_part = Word(nums)
+    inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
+    # pyparsing allows spaces between tokens--`Combine` prevents that.
+    inner_number = Combine(inner_number)
+
+    # SI suffixes and percent.
+    number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
+
+    # 0.33k or 17
+    plus_minus = Literal('+') | Literal('-')
+    number = Group(
+        Optional(plus_minus) +
+        inner_number +
+        Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
+        Optional(number_suffix)
+    )
+    number = number("number")
+
+    # Predefine recursive variables.
+    expr = Forward()
+
+    # Handle variables passed in. They must start with letters/underscores
+    # and may contain numbers afterward.
+    inner_varname = Word(alphas + "_", alphanums + "_")
+    varname = Group(inner_varname)("variable")
+
+    # Same thing for functions.
+    function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
+
+    atom = number | function | varname | "(" + expr + ")"
+    atom = Group(atom)("atom")
+
+    # Do the following in the correct order to preserve order of operation.
+    pow_term = atom + ZeroOrMore("^" + atom)
+    pow_term = Group(pow_term)("power")
+
+    par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
+    par_term = Group(par_term)("parallel")
+
+    prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
+    prod_term = Group(prod_term)("product")
+
+    sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
+    sum_term = Group(sum_term)("sum")
+
+    # Finish the recursion.
+    expr << sum_term  # pylint: disable=W0104
+    return expr + stringEnd
+
+
+def parse_expression(math_expr):
+    """
+    Return the ParsedExpression of `math_expr`, parsing it only if it's not cached.
+    Raises pyparsing's ParseException if it can't be parsed.
+    """
+    parsed = _PARSE_CACHE.get(math_expr)
+    if parsed is None:
+        parsed = ParsedExpression(get_grammar().parseString(math_expr)[0])
+        _PARSE_CACHE.set(math_expr, parsed)
+    return parsed
 
 
 class ParseAugmenter(object):
@@ -277,23 +605,7 @@ class ParseAugmenter(object):
         self.tree = None
         self.variables_used = set()
         self.functions_used = set()
-
-        def vpa(tokens):
-            """
-            When a variable is recognized, store it in `variables_used`.
-            """
-            varname = tokens[0][0]
-            self.variables_used.add(varname)
-
-        def fpa(tokens):
-            """
-            When a function is recognized, store it in `functions_used`.
-            """
-            varname = tokens[0][0]
-            self.functions_used.add(varname)
-
-        self.variable_parse_action = vpa
-        self.function_parse_action = fpa
+        self.parsed = None
 
     def parse_algebra(self):
         """
@@ -302,62 +614,22 @@ class ParseAugmenter(object):
         Store a `pyparsing.ParseResult` in `self.tree` with proper groupings to
         reflect parenthesis and order of operations. Leave all operators in the
         tree and do not parse any strings of numbers into their float versions.
+        The parse comes from the cache if the expression was recently parsed.
 
         Adding the groups and result names makes the `repr()` of the result
         really gross. For debugging, use something like
           print OBJ.tree.asXML()
         """
-        # 0.33 or 7 or .34 or 16.
-        number_part = Word(nums)
-        inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
-        # pyparsing allows spaces between tokens--`Combine` prevents that.
-        inner_number = Combine(inner_number)
-
-        # SI suffixes and percent.
-        number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
-
-        # 0.33k or 17
-        plus_minus = Literal('+') | Literal('-')
-        number = Group(
-            Optional(plus_minus) +
-            inner_number +
-            Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
-            Optional(number_suffix)
-        )
-        number = number("number")
-
-        # Predefine recursive variables.
-        expr = Forward()
-
-        # Handle variables passed in. They must start with letters/underscores
-        # and may contain numbers afterward.
-        inner_varname = Word(alphas + "_", alphanums + "_")
-        varname = Group(inner_varname)("variable")
-        varname.setParseAction(self.variable_parse_action)
-
-        # Same thing for functions.
-        function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
-        function.setParseAction(self.function_parse_action)
-
-        atom = number | function | varname | "(" + expr + ")"
-        atom = Group(atom)("atom")
-
-        # Do the following in the correct order to preserve order of operation.
-        pow_term = atom + ZeroOrMore("^" + atom)
-        pow_term = Group(pow_term)("power")
-
-        par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
-        par_term = Group(par_term)("parallel")
-
-        prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
-        prod_term = Group(prod_term)("product")
-
-        sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
-        sum_term = Group(sum_term)("sum")
-
-        # Finish the recursion.
-        expr << sum_term  # pylint: disable=W0104
-        self.tree = (expr + stringEnd).parseString(self.math_expr)[0]
+        self.parsed = parse_expression(self.math_expr)
+        self.tree = self.parsed.tree
+        self.variables_used = set(self.parsed.variables_used)
+        self.functions_used = set(self.parsed.functions_used)
+
+    def compile_tree(self):
+        """
+        Return the compiled form of the parsed tree (see `ParsedExpression.compile`).
+        """
+        return self.parsed.compile(self.case_sensitive)
 
     def reduce_tree(self, handle_actions, terminal_converter=None):
         """
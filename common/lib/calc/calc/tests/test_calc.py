@@ -558,3 +558,114 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+
+class ParseCacheTest(unittest.TestCase):
+    """
+    Test that parses get cached and compiled parse trees evaluate as the evaluator does
+    """
+
+    def test_parse_reused(self):
+        """
+        Parsing the same expression again gives the cached tree
+        """
+        first = calc.ParseAugmenter('x^2 + sin(y)')
+        first.parse_algebra()
+        second = calc.ParseAugmenter('x^2 + sin(y)')
+        second.parse_algebra()
+        self.assertIs(first.tree, second.tree)
+        self.assertEqual(second.variables_used, set(['x', 'y']))
+        self.assertEqual(second.functions_used, set(['sin']))
+
+        # the sets are the instance's own
+        second.variables_used.add('z')
+        self.assertEqual(first.variables_used, set(['x', 'y']))
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = calc.LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_compiled_matches_evaluator(self):
+        """
+        A compiled tree evaluates each set of variables as the evaluator would
+        """
+        math_expr = "-x^2^y/3 + 2*X*y - (y || 2k) + sqrt(x)*5%"
+        parsed = calc.ParseAugmenter(math_expr, case_sensitive=True)
+        parsed.parse_algebra()
+        compiled = parsed.compile_tree()
+        for x_value, y_value in [(1.5, 2), (3, 0.5), (2, 0), (0.25, -1)]:
+            variables = {'x': x_value, 'X': 2 * x_value, 'y': y_value}
+            all_variables, all_functions = calc.add_defaults(variables, {}, True)
+            expected = calc.evaluator(variables, {}, math_expr, case_sensitive=True)
+            result = compiled(all_variables, all_functions)
+            if numpy.isnan(expected):
+                self.assertTrue(numpy.isnan(result))
+            else:
+                self.assertAlmostEqual(result, expected)
+
+    def test_parse_error_not_cached(self):
+        """
+        Expressions which don't parse raise each time
+        """
+        for __ in range(2):
+            with self.assertRaises(ParseException):
+                calc.evaluator({}, {}, "1 + * 2")
+
+
+class EvaluateSamplesTest(unittest.TestCase):
+    """
+    Test calc.evaluate_samples, which evaluates an expression at many samples at once
+    """
+
+    def assert_matches_evaluator(self, math_expr, variables, functions=None, case_sensitive=False):
+        """
+        Check that evaluate_samples gives what evaluator gives for each sample
+        """
+        functions = functions or {}
+        results = calc.evaluate_samples(variables, functions, math_expr, case_sensitive)
+        num_samples = len(results)
+        for index in range(num_samples):
+            sample = dict(
+                (name, value[index] if isinstance(value, numpy.ndarray) else value)
+                for name, value in variables.iteritems()
+            )
+            expected = calc.evaluator(sample, functions, math_expr, case_sensitive)
+            if numpy.isnan(expected):
+                self.assertTrue(numpy.isnan(results[index]), math_expr)
+            else:
+                self.assertAlmostEqual(results[index], expected, msg=math_expr)
+        return results
+
+    def test_expressions(self):
+        variables = {'x': numpy.array([0.5, 1.0, 2.5, 4.0]), 'y': numpy.array([1.0, 3.0, 0.25, 2.0]), 'z': 2.0}
+        for math_expr in [
+            "x", "-x + 3*y - z", "x^y^2", "x/y/z", "2.25k*x + 4.2%*y", "x || y || 1", "(x - 1) || y",
+            "sin(x) + sec(y) - arccot(x - 2)", "sqrt(x - 3) + j*x", "x*e^(i*pi*y)", "fact(z) + x",
+        ]:
+            results = self.assert_matches_evaluator(math_expr, variables)
+            self.assertEqual(results.shape, (4,))
+
+    def test_case_sensitive_and_functions(self):
+        variables = {'x': numpy.array([1.0, 2.0]), 'X': numpy.array([10.0, 20.0])}
+        functions = {'f': lambda value: value + 1}
+        self.assert_matches_evaluator("x*X + f(x)", variables, functions, case_sensitive=True)
+
+    def test_constant(self):
+        """
+        An expression without variables gives a result per sample
+        """
+        results = calc.evaluate_samples({'x': numpy.zeros(3)}, {}, "1 + j")
+        self.assertEqual(list(results), [1 + 1j] * 3)
+        self.assertTrue(numpy.isnan(calc.evaluate_samples({'x': numpy.zeros(3)}, {}, "")).all())
+
+    def test_errors(self):
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'y'):
+            calc.evaluate_samples({'x': numpy.zeros(3)}, {}, "x + y")
+        with self.assertRaises(ValueError):
+            calc.evaluate_samples({'x': numpy.array([1.0, 1.5])}, {}, "fact(x)")
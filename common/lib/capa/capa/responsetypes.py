@@ -36,13 +36,13 @@ from shapely.geometry import Point, MultiPoint
 from dogapi import dog_stats_api
 
 # specific library imports
-from calc import evaluator, UndefinedVariable
+from calc import evaluator, evaluate_samples, UndefinedVariable
 from . import correctmap
 from .registry import TagRegistry
 from datetime import datetime
 from pytz import UTC
 from .util import (
-    compare_with_tolerance, contextualize_text, convert_files_to_filenames,
+    compare_with_tolerance, compare_arrays_with_tolerance, contextualize_text, convert_files_to_filenames,
     is_list_of_files, find_with_default, default_tolerance
 )
 from lxml import etree
@@ -2307,7 +2307,32 @@ class FormulaResponse(LoncapaResponse):
         """
         Takes in an answer and a list of dictionaries mapping variables to values.
         Each dictionary represents a test case for the answer.
-        Returns a tuple of formula evaluation results.
+        Returns a numpy array of formula evaluation results.
+
+        The answer gets evaluated at all the test cases at once, falling back to
+        evaluating it at each in turn (to raise the errors the evaluator raises
+        for any test case) if that fails or gives any non-finite results.
+        """
+        if var_dict_list:
+            sample_arrays = dict(
+                (var, numpy.array([var_dict[var] for var_dict in var_dict_list]))
+                for var in var_dict_list[0]
+            )
+            try:
+                with numpy.errstate(all='ignore'):
+                    out = evaluate_samples(sample_arrays, dict(), answer, case_sensitive=self.case_sensitive)
+                if len(out) == len(var_dict_list) and numpy.isfinite(out).all():
+                    return out
+            except (UndefinedVariable, ParseException, ArithmeticError, ValueError, TypeError):
+                # the errors a bad answer gives; evaluating one test case at a time reports them
+                pass
+        return numpy.array(self.tupleize_answers_one_at_a_time(answer, var_dict_list))
+
+    def tupleize_answers_one_at_a_time(self, answer, var_dict_list):
+        """
+        Takes in an answer and a list of dictionaries mapping variables to values.
+        Returns a list of the results of evaluating the answer at each, raising
+        StudentInputError at the first one where it can't be evaluated.
         """
         _ = self.capa_system.i18n.ugettext
 
@@ -2394,8 +2419,7 @@ class FormulaResponse(LoncapaResponse):
         student_result = self.tupleize_answers(given, var_dict_list)
         instructor_result = self.tupleize_answers(expected, var_dict_list)
 
-        correct = all(compare_with_tolerance(student, instructor, self.tolerance)
-                      for student, instructor in zip(student_result, instructor_result))
+        correct = compare_arrays_with_tolerance(student_result, instructor_result, self.tolerance).all()
         if correct:
             return "correct"
         else:
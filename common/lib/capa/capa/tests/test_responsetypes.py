@@ -377,6 +377,22 @@ class FormulaResponseTest(ResponseTest):
         input_formula = "x + y"
         self.assert_grade(problem, input_formula, "incorrect")
 
+    def test_evaluate_samples_at_once(self):
+        """
+        Test that evaluating a formula at all the samples at once gives the
+        results of evaluating it at each sample
+        """
+        sample_dict = {'x': (-10, 10), 'y': (1, 5)}
+        problem = self.build_problem(sample_dict=sample_dict, num_samples=50, tolerance=0.01, answer="x+2*y")
+        responder = problem.responders.values()[0]
+        var_dict_list = responder.randomize_variables(responder.samples)
+        for formula in ["x^2 - sin(y)*j", "abs(x) || y", "y^(1/3) + 4.5k*x", "fact(3)*x"]:
+            results = responder.tupleize_answers(formula, var_dict_list)
+            expected = [calc.evaluator(var_dict, {}, formula) for var_dict in var_dict_list]
+            self.assertEqual(len(results), len(expected))
+            for result, expected_result in zip(results, expected):
+                self.assertAlmostEqual(result, expected_result)
+
     def test_hint(self):
         """
         Test the hint-giving functionality of FormulaResponse
@@ -4,7 +4,7 @@ Tests capa util
 import unittest
 import textwrap
 from . import test_capa_system
-from capa.util import compare_with_tolerance, sanitize_html
+from capa.util import compare_with_tolerance, compare_arrays_with_tolerance, sanitize_html
 
 
 class UtilTest(unittest.TestCase):
@@ -82,6 +82,23 @@ class UtilTest(unittest.TestCase):
         result = compare_with_tolerance(infinity, infinity, '1.0', False)
         self.assertTrue(result)
 
+    def test_compare_arrays_with_tolerance(self):
+        infinity = float('Inf')
+        student = [100.0, 100.001, 101.0, 109.9, 110.1, infinity, infinity, 100.0, float('nan')]
+        instructor = [100.0, 100.0, 100.0, 100.0, 100.0, infinity, 100.0, infinity, 100.0]
+        for tolerance, relative_tolerance in [
+                ('0.001%', False), ('10%', False), ('10%', True), ('10.0', False), ('0.1', True), (10.0, False)
+        ]:
+            results = compare_arrays_with_tolerance(student, instructor, tolerance, relative_tolerance)
+            # the same as comparing each pair
+            self.assertEqual(
+                list(results),
+                [
+                    compare_with_tolerance(student_value, instructor_value, tolerance, relative_tolerance)
+                    for student_value, instructor_value in zip(student, instructor)
+                ]
+            )
+
 
     def test_sanitize_html(self):
         """
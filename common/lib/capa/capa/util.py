@@ -2,6 +2,7 @@
 Utility functions for capa.
 """
 import bleach
+import numpy
 
 from calc import evaluator
 from cmath import isinf
@@ -70,6 +71,44 @@ def compare_with_tolerance(student_complex, instructor_complex, tolerance=defaul
         return abs(student_complex - instructor_complex) <= tolerance
 
 
+def compare_arrays_with_tolerance(student_array, instructor_array, tolerance=default_tolerance,
+                                  relative_tolerance=False):
+    """
+    Compare the arrays of student results and instructor results elementwise, as
+    compare_with_tolerance compares a single pair of results, and return a numpy
+    array of booleans.
+
+     - student_array    :  numpy array of student results (float complex numbers)
+     - instructor_array    :  numpy array of instructor results, of the same length
+     - tolerance   :  float, or string (representing a float or a percentage)
+     - relative_tolerance: bool, to explicitly use passed tolerance as relative
+    """
+    student_array = numpy.asarray(student_array)
+    instructor_array = numpy.asarray(instructor_array)
+
+    if isinstance(tolerance, str):
+        if tolerance == default_tolerance:
+            relative_tolerance = True
+        if tolerance.endswith('%'):
+            tolerance = evaluator(dict(), dict(), tolerance[:-1]) * 0.01
+            if not relative_tolerance:
+                tolerance = tolerance * numpy.abs(instructor_array)
+        else:
+            tolerance = evaluator(dict(), dict(), tolerance)
+
+    if relative_tolerance:
+        tolerance = tolerance * numpy.maximum(numpy.abs(student_array), numpy.abs(instructor_array))
+
+    # Compare infinite results directly (see compare_with_tolerance).
+    with numpy.errstate(invalid='ignore'):
+        within_tolerance = numpy.abs(student_array - instructor_array) <= tolerance
+    return numpy.where(
+        numpy.isinf(student_array) | numpy.isinf(instructor_array),
+        student_array == instructor_array,
+        within_tolerance
+    )
+
+
 def contextualize_text(text, context):  # private
     """
     Takes a string with variables. E.g. $a+$b.
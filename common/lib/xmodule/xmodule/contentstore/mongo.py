@@ -82,7 +82,7 @@ class MongoContentStore(ContentStore):
                     location, fp.displayname, fp.content_type, fp, last_modified_at=fp.uploadDate,
                     thumbnail_location=thumbnail_location,
                     import_path=getattr(fp, 'import_path', None),
-                    length=fp.length, locked=getattr(fp, 'locked', False)
+                    length=fp.length, locked=getattr(fp, 'locked', False), content_digest=getattr(fp, 'md5', None)
                 )
             else:
                 with self.fs.get(content_id) as fp:
@@ -93,7 +93,8 @@ class MongoContentStore(ContentStore):
                         location, fp.displayname, fp.content_type, fp.read(), last_modified_at=fp.uploadDate,
                         thumbnail_location=thumbnail_location,
                         import_path=getattr(fp, 'import_path', None),
-                        length=fp.length, locked=getattr(fp, 'locked', False)
+                        length=fp.length, locked=getattr(fp, 'locked', False),
+                        content_digest=getattr(fp, 'md5', None)
                     )
         except NoFile:
             if throw_on_not_found:
@@ -7,6 +7,7 @@ import logging
 import re
 import json
 import datetime
+import threading
 
 from collections import namedtuple, defaultdict
 import collections
@@ -430,6 +431,28 @@ class ModuleStoreReadBase(ModuleStoreRead):
         # default is to say yes by not raising an exception
         return {'default_impl': True}
 
+
+class MemoizedMixologist(Mixologist):
+    """
+    A Mixologist which memoizes the mixed classes process-wide by (class, mixins) so that all of the
+    runtimes and stores using the same mixins share one mixed class per block type rather than each
+    constructing their own on every load.
+    """
+    _mixed_classes = {}
+    _lock = threading.Lock()
+
+    def mix(self, cls):
+        key = (cls, tuple(self._mixins))
+        mixed_class = self._mixed_classes.get(key)
+        if mixed_class is None:
+            with self._lock:
+                mixed_class = self._mixed_classes.get(key)
+                if mixed_class is None:
+                    mixed_class = super(MemoizedMixologist, self).mix(cls)
+                    self._mixed_classes[key] = mixed_class
+        return mixed_class
+
+
 class ModuleStoreWriteBase(ModuleStoreReadBase, ModuleStoreWrite):
     '''
     Implement interface functionality that can be shared.
@@ -439,7 +462,7 @@ class ModuleStoreWriteBase(ModuleStoreReadBase, ModuleStoreWrite):
         # TODO: Don't have a runtime just to generate the appropriate mixin classes (cpennington)
         # This is only used by partition_fields_by_scope, which is only needed because
         # the split mongo store is used for item creation as well as item persistence
-        self.mixologist = Mixologist(self.xblock_mixins)
+        self.mixologist = MemoizedMixologist(self.xblock_mixins)
 
     def partition_fields_by_scope(self, category, fields):
         """
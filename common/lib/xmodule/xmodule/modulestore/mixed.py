@@ -5,7 +5,9 @@ In this way, courses can be served up both - say - XMLModuleStore or MongoModule
 
 """
 
+import cPickle
 import logging
+import zlib
 from uuid import uuid4
 from contextlib import contextmanager
 from opaque_keys import InvalidKeyError
@@ -25,17 +27,56 @@ import itertools
 log = logging.getLogger(__name__)
 
 
+class CourseSnapshot(object):
+    """
+    Everything an old mongo store needs to load any of a published course's blocks without querying:
+    the course's published records and its metadata inheritance tree. Snapshots are serialized into
+    compressed blobs for the cache.
+    """
+    def __init__(self, records, inheritance_tree):
+        self.records = records
+        self.inheritance_tree = inheritance_tree
+
+    def dumps(self):
+        """
+        Return the snapshot serialized and compressed
+        """
+        return zlib.compress(cPickle.dumps((self.records, self.inheritance_tree), cPickle.HIGHEST_PROTOCOL))
+
+    @classmethod
+    def loads(cls, blob):
+        """
+        Return the snapshot which dumps returned blob for
+        """
+        return cls(*cPickle.loads(zlib.decompress(blob)))
+
+
 class MixedModuleStore(ModuleStoreWriteBase):
     """
     ModuleStore knows how to route requests to the right persistence ms
     """
-    def __init__(self, mappings, stores, i18n_service=None, **kwargs):
+    # how long (in seconds) course snapshots stay cached. Writes through this store invalidate the
+    # course's snapshots; this bounds how long ones made stale by other writes get used.
+    COURSE_SNAPSHOT_TIMEOUT = 60 * 60
+    # the largest snapshot blob to cache: memcached's default item size limit (1MB) less room for
+    # the key and item overhead. Larger courses are marked as too large rather than cached.
+    COURSE_SNAPSHOT_MAX_SIZE = 1000 * 1000
+    # what the cache holds in place of a snapshot which is too large
+    COURSE_SNAPSHOT_TOO_LARGE = 'too large'
+    # how long (in seconds) one process gets to build a course's snapshot before another may try
+    COURSE_SNAPSHOT_BUILD_TIMEOUT = 60
+
+    def __init__(self, mappings, stores, i18n_service=None, course_snapshots=True, **kwargs):
         """
         Initialize a MixedModuleStore. Here we look into our passed in kwargs which should be a
         collection of other modulestore configuration information
+
+        If course_snapshots, published reads of old mongo courses get served from CourseSnapshots
+        kept in the metadata_inheritance_cache_subsystem.
         """
         super(MixedModuleStore, self).__init__(**kwargs)
 
+        self.course_snapshots = course_snapshots
         self.modulestores = []
         self.mappings = {}
 
@@ -117,11 +158,113 @@ class MixedModuleStore(ModuleStoreWriteBase):
                 return store
         return None
 
+    @staticmethod
+    def _course_snapshot_version_key(course_key):
+        """
+        The cache key for the course's current snapshot version
+        """
+        return u'course_snapshot_version/{}'.format(course_key)
+
+    def _get_course_snapshot_version(self, course_key):
+        """
+        Return the old mongo course's current snapshot version, making one up if it has none, or None
+        if there's no cache to keep it in
+        """
+        cache = self.metadata_inheritance_cache_subsystem
+        if cache is None:
+            return None
+        version_key = self._course_snapshot_version_key(course_key)
+        version = cache.get(version_key)
+        if version is None:
+            # another process may be doing the same; so, use whichever version got cached first
+            cache.add(version_key, uuid4().hex, self.COURSE_SNAPSHOT_TIMEOUT)
+            version = cache.get(version_key)
+        return version
+
+    def get_course_version(self, course_key):
+        """
+        Return an opaque token which changes whenever the course changes (e.g., is published) for
+        keying caches of things computed from the course, or None if the course's store can't tell
+        when it changes.
+
+        Old mongo courses' tokens are when their content was last edited (see
+        MongoModuleStore.get_course_version); unlike their snapshot versions, they don't expire. Split
+        courses' tokens are their versions.
+        """
+        store = self._get_modulestore_for_courseid(course_key)
+        if isinstance(store, MongoModuleStore):
+            return store.get_course_version(course_key)
+        elif isinstance(store, SplitMongoModuleStore):
+            try:
+                return unicode(store.get_course(course_key).id.version_guid)
+            except ItemNotFoundError:
+                return None
+        return None
+
+    def _use_course_snapshot(self, store, course_key):
+        """
+        If store is an old mongo store reading only published content, have it serve this request's
+        reads of the course from the course's current snapshot, building and caching the snapshot from
+        one query if there isn't one. Does nothing if the request has already fetched the course or if
+        there's no request in progress (e.g., in Celery tasks), as nothing would clear the snapshot after.
+
+        Only one process at a time (per COURSE_SNAPSHOT_BUILD_TIMEOUT) builds a course's snapshot;
+        the others, like requests for courses whose snapshots are too large to cache, just read from
+        the store as usual.
+        """
+        cache = self.metadata_inheritance_cache_subsystem
+        if not self.course_snapshots or cache is None or not isinstance(store, MongoModuleStore):
+            return
+        # pylint: disable=protected-access
+        if not store._in_request() or store._prefetch_includes_drafts():
+            return
+        course_key = store._fill_in_run(course_key)
+        if store._get_course_prefetch(course_key) is not None:
+            return
+
+        version = self._get_course_snapshot_version(course_key)
+        if version is None:
+            return
+        snapshot_key = u'course_snapshot/{}/{}'.format(course_key, version)
+
+        blob = cache.get(snapshot_key)
+        if blob == self.COURSE_SNAPSHOT_TOO_LARGE:
+            return
+        if blob is not None:
+            try:
+                snapshot = CourseSnapshot.loads(blob)
+            except Exception:  # pylint: disable=broad-except
+                log.warning("Unreadable course snapshot %s", snapshot_key, exc_info=True)
+            else:
+                store._install_course_snapshot(course_key, snapshot.records, snapshot.inheritance_tree)
+                return
+
+        if not cache.add(snapshot_key + u'/building', True, self.COURSE_SNAPSHOT_BUILD_TIMEOUT):
+            return
+        # building the snapshot leaves the course fetched in store's request_cache
+        data = store._get_course_snapshot_data(course_key)
+        if data is not None:
+            blob = CourseSnapshot(*data).dumps()
+            if len(blob) > self.COURSE_SNAPSHOT_MAX_SIZE:
+                log.info("Course snapshot %s is too large to cache (%d bytes)", snapshot_key, len(blob))
+                blob = self.COURSE_SNAPSHOT_TOO_LARGE
+            cache.set(snapshot_key, blob, self.COURSE_SNAPSHOT_TIMEOUT)
+
+    def _invalidate_course_snapshot(self, store, course_key):
+        """
+        Make the course's cached snapshots obsolete b/c the course has been written to
+        """
+        cache = self.metadata_inheritance_cache_subsystem
+        if cache is not None and isinstance(store, MongoModuleStore):
+            course_key = store._fill_in_run(course_key)  # pylint: disable=protected-access
+            cache.set(self._course_snapshot_version_key(course_key), uuid4().hex, self.COURSE_SNAPSHOT_TIMEOUT)
+
     def has_item(self, usage_key, **kwargs):
         """
         Does the course include the xblock who's id is reference?
         """
         store = self._get_modulestore_for_courseid(usage_key.course_key)
+        # not worth loading the course's snapshot for: it's a single query
         return store.has_item(usage_key, **kwargs)
 
     def get_item(self, usage_key, depth=0, **kwargs):
@@ -130,6 +273,7 @@ class MixedModuleStore(ModuleStoreWriteBase):
         We should be able to fix this when the data-model rearchitecting is done
         """
         store = self._get_modulestore_for_courseid(usage_key.course_key)
+        self._use_course_snapshot(store, usage_key.course_key)
         return store.get_item(usage_key, depth, **kwargs)
 
     def get_items(self, course_key, settings=None, content=None, **kwargs):
@@ -208,6 +352,7 @@ class MixedModuleStore(ModuleStoreWriteBase):
         """
         assert(isinstance(course_key, CourseKey))
         store = self._get_modulestore_for_courseid(course_key)
+        self._use_course_snapshot(store, course_key)
         try:
             return store.get_course(course_key, depth=depth)
         except ItemNotFoundError:
@@ -235,7 +380,9 @@ class MixedModuleStore(ModuleStoreWriteBase):
         assert(isinstance(course_key, CourseKey))
         store = self._get_modulestore_for_courseid(course_key)
         if hasattr(store, 'delete_course'):
-            return store.delete_course(course_key, user_id)
+            result = store.delete_course(course_key, user_id)
+            self._invalidate_course_snapshot(store, course_key)
+            return result
         else:
             raise NotImplementedError(u"Cannot delete a course on store {}".format(store))
 
@@ -293,7 +440,9 @@ class MixedModuleStore(ModuleStoreWriteBase):
         if not hasattr(store, 'create_course'):
             raise NotImplementedError(u"Cannot create a course on store {}".format(store))
 
-        return store.create_course(org, offering, user_id, fields, **kwargs)
+        course = store.create_course(org, offering, user_id, fields, **kwargs)
+        self._invalidate_course_snapshot(store, course.id)
+        return course
 
     def create_item(self, course_or_parent_loc, category, user_id=None, **kwargs):
         """
@@ -337,6 +486,7 @@ class MixedModuleStore(ModuleStoreWriteBase):
         else:
             raise NotImplementedError(u"Cannot create an item on store %s" % store)
 
+        self._invalidate_course_snapshot(store, course_id)
         return xblock
 
     def update_item(self, xblock, user_id, allow_not_found=False):
@@ -345,7 +495,9 @@ class MixedModuleStore(ModuleStoreWriteBase):
         (content, children, and metadata) attribute the change to the given user.
         """
         store = self._verify_modulestore_support(xblock.location, 'update_item')
-        return store.update_item(xblock, user_id, allow_not_found)
+        result = store.update_item(xblock, user_id, allow_not_found)
+        self._invalidate_course_snapshot(store, xblock.location.course_key)
+        return result
 
     def delete_item(self, location, user_id=None, **kwargs):
         """
@@ -353,6 +505,7 @@ class MixedModuleStore(ModuleStoreWriteBase):
         """
         store = self._verify_modulestore_support(location, 'delete_item')
         store.delete_item(location, user_id=user_id, **kwargs)
+        self._invalidate_course_snapshot(store, location.course_key)
 
     def close_all_connections(self):
         """
@@ -426,7 +579,9 @@ class MixedModuleStore(ModuleStoreWriteBase):
         Returns the newly published item.
         """
         store = self._verify_modulestore_support(location, 'publish')
-        return store.publish(location, user_id)
+        result = store.publish(location, user_id)
+        self._invalidate_course_snapshot(store, location.course_key)
+        return result
 
     def unpublish(self, location, user_id):
         """
@@ -434,7 +589,9 @@ class MixedModuleStore(ModuleStoreWriteBase):
         Returns the newly unpublished item.
         """
         store = self._verify_modulestore_support(location, 'unpublish')
-        return store.unpublish(location, user_id)
+        result = store.unpublish(location, user_id)
+        self._invalidate_course_snapshot(store, location.course_key)
+        return result
 
     def convert_to_draft(self, location, user_id):
         """
@@ -444,7 +601,9 @@ class MixedModuleStore(ModuleStoreWriteBase):
         :param source: the location of the source (its revision must be None)
         """
         store = self._verify_modulestore_support(location, 'convert_to_draft')
-        return store.convert_to_draft(location, user_id)
+        result = store.convert_to_draft(location, user_id)
+        self._invalidate_course_snapshot(store, location.course_key)
+        return result
 
     def _verify_modulestore_support(self, location, method):
         """
@@ -17,6 +17,8 @@ import sys
 import logging
 import copy
 import re
+from collections import defaultdict
+from uuid import uuid4
 
 from bson.son import SON
 from fs.osfs import OSFS
@@ -130,6 +132,221 @@ class MongoKeyValueStore(InheritanceKeyValueStore):
             return False
 
 
+class MetadataInheritanceTree(object):
+    """
+    The metadata each block in a course inherits, keyed by the blocks' location urls.
+
+    Rather than materializing a dict of inherited metadata per block, this records each block's parent
+    and, for containers, only the inheritable metadata they set themselves. What a block inherits is
+    resolved lazily on lookup by overlaying those deltas from the root down. Resolved dicts are memoized
+    and shared copy-on-write: a container which doesn't set any inheritable field shares its parent's dict.
+    This keeps both the computation and the pickled size (for memcached) proportional to the number of
+    blocks plus the number of explicitly set inheritable fields.
+
+    Lookups support the read-only subset of the dict api used by the runtime (get, [], in). Callers must
+    not modify the returned dicts.
+    """
+    def __init__(self):
+        # location url -> its parent's location url (None for the root)
+        self.parents = {}
+        # location url -> the inheritable metadata set on that container (only if any)
+        self.deltas = {}
+        self._resolved = {}
+
+    def __getstate__(self):
+        # don't pickle the memoized resolutions
+        return {'parents': self.parents, 'deltas': self.deltas}
+
+    def __setstate__(self, state):
+        self.parents = state['parents']
+        self.deltas = state['deltas']
+        self._resolved = {}
+
+    def __len__(self):
+        return len(self.parents)
+
+    def __contains__(self, url):
+        return url in self.parents
+
+    def __getitem__(self, url):
+        if url not in self.parents:
+            raise KeyError(url)
+        return self._resolve(url)
+
+    def get(self, url, default=None):
+        """
+        Return the metadata which the block at url inherits or default if url is not in the tree
+        """
+        if url not in self.parents:
+            return default
+        return self._resolve(url)
+
+    def add(self, url, parent_url, metadata=None):
+        """
+        Record the block at url as a child of parent_url which sets the given inheritable metadata
+        (leaves' metadata doesn't pass to anyone so don't give it for them).
+        """
+        self.parents[url] = parent_url
+        if metadata:
+            self.deltas[url] = metadata
+        else:
+            self.deltas.pop(url, None)
+        self._resolved = {}
+
+    def remove_descendants(self, url):
+        """
+        Remove the entries for all of the blocks below url (but not url's own)
+        """
+        children = defaultdict(list)
+        for child_url, parent_url in self.parents.iteritems():
+            children[parent_url].append(child_url)
+        to_remove = list(children.get(url, []))
+        while to_remove:
+            node = to_remove.pop()
+            del self.parents[node]
+            self.deltas.pop(node, None)
+            to_remove.extend(children.get(node, []))
+        self._resolved = {}
+
+    def update(self, other):
+        """
+        Replace the entries for all of the blocks in other with other's
+        """
+        for url, parent_url in other.parents.iteritems():
+            self.add(url, parent_url, other.deltas.get(url))
+
+    def _resolve(self, url):
+        """
+        Compute and memoize what url and any unresolved ancestors inherit
+        """
+        chain = []
+        seen = set()
+        node = url
+        # climb to the nearest resolved ancestor (or past the root)
+        while node is not None and node not in self._resolved and node not in seen:
+            chain.append(node)
+            seen.add(node)
+            node = self.parents.get(node)
+        metadata = self._resolved.get(node, {})
+        for node in reversed(chain):
+            delta = self.deltas.get(node)
+            if delta:
+                # copy on write
+                metadata = dict(metadata)
+                metadata.update(delta)
+            self._resolved[node] = metadata
+        return metadata
+
+
+class CoursePrefetch(object):
+    """
+    The raw db records of every block in a course (or in one revision of it) fetched with a single
+    query. Records are indexed by (category, name, revision) straight from their _id sons so building
+    the index doesn't construct any Locations.
+
+    The records are shared (e.g., by all of a request's get_item calls) and must not be modified;
+    so, lookups return copies.
+    """
+    def __init__(self, records, includes_drafts):
+        """
+        :param records: the course's records
+        :param includes_drafts: whether records include the draft revisions or are published only
+        """
+        self.includes_drafts = includes_drafts
+        self._records = {}
+        for record in records:
+            son = record['_id']
+            self._records[(son['category'], son['name'], son['revision'])] = record
+
+    def __len__(self):
+        return len(self._records)
+
+    def records(self):
+        """
+        Return the (shared, so unmodifiable) records
+        """
+        return self._records.values()
+
+    def covers(self, revision):
+        """
+        Whether this prefetch holds all of the course's records of the given revision
+        """
+        return revision == MongoRevisionKey.published or self.includes_drafts
+
+    def get(self, category, name, revision=MongoRevisionKey.published):
+        """
+        Return a copy of the record for the given block and revision or None if there isn't one
+        """
+        record = self._records.get((category, name, revision))
+        return copy.deepcopy(record) if record is not None else None
+
+    def get_child(self, child_url):
+        """
+        Return a copy of the record to cache for a child (a deprecated location string as stored in
+        definition.children) or None. Mirrors _query_children_for_cache_children: a draft replaces
+        the published version but only if there is a published version.
+        """
+        __, __, category, name = child_url.rsplit('/', 3)
+        if (category, name, MongoRevisionKey.published) not in self._records:
+            return None
+        if self.includes_drafts and category not in DIRECT_ONLY_CATEGORIES:
+            draft = self.get(category, name, MongoRevisionKey.draft)
+            if draft is not None:
+                return draft
+        return self.get(category, name)
+
+
+class ParentIndex(object):
+    """
+    A map from each block in a course to the _ids of the records (of any revision) which list it in their
+    definition.children: i.e., an in memory answer to the query which get_parent_location used to make for
+    every lookup. It's built from a single query for the course's records which have children and kept up
+    to date as records' children change.
+    """
+    def __init__(self, records=()):
+        """
+        :param records: the course's records which have children (only _id and definition.children are used)
+        """
+        # child url -> {parent key: parent _id}
+        self._parents = {}
+        # parent key -> the parent's children's urls
+        self._children = {}
+        for record in records:
+            self.set_children(record['_id'], record.get('definition', {}).get('children', []))
+
+    @staticmethod
+    def _key(parent_id):
+        """
+        The key for a parent's _id son (all the records in an index are in the same course)
+        """
+        return (parent_id['category'], parent_id['name'], parent_id['revision'])
+
+    def set_children(self, parent_id, children):
+        """
+        Record that the record w/ parent_id now has the given children (child urls)
+        """
+        key = self._key(parent_id)
+        for child in self._children.pop(key, []):
+            parents = self._parents.get(child, {})
+            parents.pop(key, None)
+            if not parents:
+                self._parents.pop(child, None)
+        if children:
+            self._children[key] = list(children)
+            for child in children:
+                self._parents.setdefault(child, {})[key] = parent_id
+
+    def get_parent_ids(self, child_url):
+        """
+        Return the _ids of the records which list child_url as a child, drafts first (the same order as
+        sorting by SORT_REVISION_FAVOR_DRAFT)
+        """
+        return sorted(
+            self._parents.get(child_url, {}).itervalues(),
+            key=lambda parent_id: parent_id['revision'] != MongoRevisionKey.draft
+        )
+
+
 class CachingDescriptorSystem(MakoDescriptorSystem):
     """
     A system that has a cache of module json that it will use to load modules
@@ -334,6 +551,9 @@ class MongoModuleStore(ModuleStoreWriteBase):
     """
     reference_type = Location
 
+    # how long (in seconds) a course's ParentIndex stays in the caching subsystem
+    PARENT_INDEX_TIMEOUT = 60 * 60
+
     # TODO (cpennington): Enable non-filesystem filestores
     # pylint: disable=C0103
     # pylint: disable=W0201
@@ -341,9 +561,13 @@ class MongoModuleStore(ModuleStoreWriteBase):
                  default_class=None,
                  error_tracker=null_error_tracker,
                  i18n_service=None,
+                 prefetch_whole_course=False,
                  **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param prefetch_whole_course: whether to load all of a course's blocks in one query when asked for
+            all the descendants of an item during a request (see _cache_children). The prefetch is shared
+            with the rest of the request via the request_cache; outside of requests, courses aren't prefetched.
         """
 
         super(MongoModuleStore, self).__init__(**kwargs)
@@ -384,11 +608,13 @@ class MongoModuleStore(ModuleStoreWriteBase):
         self.error_tracker = error_tracker
         self.render_template = render_template
         self.i18n_service = i18n_service
+        self.prefetch_whole_course = prefetch_whole_course
 
         # performance optimization to prevent updating the meta-data inheritance tree during
         # bulk write operations
         self.ignore_write_events_on_courses = set()
         self._course_run_cache = {}
+        self._resources_fs_cache = {}
 
     def begin_bulk_write_operation_on_course(self, course_id):
         """
@@ -426,23 +652,11 @@ class MongoModuleStore(ModuleStoreWriteBase):
 
         return course_key.replace(run=self._course_run_cache[cache_key])
 
-    def _compute_metadata_inheritance_tree(self, course_id):
-        '''
-        TODO (cdodge) This method can be deleted when the 'split module store' work has been completed
-        '''
-        # get all collections in the course, this query should not return any leaf nodes
-        # note this is a bit ugly as when we add new categories of containers, we have to add it here
-
-        course_id = self._fill_in_run(course_id)
-        block_types_with_children = set(
-            name for name, class_ in XBlock.load_classes() if getattr(class_, 'has_children', False)
-        )
-        query = SON([
-            ('_id.tag', 'i4x'),
-            ('_id.org', course_id.org),
-            ('_id.course', course_id.course),
-            ('_id.category', {'$in': list(block_types_with_children)})
-        ])
+    @staticmethod
+    def _inheritance_record_filter():
+        """
+        The projection for fetching just the Location, children, and inheritable metadata of blocks
+        """
         # we just want the Location, children, and inheritable metadata
         record_filter = {'_id': 1, 'definition.children': 1}
 
@@ -450,14 +664,19 @@ class MongoModuleStore(ModuleStoreWriteBase):
         # this minimizes both data pushed over the wire
         for field_name in InheritanceMixin.fields:
             record_filter['metadata.{0}'.format(field_name)] = 1
+        return record_filter
 
-        # call out to the DB
-        resultset = self.collection.find(query, record_filter)
-
+    def _get_inheritance_records(self, course_id, query):
+        """
+        Run the query for inheritance computation and return the records keyed by
+        the location urls of their published versions.
+        """
         # it's ok to keep these as deprecated strings b/c the overall cache is indexed by course_key and this
         # is a dictionary relative to that course
         results_by_url = {}
-        root = None
+
+        # call out to the DB
+        resultset = self.collection.find(query, self._inheritance_record_filter())
 
         # now go through the results and order them by the location url
         for result in resultset:
@@ -473,41 +692,107 @@ class MongoModuleStore(ModuleStoreWriteBase):
                 results_by_url[location_url].setdefault('definition', {})['children'] = total_children
             else:
                 results_by_url[location_url] = result
-            if location.category == 'course':
+        return results_by_url
+
+    def _compute_metadata_inheritance_tree(self, course_id):
+        '''
+        TODO (cdodge) This method can be deleted when the 'split module store' work has been completed
+        '''
+        # get all collections in the course, this query should not return any leaf nodes
+        # note this is a bit ugly as when we add new categories of containers, we have to add it here
+
+        course_id = self._fill_in_run(course_id)
+        block_types_with_children = set(
+            name for name, class_ in XBlock.load_classes() if getattr(class_, 'has_children', False)
+        )
+        query = SON([
+            ('_id.tag', 'i4x'),
+            ('_id.org', course_id.org),
+            ('_id.course', course_id.course),
+            ('_id.category', {'$in': list(block_types_with_children)})
+        ])
+        results_by_url = self._get_inheritance_records(course_id, query)
+        root = None
+        for location_url, result in results_by_url.iteritems():
+            if result['_id']['category'] == 'course':
                 root = location_url
 
-        # now traverse the tree and compute down the inherited metadata
-        metadata_to_inherit = {}
+        # now traverse the tree recording each block's parent and each container's own metadata
+        metadata_to_inherit = MetadataInheritanceTree()
 
         def _compute_inherited_metadata(url):
             """
             Helper method for computing inherited metadata for a specific location url
             """
-            my_metadata = results_by_url[url].get('metadata', {})
-
             # go through all the children and recurse, but only if we have
             # in the result set. Remember results will not contain leaf nodes
             for child in results_by_url[url].get('definition', {}).get('children', []):
                 if child in results_by_url:
-                    new_child_metadata = copy.deepcopy(my_metadata)
-                    new_child_metadata.update(results_by_url[child].get('metadata', {}))
-                    results_by_url[child]['metadata'] = new_child_metadata
-                    metadata_to_inherit[child] = new_child_metadata
+                    metadata_to_inherit.add(child, url, results_by_url[child].get('metadata'))
                     _compute_inherited_metadata(child)
                 else:
-                    # this is likely a leaf node, so let's record what metadata we need to inherit
-                    metadata_to_inherit[child] = my_metadata
+                    # this is likely a leaf node, so it just inherits from its parent
+                    metadata_to_inherit.add(child, url)
 
         if root is not None:
+            # record the root's own inheritable metadata so that subtree recomputation can start
+            # from any of its children
+            metadata_to_inherit.add(root, None, results_by_url[root].get('metadata'))
             _compute_inherited_metadata(root)
 
         return metadata_to_inherit
 
+    def _compute_metadata_inheritance_subtree(self, location, parent_url):
+        """
+        Compute the metadata inheritance tree entries for the subtree rooted at location (a
+        published, i.e. revision-less, Location). The result is a MetadataInheritanceTree which
+        can be merged into the course's tree via its update method.
+
+        This makes one query per level of containers in the subtree rather than one over every
+        container in the course.
+
+        :param parent_url: the location url of location's parent (None if location is the course root)
+        """
+        course_id = self._fill_in_run(location.course_key)
+        block_types_with_children = set(
+            name for name, class_ in XBlock.load_classes() if getattr(class_, 'has_children', False)
+        )
+        metadata_to_inherit = MetadataInheritanceTree()
+
+        # map of location url -> its parent's url for the current tier
+        to_process = {location.to_deprecated_string(): parent_url}
+        while to_process:
+            usage_keys = [course_id.make_usage_key_from_deprecated_string(url) for url in to_process]
+            container_keys = [key for key in usage_keys if key.category in block_types_with_children]
+            results_by_url = {}
+            if container_keys:
+                query = SON([
+                    ('_id.tag', 'i4x'),
+                    ('_id.org', course_id.org),
+                    ('_id.course', course_id.course),
+                    ('_id.category', {'$in': list(set(key.category for key in container_keys))}),
+                    ('_id.name', {'$in': list(set(key.name for key in container_keys))}),
+                ])
+                results_by_url = self._get_inheritance_records(course_id, query)
+
+            next_tier = {}
+            for url, url_parent in to_process.iteritems():
+                if url not in results_by_url:
+                    # this is likely a leaf node, so it just inherits from its parent
+                    metadata_to_inherit.add(url, url_parent)
+                    continue
+                metadata_to_inherit.add(url, url_parent, results_by_url[url].get('metadata'))
+                for child in results_by_url[url].get('definition', {}).get('children', []):
+                    next_tier[child] = url
+            to_process = next_tier
+
+        return metadata_to_inherit
+
     def _get_cached_metadata_inheritance_tree(self, course_id, force_refresh=False):
         '''
         Compute the metadata inheritance for the course.
         '''
-        tree = {}
+        tree = None
 
         course_id = self._fill_in_run(course_id)
         if not force_refresh:
@@ -517,14 +802,18 @@ class MongoModuleStore(ModuleStoreWriteBase):
 
             # then look in any caching subsystem (e.g. memcached)
             if self.metadata_inheritance_cache_subsystem is not None:
-                tree = self.metadata_inheritance_cache_subsystem.get(unicode(course_id), {})
+                tree = self.metadata_inheritance_cache_subsystem.get(unicode(course_id))
+                if not isinstance(tree, MetadataInheritanceTree):
+                    # not cached or cached in the old fully materialized format
+                    tree = None
             else:
                 logging.warning(
                     'Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is \
                     OK in localdev and testing environment. Not OK in production.'
                 )
 
-        if not tree:
+        # (an empty tree is falsy but still valid)
+        if tree is None:
             # if not in subsystem, or we are on force refresh, then we have to compute
             tree = self._compute_metadata_inheritance_tree(course_id)
 
@@ -558,6 +847,52 @@ class MongoModuleStore(ModuleStoreWriteBase):
             if runtime:
                 runtime.cached_metadata = cached_metadata
 
+    def update_cached_metadata_inheritance_subtree(self, location, runtime=None):
+        """
+        Patch this request's metadata inheritance tree for location's course by recomputing only the
+        entries for the subtree rooted at location, and invalidate the tree cached in the
+        metadata_inheritance_cache_subsystem (other processes may be patching it too; so, writing the
+        patched tree back could lose their changes). Use this rather than
+        refresh_cached_metadata_inheritance_tree when only location's inheritable fields or children
+        changed.
+
+        If given a runtime, it replaces the cached_metadata in that runtime. NOTE: failure to provide
+        a runtime may mean that some objects report old values for inherited data.
+        """
+        course_id = self._fill_in_run(location.course_key)
+        if course_id in self.ignore_write_events_on_courses:
+            return
+
+        if self.metadata_inheritance_cache_subsystem is None and self.request_cache is None:
+            # there's no cached tree to patch, so a full computation is cheaper than a partial one
+            self.refresh_cached_metadata_inheritance_tree(course_id, runtime)
+            return
+
+        location = as_published(location.replace(run=course_id.run))
+        tree = self._get_cached_metadata_inheritance_tree(course_id)
+        if location.category == 'course':
+            parent_url = None
+        else:
+            parent = self._get_raw_parent_location(location, ModuleStoreEnum.RevisionOption.draft_preferred)
+            if parent is None:
+                # not attached to the course (yet); its entries get computed when its parent gets updated
+                return
+            parent_url = as_published(parent).to_deprecated_string()
+            if parent_url not in tree:
+                # the cached tree predates this parent (or lacks the root's entry); so, rebuild it all
+                self.refresh_cached_metadata_inheritance_tree(course_id, runtime)
+                return
+
+        # drop the entries of children which are no longer there
+        tree.remove_descendants(location.to_deprecated_string())
+        tree.update(self._compute_metadata_inheritance_subtree(location, parent_url))
+
+        # the request_cache holds this same tree; the next process to need it recomputes it
+        if self.metadata_inheritance_cache_subsystem is not None:
+            self.metadata_inheritance_cache_subsystem.delete(unicode(course_id))
+        if runtime:
+            runtime.cached_metadata = tree
+
     def _clean_item_data(self, item):
         """
         Renames the '_id' field in item to 'location'
@@ -577,18 +912,208 @@ class MongoModuleStore(ModuleStoreWriteBase):
         }
         return list(self.collection.find(query))
 
+    def _in_request(self):
+        """
+        Whether the request_cache belongs to a request in progress, which clears it when done (see
+        request_cache.middleware). Outside of one (e.g., in Celery tasks and management commands) nothing
+        ever clears it; so, course data only good for the rest of a request mustn't be kept in it.
+        """
+        return self.request_cache is not None and getattr(self.request_cache, 'in_request', False)
+
+    def _prefetch_includes_drafts(self):
+        """
+        Whether course prefetches should include draft records (the draft store overrides this)
+        """
+        return False
+
+    def _get_course_prefetch(self, course_key, fetch=False):
+        """
+        Return the CoursePrefetch for the course, if one has already been made in this request,
+        or, if fetch, make one with a single query and share it with the rest of the request via the
+        request_cache. Otherwise, return None. Outside of a request, prefetches aren't kept.
+        """
+        includes_drafts = self._prefetch_includes_drafts()
+        cache_key = (self.collection.full_name, course_key, includes_drafts)
+        prefetches = None
+        if self._in_request():
+            prefetches = self.request_cache.data.setdefault('course_prefetch', {})
+            if cache_key in prefetches:
+                return prefetches[cache_key]
+        if not fetch:
+            return None
+
+        query = self._course_key_to_son(course_key)
+        if not includes_drafts:
+            query['_id.revision'] = MongoRevisionKey.published
+        prefetch = CoursePrefetch(self.collection.find(query), includes_drafts)
+        if prefetches is not None:
+            prefetches[cache_key] = prefetch
+        return prefetch
+
+    def _get_course_snapshot_data(self, course_key):
+        """
+        Return the course's published records and its metadata inheritance tree, which are what a
+        MixedModuleStore course snapshot holds, or None if the course has no records or this store is
+        reading drafts. Makes at most one query for the records (and shares them with the rest of the
+        request like any other prefetch) plus whatever computing the tree takes.
+        """
+        course_key = self._fill_in_run(course_key)
+        prefetch = self._get_course_prefetch(course_key, fetch=True)
+        if prefetch.includes_drafts or not len(prefetch):
+            return None
+        return prefetch.records(), self._get_cached_metadata_inheritance_tree(course_key)
+
+    def _install_course_snapshot(self, course_key, records, tree):
+        """
+        Use a course snapshot's published records and metadata inheritance tree (see
+        _get_course_snapshot_data) for the rest of this request as if they'd been fetched from the db,
+        unless the request already has its own. Does nothing outside of a request.
+        """
+        if not self._in_request() or self._prefetch_includes_drafts():
+            return
+        course_key = self._fill_in_run(course_key)
+        prefetches = self.request_cache.data.setdefault('course_prefetch', {})
+        prefetches.setdefault((self.collection.full_name, course_key, False), CoursePrefetch(records, False))
+        self.request_cache.data.setdefault('metadata_inheritance', {}).setdefault(course_key, tree)
+
+    def _clear_request_course_caches(self, course_key):
+        """
+        Drop any of this request's prefetches of and runtimes for the course b/c the course has been
+        written to
+        """
+        if self.request_cache is not None:
+            for cache_name in ('course_prefetch', 'course_runtimes'):
+                cached = self.request_cache.data.get(cache_name, {})
+                for cache_key in cached.keys():
+                    if cache_key[1] == course_key:
+                        del cached[cache_key]
+
+    def _parent_index_generation_key(self, course_key):
+        """
+        The key for the token of the course's current ParentIndex in the caching subsystem
+        """
+        return u'parent_index_generation/{}/{}'.format(self.collection.full_name, course_key)
+
+    def _get_parent_index_cache_key(self, course_key):
+        """
+        The key for the course's current ParentIndex in the caching subsystem, or None if the caching
+        subsystem lost track of it. The key includes a token which writes to the course replace (see
+        _bump_parent_index_generation); so, an index built from the db before a write but cached after
+        it gets cached under a key no one reads anymore.
+        """
+        cache = self.metadata_inheritance_cache_subsystem
+        generation_key = self._parent_index_generation_key(course_key)
+        generation = cache.get(generation_key)
+        if generation is None:
+            # another process may be doing the same; so, use whichever token got cached first
+            cache.add(generation_key, uuid4().hex)
+            generation = cache.get(generation_key)
+            if generation is None:
+                return None
+        return u'parent_index/{}/{}/{}'.format(self.collection.full_name, course_key, generation)
+
+    def _bump_parent_index_generation(self, course_key):
+        """
+        Make the course's ParentIndex in the caching subsystem obsolete b/c the course has been written to
+        """
+        if self.metadata_inheritance_cache_subsystem is not None:
+            self.metadata_inheritance_cache_subsystem.set(self._parent_index_generation_key(course_key), uuid4().hex)
+
+    def _get_parent_index(self, course_key):
+        """
+        Return the course's ParentIndex from this request's request_cache or the caching subsystem or,
+        failing those, build it with one query and put it in them.
+
+        Returns None if there's neither a request in progress nor a caching subsystem to keep the index in;
+        so, it would be built for just one lookup and callers should query the db directly.
+        """
+        cache = self.metadata_inheritance_cache_subsystem
+        in_request = self._in_request()
+        if not in_request and cache is None:
+            return None
+
+        index = None
+        request_key = (self.collection.full_name, course_key)
+        if in_request:
+            index = self.request_cache.data.setdefault('parent_index', {}).get(request_key)
+            if index is not None:
+                return index
+
+        # get the key before querying the db so that a write in between makes the result obsolete
+        cache_key = self._get_parent_index_cache_key(course_key) if cache is not None else None
+        if cache_key is not None:
+            index = cache.get(cache_key)
+            if not isinstance(index, ParentIndex):
+                index = None
+
+        if index is None:
+            query = self._course_key_to_son(course_key)
+            query['definition.children.0'] = {'$exists': True}
+            index = ParentIndex(self.collection.find(query, {'_id': True, 'definition.children': True}))
+            if cache_key is not None:
+                cache.set(cache_key, index, self.PARENT_INDEX_TIMEOUT)
+
+        if in_request:
+            self.request_cache.data['parent_index'][request_key] = index
+        return index
+
+    def _update_parent_index(self, location, children):
+        """
+        Record location's new children in this request's copy of the course's ParentIndex and make the
+        copy in the caching subsystem obsolete so it gets rebuilt from the db (rather than risking
+        concurrent requests overwriting each other's changes to it)
+        """
+        course_key = self._fill_in_run(location.course_key)
+        if self._in_request():
+            index = self.request_cache.data.get('parent_index', {}).get((self.collection.full_name, course_key))
+            if index is not None:
+                index.set_children(location.to_deprecated_son(), children)
+        self._bump_parent_index_generation(course_key)
+
+    def _invalidate_parent_index(self, course_key):
+        """
+        Drop all copies of the course's ParentIndex b/c records w/ children were inserted or removed
+        """
+        if self._in_request():
+            self.request_cache.data.get('parent_index', {}).pop((self.collection.full_name, course_key), None)
+        self._bump_parent_index_generation(course_key)
+
+    def _find_parent_ids(self, location):
+        """
+        Return the _ids of all of the records (of any revision) in location's course which list location
+        as a child, drafts first. Uses the course's ParentIndex if there's somewhere to cache it.
+        """
+        course_key = self._fill_in_run(location.course_key)
+        index = self._get_parent_index(course_key)
+        if index is not None:
+            return index.get_parent_ids(location.to_deprecated_string())
+
+        # create a query with tag, org, course, and the children field set to the given location
+        query = self._course_key_to_son(location.course_key)
+        query['definition.children'] = location.to_deprecated_string()
+        # query the collection, sorting by DRAFT first
+        parents = self.collection.find(query, {'_id': True}, sort=[SORT_REVISION_FAVOR_DRAFT])
+        return [parent['_id'] for parent in parents]
+
     def _cache_children(self, course_key, items, depth=0):
         """
         Returns a dictionary mapping Location -> item data, populated with json data
         for all descendents of items up to the specified depth.
         (0 = no descendents, 1 = children, 2 = grandchildren, etc)
         If depth is None, will load all the children.
-        This will make a number of queries that is linear in the depth.
+        This will make a number of queries that is linear in the depth unless the course has already
+        been prefetched in this request or depth is None and prefetch_whole_course is set (and there's a
+        request in progress to share the prefetch with), in which case it makes at most one query.
         """
+        course_key = self._fill_in_run(course_key)
+        prefetch = self._get_course_prefetch(
+            course_key, fetch=(depth is None and self.prefetch_whole_course and self._in_request())
+        )
+        if prefetch is not None:
+            return self._cache_children_from_prefetch(course_key, items, depth, prefetch)
 
         data = {}
         to_process = list(items)
-        course_key = self._fill_in_run(course_key)
         while to_process and depth is None or depth >= 0:
             children = []
             for item in to_process:
@@ -612,23 +1137,67 @@ class MongoModuleStore(ModuleStoreWriteBase):
 
         return data
 
-    def _load_item(self, course_key, item, data_cache, apply_cached_metadata=True):
+    def _cache_children_from_prefetch(self, course_key, items, depth, prefetch):
         """
-        Load an XModuleDescriptor from item, using the children stored in data_cache
+        Same as _cache_children but gets the descendants from the CoursePrefetch rather than the db
         """
-        course_key = self._fill_in_run(course_key)
-        location = Location._from_deprecated_son(item['location'], course_key.run)
-        data_dir = getattr(item, 'data_dir', location.course)
-        root = self.fs_root / data_dir
+        data = {}
+        to_process = list(items)
+        while to_process and (depth is None or depth >= 0):
+            children = []
+            for item in to_process:
+                self._clean_item_data(item)
+                children.extend(item.get('definition', {}).get('children', []))
+                data[Location._from_deprecated_son(item['location'], course_key.run)] = item
+
+            if depth == 0:
+                break
 
-        root.makedirs_p()  # create directory if it doesn't exist
+            to_process = [
+                record for record in (prefetch.get_child(child) for child in children)
+                if record is not None
+            ]
 
-        resource_fs = OSFS(root)
+            if depth is not None:
+                depth -= 1
+
+        return data
+
+    def _get_resources_fs(self, course_key):
+        """
+        Return the OSFS for the course's data directory, creating the directory if it doesn't exist.
+        These are made once per course per store rather than for every item loaded.
+        """
+        resources_fs = self._resources_fs_cache.get(course_key.course)
+        if resources_fs is None:
+            root = self.fs_root / course_key.course
+            root.makedirs_p()  # create directory if it doesn't exist
+            resources_fs = self._resources_fs_cache[course_key.course] = OSFS(root)
+        return resources_fs
+
+    def _get_course_runtime(self, course_key, data_cache, apply_cached_metadata=True):
+        """
+        Return the CachingDescriptorSystem to use to load the course's items from data_cache.
 
+        During a request, there is one such runtime per course per request: a later call adds
+        data_cache to the runtime's module_data and refreshes its cached_metadata rather than making
+        a new runtime. Otherwise (e.g., in Celery tasks, where nothing would ever drop the runtime or
+        its ever growing module_data), a new runtime is made for each call.
+        """
         cached_metadata = {}
         if apply_cached_metadata:
             cached_metadata = self._get_cached_metadata_inheritance_tree(course_key)
 
+        runtimes = None
+        cache_key = (self.collection.full_name, course_key, self._prefetch_includes_drafts(), apply_cached_metadata)
+        if self._in_request():
+            runtimes = self.request_cache.data.setdefault('course_runtimes', {})
+            system = runtimes.get(cache_key)
+            if system is not None:
+                system.module_data.update(data_cache)
+                system.cached_metadata = cached_metadata
+                return system
+
         services = {}
         if self.i18n_service:
             services["i18n"] = self.i18n_service
@@ -638,7 +1207,7 @@ class MongoModuleStore(ModuleStoreWriteBase):
             course_key=course_key,
             module_data=data_cache,
             default_class=self.default_class,
-            resources_fs=resource_fs,
+            resources_fs=self._get_resources_fs(course_key),
             error_tracker=self.error_tracker,
             render_template=self.render_template,
             cached_metadata=cached_metadata,
@@ -646,6 +1215,20 @@ class MongoModuleStore(ModuleStoreWriteBase):
             select=self.xblock_select,
             services=services,
         )
+        if runtimes is not None:
+            runtimes[cache_key] = system
+        return system
+
+    def _load_item(self, course_key, item, data_cache, apply_cached_metadata=True, system=None):
+        """
+        Load an XModuleDescriptor from item, using the children stored in data_cache
+
+        :param system: the course's runtime from _get_course_runtime, if the caller already has it
+        """
+        course_key = self._fill_in_run(course_key)
+        location = Location._from_deprecated_son(item['location'], course_key.run)
+        if system is None:
+            system = self._get_course_runtime(course_key, data_cache, apply_cached_metadata)
         return system.load_item(location)
 
     def _load_items(self, course_key, items, depth=0):
@@ -658,13 +1241,18 @@ class MongoModuleStore(ModuleStoreWriteBase):
 
         # if we are loading a course object, if we're not prefetching children (depth != 0) then don't
         # bother with the metadata inheritance
-        return [
-            self._load_item(
-                course_key, item, data_cache,
-                apply_cached_metadata=(item['location']['category'] != 'course' or depth != 0)
-            )
-            for item in items
-        ]
+        systems = {}
+        loaded = []
+        for item in items:
+            apply_cached_metadata = (item['location']['category'] != 'course' or depth != 0)
+            if apply_cached_metadata not in systems:
+                systems[apply_cached_metadata] = self._get_course_runtime(
+                    course_key, data_cache, apply_cached_metadata
+                )
+            loaded.append(self._load_item(
+                course_key, item, data_cache, apply_cached_metadata, systems[apply_cached_metadata]
+            ))
+        return loaded
 
     def get_courses(self):
         '''
@@ -694,9 +1282,13 @@ class MongoModuleStore(ModuleStoreWriteBase):
         ItemNotFoundError.
         '''
         assert isinstance(location, Location)
-        item = self.collection.find_one(
-            {'_id': location.to_deprecated_son()}
-        )
+        prefetch = self._get_course_prefetch(self._fill_in_run(location.course_key))
+        if prefetch is not None and prefetch.covers(location.revision):
+            item = prefetch.get(location.category, location.name, location.revision)
+        else:
+            item = self.collection.find_one(
+                {'_id': location.to_deprecated_son()}
+            )
         if item is None:
             raise ItemNotFoundError(location)
         return item
@@ -713,6 +1305,20 @@ class MongoModuleStore(ModuleStoreWriteBase):
         except ItemNotFoundError:
             return None
 
+    def get_course_version(self, course_key):
+        """
+        Return a token which changes whenever any of the course's blocks gets saved (when the course
+        root's subtree was last edited, which update_item records on every ancestor of what it saves),
+        or None if the course doesn't exist or predates edit info.
+        """
+        course_key = self._fill_in_run(course_key)
+        try:
+            record = self._find_one(course_key.make_usage_key('course', course_key.run))
+        except ItemNotFoundError:
+            return None
+        subtree_edited_on = record.get('edit_info', {}).get('subtree_edited_on')
+        return subtree_edited_on.isoformat() if subtree_edited_on else None
+
     def has_course(self, course_key, ignore_case=False):
         """
         Returns the course_id of the course if it was found, else None
@@ -901,6 +1507,8 @@ class MongoModuleStore(ModuleStoreWriteBase):
         """
         course_query = self._course_key_to_son(course_key)
         self.collection.remove(course_query, multi=True)
+        self._clear_request_course_caches(self._fill_in_run(course_key))
+        self._invalidate_parent_index(self._fill_in_run(course_key))
 
     def create_xmodule(self, location, definition_data=None, metadata=None, runtime=None, fields={}):
         """
@@ -981,6 +1589,9 @@ class MongoModuleStore(ModuleStoreWriteBase):
             # from overriding our default value set in the init method.
             safe=self.collection.safe
         )
+        self._clear_request_course_caches(self._fill_in_run(location.course_key))
+        if 'definition.children' in update:
+            self._update_parent_index(location, update['definition.children'])
         if result['n'] == 0:
             raise ItemNotFoundError(location)
 
@@ -1040,8 +1651,10 @@ class MongoModuleStore(ModuleStoreWriteBase):
                 }
                 self._update_ancestors(xblock.scope_ids.usage_id, ancestor_payload)
 
-            # recompute (and update) the metadata inheritance tree which is cached
-            self.refresh_cached_metadata_inheritance_tree(xblock.scope_ids.usage_id.course_key, xblock.runtime)
+            # update the metadata inheritance tree which is cached. Only containers pass metadata down;
+            # so, saving a leaf can't change anyone's inherited metadata
+            if xblock.has_children:
+                self.update_cached_metadata_inheritance_subtree(xblock.scope_ids.usage_id, xblock.runtime)
             # fire signal that we've written to DB
         except ItemNotFoundError:
             if not allow_not_found:
@@ -1079,37 +1692,35 @@ class MongoModuleStore(ModuleStoreWriteBase):
         assert revision == ModuleStoreEnum.RevisionOption.published_only \
             or revision == ModuleStoreEnum.RevisionOption.draft_preferred
 
-        # create a query with tag, org, course, and the children field set to the given location
-        query = self._course_key_to_son(location.course_key)
-        query['definition.children'] = location.to_deprecated_string()
+        # the ids of the items listing location as a child, sorted by DRAFT first
+        parent_ids = self._find_parent_ids(location)
 
-        # if only looking for the PUBLISHED parent, set the revision in the query to None
+        # if only looking for the PUBLISHED parent, only consider PUBLISHED parents
         if revision == ModuleStoreEnum.RevisionOption.published_only:
-            query['_id.revision'] = MongoRevisionKey.published
-
-        # query the collection, sorting by DRAFT first
-        parents = self.collection.find(query, {'_id': True}, sort=[SORT_REVISION_FAVOR_DRAFT])
+            parent_ids = [
+                parent_id for parent_id in parent_ids if parent_id['revision'] == MongoRevisionKey.published
+            ]
 
-        if parents.count() == 0:
+        if len(parent_ids) == 0:
             # no parents were found
             return None
 
         if revision == ModuleStoreEnum.RevisionOption.published_only:
-            if parents.count() > 1:
+            if len(parent_ids) > 1:
                 # should never have multiple PUBLISHED parents
                 raise ReferentialIntegrityError(
-                    u"{} parents claim {}".format(parents.count(), location)
+                    u"{} parents claim {}".format(len(parent_ids), location)
                 )
             else:
                 # return the single PUBLISHED parent
-                return Location._from_deprecated_son(parents[0]['_id'], location.course_key.run)
+                return Location._from_deprecated_son(parent_ids[0], location.course_key.run)
         else:
             # there could be 2 different parents if
             #   (1) the draft item was moved or
             #   (2) the parent itself has 2 versions: DRAFT and PUBLISHED
 
             # since we sorted by SORT_REVISION_FAVOR_DRAFT, the 0'th parent is the one we want
-            found_id = parents[0]['_id']
+            found_id = parent_ids[0]
             # don't disclose revision outside modulestore
             return Location._from_deprecated_son(found_id, location.course_key.run)
 
@@ -13,7 +13,7 @@ from xmodule.modulestore import PublishState, ModuleStoreEnum
 from xmodule.modulestore.exceptions import ItemNotFoundError, DuplicateItemError, InvalidBranchSetting
 from xmodule.modulestore.mongo.base import (
     MongoModuleStore, MongoRevisionKey, as_draft, as_published,
-    DIRECT_ONLY_CATEGORIES, SORT_REVISION_FAVOR_DRAFT
+    DIRECT_ONLY_CATEGORIES
 )
 from opaque_keys.edx.locations import Location
 
@@ -153,24 +153,20 @@ class DraftModuleStore(MongoModuleStore):
         """
         _verify_revision_is_published(location)
 
-        # create a query to find all items in the course that have the given location listed as a child
-        query = self._course_key_to_son(location.course_key)
-        query['definition.children'] = location.to_deprecated_string()
-
-        # find all the items that satisfy the query
-        parents = self.collection.find(query, {'_id': True}, sort=[SORT_REVISION_FAVOR_DRAFT])
+        # find all the items in the course that have the given location listed as a child
+        parent_ids = self._find_parent_ids(location)
 
         # return only the parent(s) that satisfy the request
         return [
-            Location._from_deprecated_son(parent['_id'], location.course_key.run)
-            for parent in parents
+            Location._from_deprecated_son(parent_id, location.course_key.run)
+            for parent_id in parent_ids
             if (
                 # return all versions of the parent if revision is ModuleStoreEnum.RevisionOption.all
                 key_revision == ModuleStoreEnum.RevisionOption.all or
                 # return this parent if it's direct-only, regardless of which revision is requested
-                parent['_id']['category'] in DIRECT_ONLY_CATEGORIES or
+                parent_id['category'] in DIRECT_ONLY_CATEGORIES or
                 # return this parent only if its revision matches the requested one
-                parent['_id']['revision'] == key_revision
+                parent_id['revision'] == key_revision
             )
         ]
 
@@ -488,6 +484,8 @@ class DraftModuleStore(MongoModuleStore):
 
         _internal([root_usage.to_deprecated_son() for root_usage in root_usages])
         self.collection.remove({'_id': {'$in': to_be_deleted}}, safe=self.collection.safe)
+        self._clear_request_course_caches(self._fill_in_run(root_usages[0].course_key))
+        self._invalidate_parent_index(self._fill_in_run(root_usages[0].course_key))
         # recompute (and update) the metadata inheritance tree which is cached
         self.refresh_cached_metadata_inheritance_tree(root_usages[0].course_key)
 
@@ -577,6 +575,8 @@ class DraftModuleStore(MongoModuleStore):
         _internal_depth_first(location, True)
         if len(to_be_deleted) > 0:
             self.collection.remove({'_id': {'$in': to_be_deleted}})
+            self._clear_request_course_caches(self._fill_in_run(location.course_key))
+            self._invalidate_parent_index(self._fill_in_run(location.course_key))
         return self.get_item(as_published(location))
 
     def unpublish(self, location, user_id):
@@ -589,6 +589,12 @@ class DraftModuleStore(MongoModuleStore):
         self._verify_branch_setting(ModuleStoreEnum.Branch.draft_preferred)
         return self._convert_to_draft(location, user_id, delete_published=True)
 
+    def _prefetch_includes_drafts(self):
+        """
+        Prefetch drafts too if they're to be preferred
+        """
+        return self.branch_setting_func() == ModuleStoreEnum.Branch.draft_preferred
+
     def _query_children_for_cache_children(self, course_key, items):
         # first get non-draft in a round-trip
         to_process_non_drafts = super(DraftModuleStore, self)._query_children_for_cache_children(course_key, items)
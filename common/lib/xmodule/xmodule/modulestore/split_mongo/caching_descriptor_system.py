@@ -7,6 +7,7 @@ from xmodule.errortracker import exc_info_to_str
 from xblock.runtime import KvsFieldData
 from ..exceptions import ItemNotFoundError
 from .split_mongo_kvs import SplitMongoKVS
+from .definition_lazy_loader import DefinitionBatch
 from xblock.fields import ScopeIds
 from xmodule.modulestore.loc_mapper_store import LocMapperStore
 
@@ -52,6 +53,10 @@ class CachingDescriptorSystem(MakoDescriptorSystem):
         )
         self.default_class = default_class
         self.local_modules = {}
+        # fetches the lazily loaded definitions of this system's blocks in batches
+        self.definition_batch = None
+        if lazy and (modulestore.definition_batch_size or 1) > 1:
+            self.definition_batch = DefinitionBatch(modulestore, modulestore.definition_batch_size)
 
     def _load_item(self, block_id, course_entry_override=None):
         if isinstance(block_id, BlockUsageLocator):
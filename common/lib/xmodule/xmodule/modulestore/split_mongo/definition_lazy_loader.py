@@ -1,3 +1,7 @@
+import copy
+import threading
+from collections import OrderedDict
+
 from opaque_keys.edx.locator import DefinitionLocator
 
 
@@ -8,19 +12,101 @@ class DefinitionLazyLoader(object):
     object doesn't force access during init but waits until client wants the
     definition. Only works if the modulestore is a split mongo store.
     """
-    def __init__(self, modulestore, block_type, definition_id, field_converter):
+    def __init__(self, modulestore, block_type, definition_id, field_converter, batch=None):
         """
         Simple placeholder for yet-to-be-fetched data
         :param modulestore: the pymongo db connection with the definitions
         :param definition_locator: the id of the record in the above to fetch
+        :param batch: an optional DefinitionBatch with which to fetch this definition along with
+            the other pending ones
         """
         self.modulestore = modulestore
         self.definition_locator = DefinitionLocator(block_type, definition_id)
         self.field_converter = field_converter
+        self.batch = batch
+        if batch is not None:
+            batch.add(definition_id)
 
     def fetch(self):
         """
         Fetch the definition. Note, the caller should replace this lazy
         loader pointer with the result so as not to fetch more than once
         """
+        if self.batch is not None:
+            return self.batch.fetch(self.definition_locator.definition_id)
         return self.modulestore.db_connection.get_definition(self.definition_locator.definition_id)
+
+
+class DefinitionBatch(object):
+    """
+    The definitions pending for the DefinitionLazyLoaders of one CachingDescriptorSystem. The first
+    fetch of any of them fetches it along with up to batch_size - 1 of the other pending definitions
+    in a single query; so, rendering a vertical of n problems makes 1 rather than n queries.
+
+    The descriptor system (and so this batch) outlives any one render; so, the fetched definitions
+    are kept in a bounded LRU cache keyed by id, which later renders of the same blocks load from
+    without querying. Definitions never change once written, so the cache never goes stale. Loaders
+    get a copy of the cached definition as the field converter modifies the fields it's given.
+    """
+    DEFAULT_MAX_CACHED = 500
+
+    def __init__(self, modulestore, batch_size, max_cached=DEFAULT_MAX_CACHED):
+        """
+        :param modulestore: the split mongo store (its definition_queries_saved gets incremented)
+        :param batch_size: the maximum number of definitions to fetch per query
+        :param max_cached: the maximum number of fetched definitions to keep
+        """
+        self.modulestore = modulestore
+        self.batch_size = batch_size
+        self.max_cached = max_cached
+        # definition ids not yet fetched in the order added (values are unused)
+        self._pending = OrderedDict()
+        # the fetched definitions by id, least recently used first
+        self._fetched = OrderedDict()
+        # the descriptor systems are shared by threads
+        self._lock = threading.Lock()
+
+    def add(self, definition_id):
+        """
+        Queue definition_id to be fetched with the next batch
+        """
+        with self._lock:
+            if definition_id not in self._fetched:
+                self._pending[definition_id] = None
+
+    def fetch(self, definition_id):
+        """
+        Return the definition w/ definition_id (or None if it doesn't exist), fetching it and the next
+        of the other pending definitions if it's not already been fetched.
+        """
+        with self._lock:
+            definition = self._fetched.pop(definition_id, None)
+            if definition is not None:
+                # move to the most recently used end
+                self._fetched[definition_id] = definition
+                return copy.deepcopy(definition)
+            self._pending.pop(definition_id, None)
+            batch_ids = [definition_id]
+            while self._pending and len(batch_ids) < self.batch_size:
+                batch_ids.append(self._pending.popitem(last=False)[0])
+
+        if len(batch_ids) == 1:
+            definition = self.modulestore.db_connection.get_definition(definition_id)
+            definitions = {definition_id: definition} if definition is not None else {}
+        else:
+            definitions = {
+                definition['_id']: definition
+                for definition in self.modulestore.db_connection.find_matching_definitions(
+                    {'_id': {'$in': batch_ids}}
+                )
+            }
+        with self._lock:
+            self.modulestore.definition_queries_saved += len(batch_ids) - 1
+            # the requested definition goes last as it's the most recently used
+            for batch_id in batch_ids[1:] + batch_ids[:1]:
+                if batch_id in definitions:
+                    self._fetched.pop(batch_id, None)
+                    self._fetched[batch_id] = definitions[batch_id]
+            while len(self._fetched) > self.max_cached:
+                self._fetched.popitem(last=False)
+        return copy.deepcopy(definitions.get(definition_id))
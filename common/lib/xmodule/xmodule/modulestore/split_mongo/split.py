@@ -48,6 +48,7 @@ Representation:
 import threading
 import datetime
 import logging
+from collections import OrderedDict
 from importlib import import_module
 from path import path
 import copy
@@ -67,6 +68,8 @@ from xmodule.modulestore import (
 from ..exceptions import ItemNotFoundError
 from .definition_lazy_loader import DefinitionLazyLoader
 from .caching_descriptor_system import CachingDescriptorSystem
+from .structure_cache import StructureCache
+from .structure_index import StructureIndex
 from xblock.fields import Scope, Reference, ReferenceList, ReferenceValueDict
 from bson.objectid import ObjectId
 from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection
@@ -105,14 +108,23 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
 
     SCHEMA_VERSION = 1
     reference_type = Locator
+    DEFAULT_DEFINITION_BATCH_SIZE = 100
+    # the most descriptor systems each thread keeps (least recently used get dropped)
+    THREAD_CACHE_MAX_ENTRIES = 20
+
     def __init__(self, doc_store_config, fs_root, render_template,
                  default_class=None,
                  error_tracker=null_error_tracker,
                  loc_mapper=None,
                  i18n_service=None,
+                 structure_cache_options=None,
+                 definition_batch_size=DEFAULT_DEFINITION_BATCH_SIZE,
                  **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param structure_cache_options: optional kwargs for the StructureCache (max_entries, max_blocks)
+        :param definition_batch_size: the maximum number of lazily loaded definitions to fetch per query
+            (see DefinitionBatch). 1 (or None) fetches each definition on its own.
         """
 
         super(SplitMongoModuleStore, self).__init__(**kwargs)
@@ -121,10 +133,15 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
         self.db_connection = MongoConnection(**doc_store_config)
         self.db = self.db_connection.database
 
-        # Code review question: How should I expire entries?
-        # _add_cache could use a lru mechanism to control the cache size?
+        # process-wide (shared by all threads) LRU cache of structures and their indexes
+        self.structure_cache = StructureCache(**(structure_cache_options or {}))
+        # descriptor systems get bound to the course & branch of each load; so, each thread has its own
         self.thread_cache = threading.local()
 
+        self.definition_batch_size = definition_batch_size
+        # the number of definition queries avoided by fetching lazily loaded definitions in batches
+        self.definition_queries_saved = 0
+
         if default_class is not None:
             module_path, __, class_name = default_class.rpartition('.')
             class_ = getattr(import_module(module_path), class_name)
@@ -159,10 +176,12 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
             for block in new_module_data.itervalues():
                 block['definition'] = DefinitionLazyLoader(
                     self, block['category'], block['definition'],
-                    lambda fields: self.convert_references_to_keys(
-                        course_key, system.load_block_type(block['category']),
+                    # bind the category now rather than when the loader is used
+                    lambda fields, category=block['category']: self.convert_references_to_keys(
+                        course_key, system.load_block_type(category),
                         fields, system.course_entry['structure']['blocks'],
-                    )
+                    ),
+                    batch=system.definition_batch,
                 )
         else:
             # Load all descendants by id
@@ -197,9 +216,12 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
             if self.i18n_service:
                 services["i18n"] = self.i18n_service
 
+            # the system computes inheritance into its structure; so, give it its own copy rather than
+            # polluting the cached structure which write operations version and persist
+            system_course_entry = dict(course_entry, structure=copy.deepcopy(course_entry['structure']))
             system = CachingDescriptorSystem(
                 modulestore=self,
-                course_entry=course_entry,
+                course_entry=system_course_entry,
                 module_data={},
                 lazy=lazy,
                 default_class=self.default_class,
@@ -222,34 +244,60 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
 
     def _get_cache(self, course_version_guid):
         """
-        Find the descriptor cache for this course if it exists
+        Find this thread's descriptor cache for this course if it exists
         :param course_version_guid:
         """
-        if not hasattr(self.thread_cache, 'course_cache'):
-            self.thread_cache.course_cache = {}
-        system = self.thread_cache.course_cache
-        return system.get(course_version_guid)
+        course_cache = self._thread_course_cache()
+        system = course_cache.pop(course_version_guid, None)
+        if system is not None:
+            # move to the most recently used end
+            course_cache[course_version_guid] = system
+        return system
 
     def _add_cache(self, course_version_guid, system):
         """
-        Save this cache for subsequent access
+        Save this cache for subsequent access by this thread
         :param course_version_guid:
         :param system:
         """
-        if not hasattr(self.thread_cache, 'course_cache'):
-            self.thread_cache.course_cache = {}
-        self.thread_cache.course_cache[course_version_guid] = system
+        course_cache = self._thread_course_cache()
+        course_cache.pop(course_version_guid, None)
+        course_cache[course_version_guid] = system
+        while len(course_cache) > self.THREAD_CACHE_MAX_ENTRIES:
+            course_cache.popitem(last=False)
         return system
 
+    def _thread_course_cache(self):
+        """
+        This thread's LRU ordered dict of descriptor systems by course version guid
+        """
+        if not hasattr(self.thread_cache, 'course_cache'):
+            self.thread_cache.course_cache = OrderedDict()
+        return self.thread_cache.course_cache
+
     def _clear_cache(self, course_version_guid=None):
         """
         Should only be used by testing or something which implements transactional boundary semantics.
         :param course_version_guid: if provided, clear only this entry
         """
         if course_version_guid:
-            del self.thread_cache.course_cache[course_version_guid]
+            self.structure_cache.delete(course_version_guid)
+            self._thread_course_cache().pop(course_version_guid, None)
         else:
-            self.thread_cache.course_cache = {}
+            self.structure_cache.clear()
+            self.thread_cache.course_cache = OrderedDict()
+
+    def _get_structure(self, version_guid):
+        """
+        Get the structure document for version_guid from the structure cache or, failing that, from the db.
+        Callers must not modify the returned structure in place unless they then clear its cache entry.
+        """
+        structure = self.structure_cache.get_structure(version_guid)
+        if structure is None:
+            structure = self.db_connection.get_structure(version_guid)
+            if structure is not None:
+                self.structure_cache.set_structure(version_guid, structure)
+        return structure
 
     def _lookup_course(self, course_locator):
         '''
@@ -283,7 +331,7 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
 
         # cast string to ObjectId if necessary
         version_guid = course_locator.as_object_id(version_guid)
-        entry = self.db_connection.get_structure(version_guid)
+        entry = self._get_structure(version_guid)
 
         # b/c more than one course can use same structure, the 'org', 'offering', and 'branch' are not intrinsic to structure
         # and the one assoc'd w/ it by another fetch may not be the one relevant to this fetch; so,
@@ -463,8 +511,12 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
         # don't expect caller to know that children are in fields
         if 'children' in kwargs:
             settings['children'] = kwargs.pop('children')
-        for block_id, value in course['structure']['blocks'].iteritems():
-            if _block_matches_all(value):
+        # narrow down the blocks to check w/ the structure's index (None means check them all)
+        candidates = self._get_structure_index(course['structure']).find(kwargs, settings)
+        if candidates is None:
+            candidates = course['structure']['blocks'].iterkeys()
+        for block_id in candidates:
+            if _block_matches_all(course['structure']['blocks'][block_id]):
                 items.append(block_id)
 
         if len(items) > 0:
@@ -472,6 +524,17 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
         else:
             return []
 
+    def _get_structure_index(self, structure):
+        """
+        Return the StructureIndex for the structure from the structure cache, building and caching it
+        if need be
+        """
+        index = self.structure_cache.get_index(structure['_id'])
+        if index is None:
+            index = StructureIndex(structure)
+            self.structure_cache.set_index(structure['_id'], index)
+        return index
+
     def get_parent_location(self, locator, **kwargs):
         '''
         Return the location (Locators w/ block_ids) for the parent of this location in this
@@ -0,0 +1,174 @@
+"""
+A process-wide, bounded LRU cache of split structures and the indexes built from them.
+"""
+import threading
+from collections import OrderedDict
+
+
+class _CacheEntry(object):
+    """
+    The cached data for one structure version.
+    """
+    __slots__ = ('structure', 'index', 'size')
+
+    def __init__(self, structure=None, index=None):
+        self.structure = structure
+        self.index = index
+        self.size = 0
+        self.recompute_size()
+
+    def recompute_size(self):
+        """
+        The size of an entry is the number of blocks in its structure. An index only adds lists
+        of the structure's block ids; so, it isn't counted.
+        """
+        self.size = 0
+        if self.structure is not None:
+            self.size += len(self.structure.get('blocks', {}))
+
+
+class StructureCache(object):
+    """
+    A thread-safe cache keyed by structure version guid. Each entry holds the structure document as
+    fetched from the db and, once it's been built, the StructureIndex for that version. It only holds
+    data which no one modifies once cached; descriptor systems, which get bound to the branch and course
+    of whoever loads from them, aren't shareable across threads and aren't cached here.
+
+    Structure versions never change once written (except via continue_version which must clear the
+    entry), so entries never go stale; they only need to be evicted to bound memory. The cache is capped
+    by the number of entries and by the total number of blocks held (a cheap proxy for memory use) and
+    evicts the least recently used entries when either cap is exceeded.
+    """
+    DEFAULT_MAX_ENTRIES = 100
+    DEFAULT_MAX_BLOCKS = 100000
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_blocks=DEFAULT_MAX_BLOCKS):
+        """
+        :param max_entries: the maximum number of structure versions to hold
+        :param max_blocks: the maximum number of blocks to hold across all entries
+        """
+        self.max_entries = max_entries
+        self.max_blocks = max_blocks
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, version_guid):
+        return version_guid in self._entries
+
+    @property
+    def size(self):
+        """
+        The total number of blocks currently held
+        """
+        return self._size
+
+    def get_structure(self, version_guid):
+        """
+        Return the cached structure document for version_guid or None
+        """
+        return self._get(version_guid, 'structure')
+
+    def get_index(self, version_guid):
+        """
+        Return the cached StructureIndex for version_guid or None
+        """
+        return self._get(version_guid, 'index')
+
+    def set_structure(self, version_guid, structure):
+        """
+        Cache the structure document for version_guid. Replacing the structure drops any index built
+        from a prior document.
+        """
+        with self._lock:
+            entry = self._entries.get(version_guid)
+            if entry is not None and entry.structure is not structure:
+                entry.index = None
+            self._put(version_guid, entry, structure=structure)
+
+    def set_index(self, version_guid, index):
+        """
+        Cache the StructureIndex built for version_guid
+        """
+        with self._lock:
+            self._put(version_guid, self._entries.get(version_guid), index=index)
+
+    def delete(self, version_guid):
+        """
+        Remove any entry for version_guid. Does nothing if there's no such entry.
+        """
+        with self._lock:
+            entry = self._entries.pop(version_guid, None)
+            if entry is not None:
+                self._size -= entry.size
+
+    def clear(self):
+        """
+        Remove all entries (counters are preserved)
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """
+        Return a dict of the cache's current occupancy and its hit, miss, and eviction counts
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'blocks': self._size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def _get(self, version_guid, attr):
+        """
+        Look up the given attr of the entry for version_guid, marking the entry as most recently used
+        """
+        with self._lock:
+            entry = self._entries.get(version_guid)
+            value = getattr(entry, attr) if entry is not None else None
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                # move to the most recently used end
+                del self._entries[version_guid]
+                self._entries[version_guid] = entry
+            return value
+
+    def _put(self, version_guid, entry, **values):
+        """
+        Add or update the entry for version_guid with values, make it the most recently used, and
+        evict as needed. Caller must hold the lock.
+        """
+        if entry is None:
+            entry = _CacheEntry()
+        else:
+            del self._entries[version_guid]
+            self._size -= entry.size
+        for attr, value in values.iteritems():
+            setattr(entry, attr, value)
+        entry.recompute_size()
+        self._entries[version_guid] = entry
+        self._size += entry.size
+        self._evict()
+
+    def _evict(self):
+        """
+        Drop least recently used entries until within bounds; always keeps the most recent entry
+        """
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._size > self.max_blocks
+        ):
+            __, entry = self._entries.popitem(last=False)
+            self._size -= entry.size
+            self.evictions += 1
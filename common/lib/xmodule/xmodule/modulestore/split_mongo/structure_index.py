@@ -0,0 +1,110 @@
+"""
+Lazily built secondary indexes over the blocks of one split structure version.
+"""
+import re
+import threading
+
+
+class StructureIndex(object):
+    """
+    Maps the values of a structure's blocks' top level attributes (e.g., category and definition)
+    and settings fields to the ids of the blocks which have them, so that get_items can find
+    candidates with dictionary lookups rather than testing every block. Each attribute's or
+    field's index is built the first time it's queried.
+
+    Structure versions never change; so, neither does an index once built. Like _block_matches,
+    a list value is indexed under each of its elements. Unhashable values can't be indexed and
+    such blocks are never returned for the attribute or field, which is correct since no hashable
+    criteria can equal them.
+    """
+    def __init__(self, structure):
+        """
+        :param structure: the structure document whose blocks to index (must not be modified)
+        """
+        self.blocks = structure.get('blocks', {})
+        # the block ids in the structure's iteration order (results preserve this order)
+        self._block_ids = list(self.blocks)
+        self._order = {block_id: position for position, block_id in enumerate(self._block_ids)}
+        # (top level attribute or 'fields.' + settings field name) -> {value: [block ids]}
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.blocks)
+
+    @staticmethod
+    def is_indexable(criteria):
+        """
+        Whether the criteria is a plain value (not a regex nor a function) which the index can look up
+        """
+        if isinstance(criteria, re._pattern_type) or callable(criteria):  # pylint: disable=protected-access
+            return False
+        try:
+            hash(criteria)
+        except TypeError:
+            return False
+        return True
+
+    def find(self, qualifiers=None, settings=None):
+        """
+        Return the ids of the blocks which may match the indexable criteria among the given top
+        level qualifiers and settings or None if there are no indexable criteria (i.e., every block
+        is a candidate). The candidates are exact for the indexable criteria but callers must still
+        check the rest.
+        """
+        keys = [
+            (key, criteria) for key, criteria in (qualifiers or {}).iteritems()
+            if self.is_indexable(criteria)
+        ]
+        keys.extend(
+            ('fields.' + key, criteria) for key, criteria in (settings or {}).iteritems()
+            if self.is_indexable(criteria)
+        )
+        if not keys:
+            return None
+
+        candidates = None
+        for key, criteria in keys:
+            matches = self._get_index(key).get(criteria, [])
+            if candidates is None:
+                candidates = set(matches)
+            else:
+                candidates.intersection_update(matches)
+            if not candidates:
+                return []
+        return sorted(candidates, key=self._order.get)
+
+    def _get_index(self, key):
+        """
+        Return the index for the top level attribute or 'fields.' + settings field, building it if need be
+        """
+        index = self._indexes.get(key)
+        if index is not None:
+            return index
+
+        with self._lock:
+            if key in self._indexes:
+                return self._indexes[key]
+            if key.startswith('fields.'):
+                field_name = key[len('fields.'):]
+                get_value = lambda block: block.get('fields', {}).get(field_name, _MISSING)
+            else:
+                get_value = lambda block: block.get(key, _MISSING)
+
+            index = {}
+            for block_id in self._block_ids:
+                value = get_value(self.blocks[block_id])
+                if value is _MISSING:
+                    continue
+                for element in (value if isinstance(value, list) else [value]):
+                    try:
+                        index.setdefault(element, []).append(block_id)
+                    except TypeError:
+                        # unhashable; so, can't equal any indexable criteria
+                        pass
+            self._indexes[key] = index
+            return index
+
+
+# a sentinel for blocks which don't have the attribute or field
+_MISSING = object()
@@ -153,6 +153,11 @@ class ModuleStoreTestCase(TestCase):
             connection = store.collection.database.connection
             store.collection.drop()
             connection.close()
+            # anything cached about the dropped courses (inheritance trees, parent indexes, ...) is stale
+            if store.request_cache is not None:
+                store.request_cache.data = {}
+            if store.metadata_inheritance_cache_subsystem is not None:
+                store.metadata_inheritance_cache_subsystem.clear()
         elif hasattr(store, 'close_all_connections'):
             store.close_all_connections()
         elif hasattr(store, 'db'):
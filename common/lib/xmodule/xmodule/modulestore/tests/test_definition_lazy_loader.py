@@ -0,0 +1,111 @@
+"""
+Tests for the split modulestore's batched DefinitionLazyLoader
+"""
+import unittest
+
+from xmodule.modulestore.split_mongo.definition_lazy_loader import DefinitionLazyLoader, DefinitionBatch
+
+
+class _FakeConnection(object):
+    """
+    Stands in for the split MongoConnection's definition methods and counts the queries
+    """
+    def __init__(self, definition_ids):
+        self.definitions = {
+            definition_id: {'_id': definition_id, 'fields': {'data': definition_id}}
+            for definition_id in definition_ids
+        }
+        self.queries = 0
+
+    def get_definition(self, key):
+        self.queries += 1
+        return self.definitions.get(key)
+
+    def find_matching_definitions(self, query):
+        self.queries += 1
+        return [self.definitions[key] for key in query['_id']['$in'] if key in self.definitions]
+
+
+class _FakeStore(object):
+    """
+    Stands in for the SplitMongoModuleStore
+    """
+    def __init__(self, definition_ids):
+        self.db_connection = _FakeConnection(definition_ids)
+        self.definition_queries_saved = 0
+
+
+class TestDefinitionBatch(unittest.TestCase):
+    """
+    Test fetching lazily loaded definitions in batches
+    """
+    def _loaders(self, store, batch, definition_ids):
+        """
+        Make a loader per definition id
+        """
+        return [
+            DefinitionLazyLoader(store, 'problem', definition_id, lambda fields: fields, batch=batch)
+            for definition_id in definition_ids
+        ]
+
+    def test_one_query_per_batch(self):
+        definition_ids = ['def{}'.format(i) for i in range(20)]
+        store = _FakeStore(definition_ids)
+        batch = DefinitionBatch(store, batch_size=8)
+        loaders = self._loaders(store, batch, definition_ids)
+        for loader, definition_id in zip(loaders, definition_ids):
+            self.assertEqual(loader.fetch()['_id'], definition_id)
+        # 8 + 8 + 4
+        self.assertEqual(store.db_connection.queries, 3)
+        self.assertEqual(store.definition_queries_saved, 17)
+
+    def test_missing_and_refetched_definitions(self):
+        store = _FakeStore(['a', 'b'])
+        batch = DefinitionBatch(store, batch_size=10)
+        loader_a, loader_b, loader_missing = self._loaders(store, batch, ['a', 'b', 'missing'])
+        self.assertIsNone(loader_missing.fetch())
+        self.assertEqual(loader_b.fetch()['_id'], 'b')
+        self.assertEqual(store.db_connection.queries, 1)
+        # fetched definitions stay cached; missing ones get asked for again
+        self.assertEqual(loader_b.fetch()['_id'], 'b')
+        self.assertEqual(loader_a.fetch()['_id'], 'a')
+        self.assertEqual(store.db_connection.queries, 1)
+        self.assertIsNone(loader_missing.fetch())
+        self.assertEqual(store.db_connection.queries, 2)
+
+    def test_later_renders_use_cache(self):
+        definition_ids = ['def{}'.format(i) for i in range(6)]
+        store = _FakeStore(definition_ids)
+        batch = DefinitionBatch(store, batch_size=8)
+        for loader in self._loaders(store, batch, definition_ids):
+            loader.fetch()
+        self.assertEqual(store.db_connection.queries, 1)
+        # a later render of the same blocks makes new loaders on the same system
+        for loader in self._loaders(store, batch, definition_ids):
+            definition = loader.fetch()
+            # the loader's copy can be converted without changing the cached definition
+            definition['fields']['data'] = 'converted'
+        for loader in self._loaders(store, batch, definition_ids):
+            self.assertEqual(loader.fetch()['fields']['data'], loader.definition_locator.definition_id)
+        self.assertEqual(store.db_connection.queries, 1)
+
+    def test_cache_is_bounded(self):
+        definition_ids = ['def{}'.format(i) for i in range(10)]
+        store = _FakeStore(definition_ids)
+        batch = DefinitionBatch(store, batch_size=10, max_cached=4)
+        loaders = self._loaders(store, batch, definition_ids)
+        loaders[0].fetch()
+        self.assertEqual(store.db_connection.queries, 1)
+        # only the requested definition and the last 3 of the batch are kept
+        for loader in loaders[7:] + loaders[:1]:
+            loader.fetch()
+        self.assertEqual(store.db_connection.queries, 1)
+        loaders[1].fetch()
+        self.assertEqual(store.db_connection.queries, 2)
+
+    def test_unbatched(self):
+        store = _FakeStore(['a', 'b'])
+        for loader in self._loaders(store, None, ['a', 'b']):
+            loader.fetch()
+        self.assertEqual(store.db_connection.queries, 2)
+        self.assertEqual(store.definition_queries_saved, 0)
@@ -12,12 +12,14 @@ from xmodule.modulestore.exceptions import ItemNotFoundError
 
 from opaque_keys.edx.locator import BlockUsageLocator, CourseLocator
 from xmodule.modulestore.tests.test_location_mapper import LocMapperSetupSansDjango, loc_mapper
+from xmodule.modulestore.tests.factories import check_mongo_calls
 # Mixed modulestore depends on django, so we'll manually configure some django settings
 # before importing the module
 from django.conf import settings
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 if not settings.configured:
     settings.configure()
+from django.core.cache import get_cache
 from xmodule.modulestore.mixed import MixedModuleStore
 
 
@@ -500,6 +502,117 @@ class TestMixedModuleStore(LocMapperSetupSansDjango):
         self.assertEqual(len(self.store.get_courses_for_wiki('edX.simple.2012_Fall')), 0)
         self.assertEqual(len(self.store.get_courses_for_wiki('no_such_wiki')), 0)
 
+    def _initdb_with_caches(self, default_ms):
+        """
+        initdb w/ a cache, a request cache (of a request in progress), and a settable branch setting for
+        the stores, returning the cache, the request cache, and the branch setting (a 1 item list)
+        """
+        cache = get_cache('django.core.cache.backends.locmem.LocMemCache')
+        cache.clear()
+        request_cache = Mock(data={}, in_request=True)
+        branch_setting = [ModuleStoreEnum.Branch.draft_preferred]
+
+        def create_caching_modulestore_instance(engine, doc_store_config, options, i18n_service=None):
+            """
+            Like create_modulestore_instance but w/ caches and a settable branch
+            """
+            return load_function(engine)(
+                doc_store_config=doc_store_config,
+                metadata_inheritance_cache_subsystem=cache,
+                request_cache=request_cache,
+                branch_setting_func=lambda: branch_setting[0],
+                **options
+            )
+
+        self.options = dict(self.OPTIONS, metadata_inheritance_cache_subsystem=cache)
+        with patch('xmodule.modulestore.mixed.create_modulestore_instance', create_caching_modulestore_instance):
+            self.initdb(default_ms)
+        return cache, request_cache, branch_setting
+
+    @ddt.data('draft')
+    def test_course_snapshot(self, default_ms):
+        """
+        Test that published reads of an old mongo course get served from the course's snapshot and
+        that writes make the snapshot obsolete
+        """
+        __, request_cache, branch_setting = self._initdb_with_caches(default_ms)
+        course_key = self.course_locations[self.MONGO_COURSEID].course_key
+        mongo_store = self.store._get_modulestore_for_courseid(course_key)  # pylint: disable=protected-access
+
+        # the first published read builds and caches the snapshot
+        branch_setting[0] = ModuleStoreEnum.Branch.published_only
+        request_cache.data = {}
+        self.store.get_course(course_key)
+
+        # later requests don't query
+        request_cache.data = {}
+        with check_mongo_calls(mongo_store, 0):
+            course = self.store.get_course(course_key, depth=None)
+            self.assertEqual(course.get_children()[0].location, self.writable_chapter_location)
+            self.assertTrue(self.store.has_item(self.writable_chapter_location))
+
+        branch_setting[0] = ModuleStoreEnum.Branch.draft_preferred
+        request_cache.data = {}
+        chapter = self.store.get_item(self.writable_chapter_location)
+        chapter.display_name = 'Changed'
+        self.store.update_item(chapter, self.user_id)
+
+        branch_setting[0] = ModuleStoreEnum.Branch.published_only
+        request_cache.data = {}
+        self.assertEqual(self.store.get_item(self.writable_chapter_location).display_name, 'Changed')
+
+    @ddt.data('draft')
+    def test_no_course_snapshot_outside_request(self, default_ms):
+        """
+        Test that outside of a request (e.g., in a Celery task), where nothing clears the request cache,
+        published reads don't keep a snapshot of the course in it but see the course's latest content
+        """
+        __, request_cache, branch_setting = self._initdb_with_caches(default_ms)
+        request_cache.in_request = False
+        course_key = self.course_locations[self.MONGO_COURSEID].course_key
+        mongo_store = self.store._get_modulestore_for_courseid(course_key)  # pylint: disable=protected-access
+        branch_setting[0] = ModuleStoreEnum.Branch.published_only
+        self.assertNotEqual(self.store.get_item(self.writable_chapter_location).display_name, 'Changed elsewhere')
+
+        # changed by another process
+        mongo_store.collection.update(
+            {'_id': self.writable_chapter_location.to_deprecated_son()},
+            {'$set': {'metadata.display_name': 'Changed elsewhere'}},
+        )
+        self.store._invalidate_course_snapshot(mongo_store, course_key)  # pylint: disable=protected-access
+
+        self.assertEqual(self.store.get_item(self.writable_chapter_location).display_name, 'Changed elsewhere')
+        self.assertFalse(request_cache.data.get('course_prefetch'))
+
+    @ddt.data('draft')
+    def test_course_snapshot_too_large(self, default_ms):
+        """
+        Test that a snapshot too large to cache gets marked as such rather than rebuilt on every request
+        """
+        cache, request_cache, branch_setting = self._initdb_with_caches(default_ms)
+        course_key = self.course_locations[self.MONGO_COURSEID].course_key
+        mongo_store = self.store._get_modulestore_for_courseid(course_key)  # pylint: disable=protected-access
+        branch_setting[0] = ModuleStoreEnum.Branch.published_only
+
+        # pylint: disable=protected-access
+        get_snapshot_data = patch.object(
+            mongo_store, '_get_course_snapshot_data', wraps=mongo_store._get_course_snapshot_data
+        )
+        with patch.object(self.store, 'COURSE_SNAPSHOT_MAX_SIZE', 0), get_snapshot_data as get_snapshot_data_mock:
+            for __ in range(2):
+                request_cache.data = {}
+                self.assertEqual(self.store.get_course(course_key).location.course_key, course_key)
+            self.assertEqual(get_snapshot_data_mock.call_count, 1)
+        version = self.store._get_course_snapshot_version(course_key)
+        self.assertEqual(
+            cache.get(u'course_snapshot/{}/{}'.format(course_key, version)), self.store.COURSE_SNAPSHOT_TOO_LARGE
+        )
+
+        # the item reads query as they do without snapshots
+        request_cache.data = {}
+        with check_mongo_calls(mongo_store, 1):
+            self.assertTrue(self.store.has_item(self.writable_chapter_location))
+
 
 #=============================================================================================================
 # General utils for not using django settings
@@ -4,6 +4,7 @@ from nose.tools import assert_equals, assert_raises, \
 # pylint: enable=E0611
 from path import path
 import pymongo
+import pickle
 import logging
 import shutil
 from tempfile import mkdtemp
@@ -11,6 +12,8 @@ from uuid import uuid4
 from datetime import datetime
 from pytz import UTC
 import unittest
+from mock import Mock, patch
+from django.core.cache import get_cache
 from xblock.core import XBlock
 
 from xblock.fields import Scope, Reference, ReferenceList, ReferenceValueDict
@@ -33,7 +36,7 @@ from nose.tools import assert_in
 from xmodule.exceptions import NotFoundError
 from git.test.lib.asserts import assert_not_none
 from xmodule.x_module import XModuleMixin
-from xmodule.modulestore.mongo.base import as_draft
+from xmodule.modulestore.mongo.base import as_draft, MetadataInheritanceTree, ParentIndex
 from xmodule.modulestore.tests.factories import check_mongo_calls
 
 
@@ -245,6 +248,56 @@ class TestMongoModuleStore(unittest.TestCase):
         with check_mongo_calls(self.draft_store, 9):
             check_path_to_location(self.draft_store)
 
+    def test_get_item_prefetches_whole_course(self):
+        '''Make sure loading all descendants uses a single query and caches the same items as level by level'''
+        course_location = Location('edX', 'toy', '2012_Fall', 'course', '2012_Fall')
+        # off by default
+        course = self.draft_store.get_item(course_location, depth=None)
+        by_level = set(course.runtime.module_data.keys())
+
+        self.draft_store.prefetch_whole_course = True
+        self.draft_store.request_cache = Mock(data={}, in_request=False)
+        try:
+            # not outside of a request, as nothing would ever drop the prefetch
+            course = self.draft_store.get_item(course_location, depth=None)
+            assert_false(self.draft_store.request_cache.data.get('course_prefetch'))
+
+            # a new request
+            self.draft_store.request_cache = Mock(data={}, in_request=True)
+            # 1 to find the course, 1 to prefetch all of its blocks, 1 for the inheritance tree
+            with check_mongo_calls(self.draft_store, 3):
+                course = self.draft_store.get_item(course_location, depth=None)
+        finally:
+            self.draft_store.prefetch_whole_course = False
+            self.draft_store.request_cache = None
+        assert_equals(by_level, set(course.runtime.module_data.keys()))
+
+    def test_course_runtime_only_shared_in_request(self):
+        '''Make sure items loaded separately share a runtime only while a request is in progress'''
+        course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        chapter_location = course_key.make_usage_key('chapter', 'Overview')
+        self.draft_store.request_cache = Mock(data={}, in_request=False)
+        try:
+            runtimes = [self.draft_store.get_item(chapter_location).runtime for __ in range(2)]
+            assert_not_equals(id(runtimes[0]), id(runtimes[1]))
+            assert_false(self.draft_store.request_cache.data.get('course_runtimes'))
+
+            self.draft_store.request_cache.in_request = True
+            runtimes = [self.draft_store.get_item(chapter_location).runtime for __ in range(2)]
+            assert_equals(id(runtimes[0]), id(runtimes[1]))
+        finally:
+            self.draft_store.request_cache = None
+
+    def test_get_items_share_runtime(self):
+        '''Make sure the items loaded together share one runtime and mixed class per block type'''
+        course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        # 1 each to find the draft and published items, 1 for the inheritance tree
+        with check_mongo_calls(self.draft_store, 3):
+            items = self.draft_store.get_items(course_key, category='html')
+        assert_true(len(items) > 1)
+        assert_equals(len(set(id(item.runtime) for item in items)), 1)
+        assert_equals(len(set(type(item) for item in items)), 1)
+
     def test_xlinter(self):
         '''
         Run through the xlinter, we know the 'toy' course has violations, but the
@@ -661,6 +714,59 @@ class TestMongoModuleStore(unittest.TestCase):
         self.assertFalse(self.draft_store.has_changes(locations['grandparent']))
         self.assertFalse(self.draft_store.has_changes(locations['parent']))
 
+    def _move_child(self, locations, user_id=123):
+        """
+        Moves the child of a tree made by _create_test_tree from the parent to the parent sibling
+        """
+        parent = self.draft_store.get_item(locations['parent'])
+        parent.children = [locations['child_sibling']]
+        self.draft_store.update_item(parent, user_id=user_id)
+        parent_sibling = self.draft_store.get_item(locations['parent_sibling'])
+        parent_sibling.children += [locations['child']]
+        self.draft_store.update_item(parent_sibling, user_id=user_id)
+
+    def test_parent_index_in_request(self):
+        """
+        Tests that get_parent_location builds the course's ParentIndex once per request and keeps it current
+        """
+        locations = self._create_test_tree('parent_index_in_request')
+        self.draft_store.request_cache = Mock(data={}, in_request=True)
+        try:
+            with check_mongo_calls(self.draft_store, 1):
+                self.assertEqual(self.draft_store.get_parent_location(locations['child']), locations['parent'])
+                self.assertEqual(self.draft_store.get_parent_location(locations['parent']), locations['grandparent'])
+            self._move_child(locations)
+            with check_mongo_calls(self.draft_store, 0):
+                self.assertEqual(self.draft_store.get_parent_location(locations['child']), locations['parent_sibling'])
+        finally:
+            self.draft_store.request_cache = None
+
+    def test_parent_index_in_cache(self):
+        """
+        Tests that get_parent_location shares the course's ParentIndex via the caching subsystem and that
+        writes make the cached index obsolete, even if it's cached after them
+        """
+        locations = self._create_test_tree('parent_index_in_cache')
+        course_key = locations['child'].course_key
+        cache = get_cache('django.core.cache.backends.locmem.LocMemCache')
+        cache.clear()
+        self.draft_store.metadata_inheritance_cache_subsystem = cache
+        try:
+            self.assertEqual(self.draft_store.get_parent_location(locations['child']), locations['parent'])
+            # as in another process
+            with check_mongo_calls(self.draft_store, 0):
+                self.assertEqual(self.draft_store.get_parent_location(locations['child_sibling']), locations['parent'])
+
+            # an index built before a write but cached after it
+            stale_key = self.draft_store._get_parent_index_cache_key(course_key)
+            stale_index = self.draft_store._get_parent_index(course_key)
+            self._move_child(locations)
+            cache.set(stale_key, stale_index)
+            self.assertEqual(self.draft_store.get_parent_location(locations['child']), locations['parent_sibling'])
+            self.assertEqual(self.draft_store.get_parent_location(locations['child_sibling']), locations['parent'])
+        finally:
+            self.draft_store.metadata_inheritance_cache_subsystem = None
+
     def test_has_changes_non_direct_only_children(self):
         """
         Tests that has_changes() returns true after editing the child of a vertical (both not direct only categories).
@@ -804,6 +910,184 @@ class TestMongoModuleStore(unittest.TestCase):
         self.assertEqual(component.published_date, published_date)
         self.assertEqual(component.published_by, published_by)
 
+    def test_metadata_inheritance_subtree(self):
+        """
+        Tests that recomputing a subtree of the metadata inheritance tree gives the same entries as the full tree
+        """
+        course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        full_tree = self.draft_store._compute_metadata_inheritance_tree(course_key)
+        course_location = course_key.make_usage_key('course', '2012_Fall')
+        course_url = course_location.to_deprecated_string()
+        chapter = course_key.make_usage_key('chapter', 'Overview')
+        subtree = self.draft_store._compute_metadata_inheritance_subtree(chapter, course_url)
+
+        self.assertIn(chapter.to_deprecated_string(), subtree)
+        self.assertIn(course_key.make_usage_key('html', 'toyhtml').to_deprecated_string(), subtree)
+        self.assertNotIn(course_url, subtree)
+        expected = {url: full_tree[url] for url in full_tree.parents}
+        full_tree.update(subtree)
+        self.assertEqual({url: full_tree[url] for url in full_tree.parents}, expected)
+
+        # recomputing from the root gives the whole tree
+        root_tree = self.draft_store._compute_metadata_inheritance_subtree(course_location, None)
+        self.assertEqual(root_tree.parents, full_tree.parents)
+        self.assertEqual(root_tree.deltas, full_tree.deltas)
+
+    def test_cached_empty_inheritance_tree(self):
+        """
+        Tests that a cached inheritance tree gets used even if it's empty
+        """
+        course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        cache = Mock()
+        cache.get.return_value = MetadataInheritanceTree()
+        with patch.object(self.draft_store, 'metadata_inheritance_cache_subsystem', cache):
+            with patch.object(self.draft_store, '_compute_metadata_inheritance_tree') as compute:
+                tree = self.draft_store._get_cached_metadata_inheritance_tree(course_key)
+        self.assertIs(tree, cache.get.return_value)
+        self.assertFalse(compute.called)
+        self.assertFalse(cache.set.called)
+
+    def test_update_item_patches_inheritance_tree(self):
+        """
+        Tests that updating a container patches this request's metadata inheritance tree in place, drops the
+        entries of the children it no longer has and invalidates the tree in the caching subsystem
+        """
+        dummy_user = 123
+        locations = {
+            'course': Location('edX', 'inheritance', '2012_Fall', 'course', '2012_Fall'),
+            'chapter': Location('edX', 'inheritance', '2012_Fall', 'chapter', 'chapter'),
+            'sequential': Location('edX', 'inheritance', '2012_Fall', 'sequential', 'sequential'),
+            'vertical': Location('edX', 'inheritance', '2012_Fall', 'vertical', 'vertical'),
+        }
+        for key in ['course', 'chapter', 'sequential', 'vertical']:
+            self.draft_store.create_and_save_xmodule(locations[key], user_id=dummy_user)
+        for parent, child in [('course', 'chapter'), ('chapter', 'sequential'), ('sequential', 'vertical')]:
+            block = self.draft_store.get_item(locations[parent])
+            block.children += [locations[child]]
+            self.draft_store.update_item(block, user_id=dummy_user)
+
+        course_key = locations['course'].course_key
+        urls = {key: location.to_deprecated_string() for key, location in locations.iteritems()}
+        request_cache = Mock(data={}, in_request=True)
+        cache = get_cache('django.core.cache.backends.locmem.LocMemCache')
+        cache.clear()
+        self.draft_store.request_cache = request_cache
+        self.draft_store.metadata_inheritance_cache_subsystem = cache
+        try:
+            tree = self.draft_store._get_cached_metadata_inheritance_tree(course_key)
+            self.assertIn(urls['vertical'], tree)
+            self.assertIsNotNone(cache.get(unicode(course_key)))
+
+            chapter = self.draft_store.get_item(locations['chapter'])
+            chapter.graded = True
+            chapter.children = []
+            self.draft_store.update_item(chapter, user_id=dummy_user)
+
+            self.assertIs(request_cache.data['metadata_inheritance'][course_key], tree)
+            self.assertTrue(tree[urls['chapter']]['graded'])
+            self.assertNotIn(urls['sequential'], tree)
+            self.assertNotIn(urls['vertical'], tree)
+            self.assertIsNone(cache.get(unicode(course_key)))
+        finally:
+            self.draft_store.request_cache = None
+            self.draft_store.metadata_inheritance_cache_subsystem = None
+
+
+class TestMetadataInheritanceTree(unittest.TestCase):
+    """
+    Tests for MetadataInheritanceTree.
+    """
+    def setUp(self):
+        self.tree = MetadataInheritanceTree()
+        self.tree.add('course', None, {'graded': False, 'start': '2013'})
+        self.tree.add('chapter', 'course', {'start': '2014'})
+        self.tree.add('sequential', 'chapter')
+        self.tree.add('problem', 'sequential')
+
+    def test_resolve(self):
+        self.assertEqual(self.tree['course'], {'graded': False, 'start': '2013'})
+        self.assertEqual(self.tree['chapter'], {'graded': False, 'start': '2014'})
+        self.assertEqual(self.tree.get('problem'), {'graded': False, 'start': '2014'})
+        # containers which don't set anything share their parent's dict
+        self.assertIs(self.tree['problem'], self.tree['chapter'])
+        self.assertNotIn('nonexistent', self.tree)
+        self.assertEqual(self.tree.get('nonexistent', {}), {})
+        with self.assertRaises(KeyError):
+            self.tree['nonexistent']  # pylint: disable=pointless-statement
+
+    def test_update(self):
+        self.assertEqual(self.tree['problem']['graded'], False)
+        subtree = MetadataInheritanceTree()
+        subtree.add('sequential', 'chapter', {'graded': True})
+        subtree.add('problem', 'sequential')
+        self.tree.update(subtree)
+        self.assertEqual(self.tree['problem'], {'graded': True, 'start': '2014'})
+        self.assertEqual(self.tree['chapter'], {'graded': False, 'start': '2014'})
+
+    def test_remove_descendants(self):
+        self.tree.add('chapter2', 'course')
+        self.tree.remove_descendants('chapter')
+        self.assertEqual(sorted(self.tree.parents), ['chapter', 'chapter2', 'course'])
+        self.assertEqual(self.tree['chapter'], {'graded': False, 'start': '2014'})
+
+    def test_pickle(self):
+        self.tree['problem']
+        restored = pickle.loads(pickle.dumps(self.tree))
+        self.assertEqual(restored.parents, self.tree.parents)
+        self.assertEqual(restored['problem'], self.tree['problem'])
+
+
+class TestParentIndex(unittest.TestCase):
+    """
+    Tests for ParentIndex.
+    """
+    @staticmethod
+    def _id(category, name, revision=None):
+        """
+        An _id son for a block in the test course
+        """
+        return {
+            'tag': 'i4x', 'org': 'org', 'course': 'course', 'category': category, 'name': name, 'revision': revision
+        }
+
+    def setUp(self):
+        self.index = ParentIndex([
+            {'_id': self._id('course', 'run'), 'definition': {'children': ['i4x://org/course/chapter/a']}},
+            {'_id': self._id('chapter', 'a'), 'definition': {'children': ['i4x://org/course/vertical/b']}},
+            {'_id': self._id('vertical', 'b'), 'definition': {'children': ['i4x://org/course/problem/c']}},
+            {
+                '_id': self._id('vertical', 'b', 'draft'),
+                'definition': {'children': ['i4x://org/course/problem/c', 'i4x://org/course/problem/d']}
+            },
+        ])
+
+    def test_get_parent_ids(self):
+        self.assertEqual(self.index.get_parent_ids('i4x://org/course/chapter/a'), [self._id('course', 'run')])
+        # drafts first
+        self.assertEqual(
+            self.index.get_parent_ids('i4x://org/course/problem/c'),
+            [self._id('vertical', 'b', 'draft'), self._id('vertical', 'b')]
+        )
+        self.assertEqual(self.index.get_parent_ids('i4x://org/course/problem/d'), [self._id('vertical', 'b', 'draft')])
+        self.assertEqual(self.index.get_parent_ids('i4x://org/course/problem/nonexistent'), [])
+
+    def test_set_children(self):
+        # move d from the draft vertical to the chapter
+        self.index.set_children(self._id('vertical', 'b', 'draft'), ['i4x://org/course/problem/c'])
+        self.index.set_children(
+            self._id('chapter', 'a'), ['i4x://org/course/vertical/b', 'i4x://org/course/problem/d']
+        )
+        self.assertEqual(self.index.get_parent_ids('i4x://org/course/problem/d'), [self._id('chapter', 'a')])
+        self.assertEqual(self.index.get_parent_ids('i4x://org/course/vertical/b'), [self._id('chapter', 'a')])
+        self.index.set_children(self._id('course', 'run'), [])
+        self.assertEqual(self.index.get_parent_ids('i4x://org/course/chapter/a'), [])
+
+    def test_pickle(self):
+        restored = pickle.loads(pickle.dumps(self.index))
+        self.assertEqual(
+            restored.get_parent_ids('i4x://org/course/problem/c'),
+            self.index.get_parent_ids('i4x://org/course/problem/c')
+        )
 
 
 class TestMongoKeyValueStore(object):
@@ -0,0 +1,114 @@
+"""
+Tests for the split modulestore's StructureCache and StructureIndex
+"""
+import re
+import unittest
+
+from xmodule.modulestore.split_mongo.structure_cache import StructureCache
+from xmodule.modulestore.split_mongo.structure_index import StructureIndex
+
+
+def _structure(guid, num_blocks):
+    """
+    Make a minimal structure document w/ num_blocks blocks
+    """
+    return {'_id': guid, 'blocks': {'block{}'.format(i): {} for i in range(num_blocks)}}
+
+
+class TestStructureCache(unittest.TestCase):
+    """
+    Test the LRU and bounding behavior of StructureCache
+    """
+    def test_get_and_set(self):
+        cache = StructureCache()
+        self.assertIsNone(cache.get_structure('a'))
+        structure = _structure('a', 3)
+        cache.set_structure('a', structure)
+        self.assertIs(cache.get_structure('a'), structure)
+        self.assertIsNone(cache.get_index('a'))
+        index = StructureIndex(structure)
+        cache.set_index('a', index)
+        self.assertIs(cache.get_index('a'), index)
+        self.assertEqual(cache.size, 3)
+        self.assertEqual(
+            cache.stats(),
+            {'entries': 1, 'blocks': 3, 'hits': 2, 'misses': 2, 'evictions': 0}
+        )
+
+    def test_replacing_structure_drops_index(self):
+        cache = StructureCache()
+        cache.set_structure('a', _structure('a', 2))
+        cache.set_index('a', StructureIndex(_structure('a', 2)))
+        cache.set_structure('a', _structure('a', 2))
+        self.assertIsNone(cache.get_index('a'))
+        self.assertEqual(cache.size, 2)
+
+    def test_entry_count_lru_eviction(self):
+        cache = StructureCache(max_entries=2)
+        cache.set_structure('a', _structure('a', 1))
+        cache.set_structure('b', _structure('b', 1))
+        # touch a so that b is the least recently used
+        cache.get_structure('a')
+        cache.set_structure('c', _structure('c', 1))
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_block_count_eviction(self):
+        cache = StructureCache(max_blocks=10)
+        cache.set_structure('a', _structure('a', 4))
+        cache.set_structure('b', _structure('b', 4))
+        cache.set_structure('c', _structure('c', 4))
+        self.assertEqual(len(cache), 2)
+        self.assertNotIn('a', cache)
+        self.assertEqual(cache.size, 8)
+        # an entry bigger than the bound is still kept as the sole entry
+        cache.set_structure('d', _structure('d', 20))
+        self.assertEqual(len(cache), 1)
+        self.assertIn('d', cache)
+
+    def test_delete_and_clear(self):
+        cache = StructureCache()
+        cache.set_structure('a', _structure('a', 1))
+        cache.set_structure('b', _structure('b', 1))
+        cache.delete('a')
+        cache.delete('nonexistent')
+        self.assertNotIn('a', cache)
+        self.assertEqual(cache.size, 1)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.size, 0)
+
+
+class TestStructureIndex(unittest.TestCase):
+    """
+    Test finding candidate blocks w/ StructureIndex
+    """
+    def setUp(self):
+        self.index = StructureIndex({'_id': 'a', 'blocks': {
+            'chapter': {'category': 'chapter', 'definition': 'd1', 'fields': {'children': ['p1', 'p2']}},
+            'p1': {'category': 'problem', 'definition': 'd2', 'fields': {'graded': True, 'weight': {'a': 1}}},
+            'p2': {'category': 'problem', 'definition': 'd2', 'fields': {'graded': False}},
+            'html': {'category': 'html', 'definition': 'd3', 'fields': {}},
+        }})
+
+    def test_find(self):
+        self.assertEqual(sorted(self.index.find({'category': 'problem'})), ['p1', 'p2'])
+        self.assertEqual(self.index.find({'category': 'problem'}, {'graded': True}), ['p1'])
+        self.assertEqual(sorted(self.index.find({'definition': 'd2'})), ['p1', 'p2'])
+        # lists are indexed by element
+        self.assertEqual(self.index.find(settings={'children': 'p2'}), ['chapter'])
+        self.assertEqual(self.index.find({'category': 'video'}), [])
+        self.assertEqual(self.index.find({'category': 'html'}, {'graded': True}), [])
+
+    def test_unindexable_criteria(self):
+        self.assertIsNone(self.index.find())
+        self.assertIsNone(self.index.find({'category': re.compile('prob')}))
+        self.assertIsNone(self.index.find(settings={'graded': lambda value: value}))
+        # the indexable criteria still narrow the candidates
+        self.assertEqual(
+            sorted(self.index.find({'category': 'problem'}, {'children': ['p1']})), ['p1', 'p2']
+        )
+        # unhashable values just aren't indexed
+        self.assertEqual(self.index.find(settings={'weight': 1}), [])
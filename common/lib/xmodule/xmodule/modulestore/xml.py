@@ -6,6 +6,8 @@ import os
 import re
 import sys
 import glob
+import threading
+import time
 
 from collections import defaultdict
 from cStringIO import StringIO
@@ -24,6 +26,7 @@ from xmodule.tabs import CourseTabList
 from opaque_keys.edx.keys import UsageKey
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
+from dogapi import dog_stats_api
 from xblock.field_data import DictFieldData
 from xblock.runtime import DictKeyValueStore, IdGenerator
 
@@ -369,7 +372,7 @@ class XMLModuleStore(ModuleStoreReadBase):
     """
     def __init__(
         self, data_dir, default_class=None, course_dirs=None, course_ids=None,
-        load_error_modules=True, i18n_service=None, **kwargs
+        load_error_modules=True, i18n_service=None, lazy=False, **kwargs
     ):
         """
         Initialize an XMLModuleStore from data_dir
@@ -382,6 +385,9 @@ class XMLModuleStore(ModuleStoreReadBase):
 
             course_dirs or course_ids (list of str): If specified, the list of course_dirs or course_ids to load. Otherwise,
                 load all courses. Note, providing both
+
+            lazy (bool): If True, only read the id from each course's course.xml now and load each
+                course the first time it's requested.
         """
         super(XMLModuleStore, self).__init__(**kwargs)
 
@@ -389,6 +395,9 @@ class XMLModuleStore(ModuleStoreReadBase):
         self.modules = defaultdict(dict)  # course_id -> dict(location -> XBlock)
         self.courses = {}  # course_dir -> XBlock for the course
         self.errored_courses = {}  # course_dir -> errorlog, for dirs that failed to load
+        self.course_load_times = {}  # course_dir -> seconds it took to load
+        self._pending_courses = {}  # course_id -> course_dir, for lazy courses not yet loaded
+        self._load_lock = threading.RLock()
 
         if course_ids is not None:
             course_ids = [SlashSeparatedCourseKey.from_deprecated_string(course_id) for course_id in course_ids]
@@ -422,7 +431,48 @@ class XMLModuleStore(ModuleStoreReadBase):
             course_dirs = sorted([d for d in os.listdir(self.data_dir) if
                                   os.path.exists(self.data_dir / d / "course.xml")])
         for course_dir in course_dirs:
-            self.try_load_course(course_dir, course_ids)
+            course_id = self._read_course_id(course_dir) if lazy else None
+            if course_id is None:
+                self.try_load_course(course_dir, course_ids)
+            elif course_ids is None or course_id in course_ids:
+                self._pending_courses[course_id] = course_dir
+
+    def _read_course_id(self, course_dir):
+        """
+        Return the course id which the root element of course_dir's course.xml declares without
+        parsing the rest of it, or None if the id can't be determined that way (e.g., the course
+        relies on defaults or is broken), in which case the course must be loaded to find out.
+        """
+        try:
+            with open(self.data_dir / course_dir / "course.xml") as course_file:
+                course_file = StringIO(clean_out_mako_templating(course_file.read()))
+            __, course_data = next(etree.iterparse(course_file, events=('start',)))
+        except (IOError, StopIteration, etree.XMLSyntaxError):
+            return None
+        org = course_data.get('org')
+        course = course_data.get('course')
+        url_name = course_data.get('url_name', course_data.get('slug'))
+        if not (org and course and url_name):
+            return None
+        return SlashSeparatedCourseKey(org, course, url_name)
+
+    def _load_pending_course(self, course_id):
+        """
+        If the course w/ course_id is lazily loaded and not yet loaded, load it now
+        """
+        if course_id in self._pending_courses:
+            with self._load_lock:
+                course_dir = self._pending_courses.get(course_id)
+                if course_dir is not None:
+                    self.try_load_course(course_dir)
+                    del self._pending_courses[course_id]
+
+    def _load_all_pending_courses(self):
+        """
+        Load all of the lazily loaded courses which aren't yet loaded
+        """
+        for course_id in self._pending_courses.keys():
+            self._load_pending_course(course_id)
 
     def try_load_course(self, course_dir, course_ids=None):
         '''
@@ -435,6 +485,7 @@ class XMLModuleStore(ModuleStoreReadBase):
         # place after the course loads and we have its location
         errorlog = make_error_tracker()
         course_descriptor = None
+        start = time.time()
         try:
             course_descriptor = self.load_course(course_dir, course_ids, errorlog.tracker)
         except Exception as exc:  # pylint: disable=broad-except
@@ -445,6 +496,14 @@ class XMLModuleStore(ModuleStoreReadBase):
             errorlog.tracker(msg)
             self.errored_courses[course_dir] = errorlog
 
+        if course_descriptor is not None or course_dir in self.errored_courses:
+            load_time = time.time() - start
+            self.course_load_times[course_dir] = load_time
+            log.info(u"Loaded xml course %s in %.3f seconds", course_dir, load_time)
+            dog_stats_api.histogram(
+                'edxapp.xmlstore.course_load_time', load_time, tags=[u'course_dir:{}'.format(course_dir)]
+            )
+
         if course_descriptor is None:
             pass
         elif isinstance(course_descriptor, ErrorDescriptor):
@@ -459,8 +518,8 @@ class XMLModuleStore(ModuleStoreReadBase):
         '''
         String representation - for debugging
         '''
-        return '<XMLModuleStore data_dir=%r, %d courses, %d modules>' % (
-            self.data_dir, len(self.courses), len(self.modules)
+        return '<XMLModuleStore data_dir=%r, %d courses, %d modules, %d courses not yet loaded>' % (
+            self.data_dir, len(self.courses), len(self.modules), len(self._pending_courses)
         )
 
     def load_policy(self, policy_path, tracker):
@@ -701,6 +760,7 @@ class XMLModuleStore(ModuleStoreReadBase):
         """
         Returns True if location exists in this ModuleStore.
         """
+        self._load_pending_course(usage_key.course_key)
         return usage_key in self.modules[usage_key.course_key]
 
     def get_item(self, usage_key, depth=0):
@@ -715,6 +775,7 @@ class XMLModuleStore(ModuleStoreReadBase):
 
         usage_key: a UsageKey that matches the module we are looking for.
         """
+        self._load_pending_course(usage_key.course_key)
         try:
             return self.modules[usage_key.course_key][usage_key]
         except KeyError:
@@ -745,6 +806,7 @@ class XMLModuleStore(ModuleStoreReadBase):
                 you can search dates by providing either a datetime for == (probably
                 useless) or a tuple (">"|"<" datetime) for after or before, etc.
         """
+        self._load_pending_course(course_id)
         items = []
 
         category = kwargs.pop('category', None)
@@ -771,13 +833,38 @@ class XMLModuleStore(ModuleStoreReadBase):
         Returns a list of course descriptors.  If there were errors on loading,
         some of these may be ErrorDescriptors instead.
         """
+        self._load_all_pending_courses()
         return self.courses.values()
 
+    def get_course(self, course_id, depth=0):
+        """
+        Returns the course descriptor w/ course_id or None. Only loads that course if it's lazily loaded.
+        """
+        self._load_pending_course(course_id)
+        return next((course for course in self.courses.itervalues() if course.id == course_id), None)
+
+    def has_course(self, course_id, ignore_case=False):
+        """
+        Returns the course_id of the course if it was found, else None (see ModuleStoreReadBase.has_course)
+        """
+        if ignore_case:
+            return super(XMLModuleStore, self).has_course(course_id, ignore_case)
+        course = self.get_course(course_id)
+        return course.id if course is not None else None
+
+    def get_course_errors(self, course_key):
+        """
+        Return list of errors for this :class:`.CourseKey`, if any.
+        """
+        self._load_pending_course(course_key)
+        return super(XMLModuleStore, self).get_course_errors(course_key)
+
     def get_errored_courses(self):
         """
         Return a dictionary of course_dir -> [(msg, exception_str)], for each
         course_dir where course loading failed.
         """
+        self._load_all_pending_courses()
         return dict((k, self.errored_courses[k].errors) for k in self.errored_courses)
 
     def get_orphans(self, course_key):
@@ -793,6 +880,7 @@ class XMLModuleStore(ModuleStoreReadBase):
         '''Find the location that is the parent of this location in this
         course.  Needed for path_to_location().
         '''
+        self._load_pending_course(location.course_key)
         if not self.parent_trackers[location.course_key].is_known(location):
             raise ItemNotFoundError("{0} not in {1}".format(location, location.course_key))
 
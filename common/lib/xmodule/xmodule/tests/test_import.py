@@ -391,6 +391,19 @@ class ImportTestCase(BaseCourseTestCase):
         self.assertEqual(toy_video.youtube_id_1_0, "p2Q6BrNhdh8")
         self.assertEqual(two_toy_video.youtube_id_1_0, "p2Q6BrNhdh9")
 
+    def test_lazy_loading(self):
+        """Lazily loaded courses are only loaded when first requested"""
+        modulestore = XMLModuleStore(DATA_DIR, course_dirs=['toy', 'two_toys'], lazy=True)
+        self.assertEqual(modulestore.courses, {})
+
+        location = Location("edX", "toy", "2012_Fall", "video", "Welcome", None)
+        self.assertEqual(modulestore.get_item(location).youtube_id_1_0, "p2Q6BrNhdh8")
+        self.assertEqual(modulestore.courses.keys(), ['toy'])
+        self.assertEqual(modulestore.course_load_times.keys(), ['toy'])
+
+        self.assertEqual(len(modulestore.get_courses()), 2)
+        self.assertEqual(sorted(modulestore.course_load_times.keys()), ['toy', 'two_toys'])
+
     def test_colon_in_url_name(self):
         """Ensure that colons in url_names convert to file paths properly"""
 
@@ -22,6 +22,7 @@ from xblock.runtime import Runtime, IdReader
 from xmodule.fields import RelativeTime
 
 from xmodule.errortracker import exc_info_to_str
+from xmodule.modulestore import MemoizedMixologist
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from opaque_keys.edx.keys import UsageKey
 from xmodule.exceptions import UndefinedContext
@@ -1113,6 +1114,7 @@ class DescriptorSystem(MetricsMixin, ConfigurableFragmentWrapper, Runtime):  # p
 
         """
         super(DescriptorSystem, self).__init__(id_reader=OpaqueKeyReader(), **kwargs)
+        self.mixologist = MemoizedMixologist(kwargs.get('mixins', ()))
 
         # This is used by XModules to write out separate files during xml export
         self.export_fs = None
@@ -1,13 +1,15 @@
 # Compute grades using real division, with no integer truncation
 from __future__ import division
 from collections import defaultdict
+import itertools
 import json
 import random
 import logging
 
 from contextlib import contextmanager
 from django.conf import settings
-from django.db import transaction
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
 from django.test.client import RequestFactory
 
 from dogapi import dog_stats_api
@@ -20,13 +22,16 @@ from xmodule.graders import Score
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.util.duedate import get_extended_due_date
-from .models import StudentModule
+from .models import StudentModule, PersistentSectionGrade
 from .module_render import get_module_for_descriptor
 from submissions import api as sub_api  # installed from the edx-submissions repository
 from opaque_keys import InvalidKeyError
 
 log = logging.getLogger("edx.courseware")
 
+# The number of students whose StudentModule scores iterate_grades_for fetches per query
+BULK_GRADING_BATCH_SIZE = 100
+
 
 def yield_dynamic_descriptor_descendents(descriptor, module_creator):
     """
@@ -141,16 +146,20 @@ def answer_distributions(course_key):
     return answer_counts
 
 @transaction.commit_manually
-def grade(student, request, course, keep_raw_scores=False):
+def grade(student, request, course, keep_raw_scores=False, student_module_scores=None, field_data_cache=None,
+          grading_context=None):
     """
     Wraps "_grade" with the manual_transaction context manager just in case
     there are unanticipated errors.
     """
     with manual_transaction():
-        return _grade(student, request, course, keep_raw_scores)
+        return _grade(
+            student, request, course, keep_raw_scores, student_module_scores, field_data_cache, grading_context
+        )
 
 
-def _grade(student, request, course, keep_raw_scores):
+def _grade(student, request, course, keep_raw_scores, student_module_scores=None, field_data_cache=None,
+           grading_context=None):
     """
     Unwrapped version of "grade"
 
@@ -169,9 +178,21 @@ def _grade(student, request, course, keep_raw_scores):
     - keep_raw_scores : if True, then value for key 'raw_scores' contains scores
       for every graded module
 
+    student_module_scores, if given, must be the student's scores as returned by
+    get_student_module_scores (e.g., fetched in bulk with other students'); otherwise,
+    they get fetched.
+
+    field_data_cache, if given, must be a FieldDataCache of the student in the course (e.g.,
+    the one progress_summary filled) to which the descriptors of the modules which must be
+    instantiated get added; otherwise, one gets created when the first module must be.
+
+    grading_context, if given, must be the course's get_grading_context (e.g., looked up once for
+    a batch of students); otherwise, it gets looked up, which costs a query for the course's version.
+
     More information on the format is in the docstring for CourseGrader.
     """
-    grading_context = course.grading_context
+    if grading_context is None:
+        grading_context = get_grading_context(course)
     raw_scores = []
 
     # Dict of item_ids -> (earned, possible) point tuples. This *only* grabs
@@ -180,6 +201,19 @@ def _grade(student, request, course, keep_raw_scores):
     submissions_scores = sub_api.get_scores(
         course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id)
     )
+    if student_module_scores is None:
+        with manual_transaction():
+            student_module_scores = get_student_module_scores(course.id, student)
+
+    # the course's section descriptors, by location, for the sections which need them
+    section_descriptors = {}
+    if field_data_cache is None:
+        with manual_transaction():
+            field_data_cache = FieldDataCache([], course.id, student)
+
+    # the student's module scores for sections they haven't changed in since last graded
+    persisted_scores = _get_persisted_section_scores(student, course.id, grading_context['course_version'])
+    sections_to_persist = []
 
     totaled_scores = {}
     # This next complicated loop is just to collect the totaled_scores, which is
@@ -187,14 +221,13 @@ def _grade(student, request, course, keep_raw_scores):
     for section_format, sections in grading_context['graded_sections'].iteritems():
         format_scores = []
         for section in sections:
-            section_descriptor = section['section_descriptor']
-            section_name = section_descriptor.display_name_with_default
+            section_name = section['display_name']
 
             # some problems have state that is updated independently of interaction
             # with the LMS, so they need to always be scored. (E.g. foldit.,
             # combinedopenended)
             should_grade_section = any(
-                descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']
+                module['always_recalculate_grades'] for module in section['modules']
             )
 
             # If there are no problems that always have to be regraded, check to
@@ -202,53 +235,40 @@ def _grade(student, request, course, keep_raw_scores):
             # API. If scores exist, we have to calculate grades for this section.
             if not should_grade_section:
                 should_grade_section = any(
-                    descriptor.location.to_deprecated_string() in submissions_scores
-                    for descriptor in section['xmoduledescriptors']
+                    module['location'] in submissions_scores for module in section['modules']
                 )
 
+            # Otherwise, grade it only if the student has state for any of its modules
             if not should_grade_section:
-                with manual_transaction():
-                    should_grade_section = StudentModule.objects.filter(
-                        student=student,
-                        module_state_key__in=[
-                            descriptor.location for descriptor in section['xmoduledescriptors']
-                        ]
-                    ).exists()
+                should_grade_section = any(
+                    module['location'] in student_module_scores for module in section['modules']
+                )
 
             # If we haven't seen a single problem in the section, we don't have
             # to grade it at all! We can assume 0%
             if should_grade_section:
-                scores = []
-
-                def create_module(descriptor):
-                    '''creates an XModule instance given a descriptor'''
-                    # TODO: We need the request to pass into here. If we could forego that, our arguments
-                    # would be simpler
-                    with manual_transaction():
-                        field_data_cache = FieldDataCache([descriptor], course.id, student)
-                    return get_module_for_descriptor(student, request, descriptor, field_data_cache, course.id)
-
-                for module_descriptor in yield_dynamic_descriptor_descendents(section_descriptor, create_module):
-
-                    (correct, total) = get_score(
-                        course.id, student, module_descriptor, create_module, scores_cache=submissions_scores
+                can_persist = persisted_scores is not None and _can_persist_section(section, submissions_scores)
+                module_scores = persisted_scores.get(section['location']) if can_persist else None
+                if module_scores is None:
+                    module_scores = _get_scores_from_grading_context(
+                        student, section, submissions_scores, student_module_scores
                     )
-                    if correct is None and total is None:
-                        continue
-
-                    if settings.GENERATE_PROFILE_SCORES:  	# for debugging!
-                        if total > 1:
-                            correct = random.randrange(max(total - 2, 1), total + 1)
-                        else:
-                            correct = total
-
-                    graded = module_descriptor.graded
-                    if not total > 0:
-                        #We simply cannot grade a problem that is 12/0, because we might need it as a percentage
-                        graded = False
-
-                    scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
-
+                    if module_scores is None:
+                        # some module needs to be instantiated; so, walk the section's descriptors
+                        if not section_descriptors:
+                            section_descriptors = {
+                                unicode(info['section_descriptor'].location): info['section_descriptor']
+                                for format_sections in course.grading_context['graded_sections'].itervalues()
+                                for info in format_sections
+                            }
+                        module_scores = _get_section_scores(
+                            student, request, course, section_descriptors[section['location']],
+                            submissions_scores, student_module_scores, field_data_cache
+                        )
+                    if can_persist:
+                        sections_to_persist.append((section, module_scores))
+
+                scores = [_make_score(*module_score) for module_score in module_scores]
                 _, graded_total = graders.aggregate_scores(scores, section_name)
                 if keep_raw_scores:
                     raw_scores += scores
@@ -260,10 +280,15 @@ def _grade(student, request, course, keep_raw_scores):
                 format_scores.append(graded_total)
             else:
                 log.info("Unable to grade a section with a total possible score of zero. " +
-                              str(section_descriptor.location))
+                              section['location'])
 
         totaled_scores[section_format] = format_scores
 
+    if sections_to_persist:
+        _persist_section_scores(
+            student, course.id, grading_context['course_version'], sections_to_persist, student_module_scores
+        )
+
     grade_summary = course.grader.grade(totaled_scores, generate_random_scores=settings.GENERATE_PROFILE_SCORES)
 
     # We round the grade here, to make sure that the grade is an whole percentage and
@@ -279,6 +304,240 @@ def _grade(student, request, course, keep_raw_scores):
     return grade_summary
 
 
+def get_grading_context(course):
+    """
+    Return the course's grading context in the serializable form which _grade uses:
+
+        {'course_version': version, 'graded_sections': {section format: [section, ...]}}
+
+    where each section is a dict of
+        'location': the section's usage key (as unicode)
+        'display_name': the section's display_name_with_default
+        'has_dynamic_children': whether the section or any of its descendants has dynamic children
+        'modules': a dict per module in the section (incl. itself) which grading may score, in the
+            order grading visits them, of its 'location' (url), 'display_name', 'graded', 'weight',
+            and 'always_recalculate_grades'
+
+    It's cached per course version (see MixedModuleStore.get_course_version) so that grading doesn't
+    walk the course's descriptor tree. Courses whose store has no versions get it memoized on the
+    course descriptor instead, as course.grading_context is.
+    """
+    store = modulestore()
+    version = store.get_course_version(course.id) if hasattr(store, 'get_course_version') else None
+    cache_key = u'grading_context/{}/{}'.format(course.id, version)
+    if version is not None:
+        grading_context = cache.get(cache_key)
+    else:
+        grading_context = getattr(course, '_grading_context_summary', None)
+    if grading_context is not None:
+        return grading_context
+
+    graded_sections = {}
+    for section_format, sections in course.grading_context['graded_sections'].iteritems():
+        graded_sections[section_format] = [
+            _summarize_section(section['section_descriptor']) for section in sections
+        ]
+    grading_context = {'course_version': version, 'graded_sections': graded_sections}
+
+    if version is not None:
+        cache.set(cache_key, grading_context)
+    else:
+        course._grading_context_summary = grading_context  # pylint: disable=protected-access
+    return grading_context
+
+
+def _summarize_section(section_descriptor):
+    """
+    Return the section's entry for get_grading_context
+    """
+    # the descriptors in the order yield_dynamic_descriptor_descendents visits them (w/o any dynamic children)
+    descriptors = []
+    stack = [section_descriptor]
+    while stack:
+        descriptor = stack.pop()
+        stack.extend(descriptor.get_children())
+        descriptors.append(descriptor)
+
+    return {
+        'location': unicode(section_descriptor.location),
+        'display_name': section_descriptor.display_name_with_default,
+        'has_dynamic_children': any(descriptor.has_dynamic_children() for descriptor in descriptors),
+        'modules': [
+            {
+                'location': descriptor.location.to_deprecated_string(),
+                'display_name': descriptor.display_name_with_default,
+                'graded': descriptor.graded,
+                'weight': getattr(descriptor, 'weight', None),
+                'always_recalculate_grades': descriptor.always_recalculate_grades,
+            }
+            for descriptor in descriptors
+            if descriptor.has_score or descriptor.always_recalculate_grades
+        ],
+    }
+
+
+def _get_scores_from_grading_context(student, section, submissions_scores, student_module_scores):
+    """
+    Return the student's module scores, as (correct, total, graded, display_name) tuples, for a section
+    of get_grading_context computed without any descriptors, as get_score would compute them, or None
+    if that's not possible: i.e., if any of its modules must be instantiated to score it (b/c it always
+    recalculates its grade or the student has no stored max_grade for it) or the section has dynamic
+    children.
+    """
+    if section['has_dynamic_children'] or not student.is_authenticated():
+        return None
+
+    scores = []
+    for module in section['modules']:
+        location_url = module['location']
+        if location_url in submissions_scores:
+            correct, total = submissions_scores[location_url]
+        elif module['always_recalculate_grades']:
+            return None
+        else:
+            grade, max_grade = student_module_scores.get(location_url, (None, None))
+            if max_grade is None:
+                return None
+            correct = grade if grade is not None else 0
+            correct, total = _weighted_score(correct, max_grade, module['weight'], location_url)
+        scores.append((correct, total, module['graded'], module['display_name']))
+    return scores
+
+
+def _get_section_scores(student, request, course, section_descriptor, submissions_scores, student_module_scores,
+                        field_data_cache):
+    """
+    Return the student's module scores, as (correct, total, graded, display_name) tuples, for the
+    section's modules, instantiating modules as need be.
+
+    The first module instantiated adds the whole section's descriptors to the student's
+    field_data_cache in one pass; any dynamic children get added as they're instantiated.
+    """
+    scores = []
+    section_cached = []
+
+    def create_module(descriptor):
+        '''creates an XModule instance given a descriptor'''
+        # TODO: We need the request to pass into here. If we could forego that, our arguments
+        # would be simpler
+        with manual_transaction():
+            if not section_cached:
+                field_data_cache.add_descriptor_descendents(section_descriptor)
+                section_cached.append(True)
+            field_data_cache.add_descriptors_to_cache([descriptor])
+        return get_module_for_descriptor(student, request, descriptor, field_data_cache, course.id)
+
+    for module_descriptor in yield_dynamic_descriptor_descendents(section_descriptor, create_module):
+
+        (correct, total) = get_score(
+            course.id, student, module_descriptor, create_module, scores_cache=submissions_scores,
+            student_module_scores=student_module_scores,
+        )
+        if correct is None and total is None:
+            continue
+
+        scores.append((correct, total, module_descriptor.graded, module_descriptor.display_name_with_default))
+    return scores
+
+
+def _can_persist_section(section, submissions_scores):
+    """
+    Whether the student's scores for the section of get_grading_context can only change through
+    score events: i.e., none of its modules always recalculate their grades or have scores from the
+    submissions API (which change without any LMS score events)
+    """
+    return not any(
+        module['always_recalculate_grades'] or module['location'] in submissions_scores
+        for module in section['modules']
+    )
+
+
+def _get_persisted_section_scores(student, course_id, course_version):
+    """
+    Return a dict of section usage keys (as unicode) to the student's persisted module scores for that
+    version of the course, or None if grades don't get persisted for the course
+    """
+    if course_version is None or not settings.FEATURES.get('ENABLE_PERSISTENT_GRADES'):
+        return None
+    rows = PersistentSectionGrade.objects.filter(
+        student=student,
+        course_id=course_id,
+        course_version=course_version,
+    ).values_list('section_id', 'scores')
+    return {
+        section_id: [tuple(module_score) for module_score in json.loads(scores)]
+        for section_id, scores in rows
+    }
+
+
+def _persist_section_scores(student, course_id, course_version, sections, student_module_scores):
+    """
+    Persist the student's module scores for the sections, a list of (section, module scores) tuples,
+    replacing any stale ones.
+
+    Sections whose modules' StudentModule scores are no longer the student_module_scores they were
+    computed from (because a score event landed while grading) don't get persisted. The student's
+    StudentModules stay locked until the grades are written; so, a score event can't land between
+    the check and the write, and its invalidation can't run before the write.
+    """
+    current_scores = {
+        module_state_key: (grade, max_grade)
+        for module_state_key, grade, max_grade in StudentModule.objects.select_for_update().filter(
+            student=student,
+            course_id=course_id,
+        ).values_list('module_state_key', 'grade', 'max_grade')
+    }
+    sections = [
+        (section, module_scores) for section, module_scores in sections
+        if all(
+            current_scores.get(module['location']) == student_module_scores.get(module['location'])
+            for module in section['modules']
+        )
+    ]
+    if not sections:
+        transaction.commit()
+        return
+
+    section_ids = [section['location'] for section, __ in sections]
+    try:
+        PersistentSectionGrade.objects.filter(
+            student=student, course_id=course_id, section_id__in=section_ids
+        ).delete()
+        PersistentSectionGrade.objects.bulk_create([
+            PersistentSectionGrade(
+                student=student,
+                course_id=course_id,
+                section_id=section['location'],
+                course_version=course_version,
+                module_ids=json.dumps([module['location'] for module in section['modules']]),
+                scores=json.dumps(module_scores),
+            )
+            for section, module_scores in sections
+        ])
+    except IntegrityError:
+        # a concurrent grading of the student persisted them first
+        transaction.rollback()
+    else:
+        transaction.commit()
+
+
+def _make_score(correct, total, graded, display_name):
+    """
+    Return the Score for a module
+    """
+    if settings.GENERATE_PROFILE_SCORES:  	# for debugging!
+        if total > 1:
+            correct = random.randrange(max(total - 2, 1), total + 1)
+        else:
+            correct = total
+
+    if not total > 0:
+        #We simply cannot grade a problem that is 12/0, because we might need it as a percentage
+        graded = False
+
+    return Score(correct, total, graded, display_name)
+
+
 def grade_for_percentage(grade_cutoffs, percentage):
     """
     Returns a letter grade as defined in grading_policy (e.g. 'A' 'B' 'C' for 6.002x) or None.
@@ -302,19 +561,19 @@ def grade_for_percentage(grade_cutoffs, percentage):
 
 
 @transaction.commit_manually
-def progress_summary(student, request, course):
+def progress_summary(student, request, course, field_data_cache=None):
     """
     Wraps "_progress_summary" with the manual_transaction context manager just
     in case there are unanticipated errors.
     """
     with manual_transaction():
-        return _progress_summary(student, request, course)
+        return _progress_summary(student, request, course, field_data_cache)
 
 
 # TODO: This method is not very good. It was written in the old course style and
 # then converted over and performance is not good. Once the progress page is redesigned
 # to not have the progress summary this method should be deleted (so it won't be copied).
-def _progress_summary(student, request, course):
+def _progress_summary(student, request, course, field_data_cache=None):
     """
     Unwrapped version of "progress_summary".
 
@@ -330,15 +589,20 @@ def _progress_summary(student, request, course):
     Arguments:
         student: A User object for the student to grade
         course: A Descriptor containing the course to grade
+        field_data_cache: An optional FieldDataCache of the student in the course to which
+            the course's descriptors get added (so that grade can then reuse it)
 
     If the student does not have access to load the course module, this function
     will return None.
 
     """
     with manual_transaction():
-        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
-            course.id, student, course, depth=None
-        )
+        if field_data_cache is None:
+            field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
+                course.id, student, course, depth=None
+            )
+        else:
+            field_data_cache.add_descriptor_descendents(course, depth=None)
         # TODO: We need the request to pass into here. If we could
         # forego that, our arguments would be simpler
         course_module = get_module_for_descriptor(student, request, course, field_data_cache, course.id)
@@ -347,6 +611,8 @@ def _progress_summary(student, request, course):
             return None
 
     submissions_scores = sub_api.get_scores(course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id))
+    with manual_transaction():
+        student_module_scores = get_student_module_scores(course.id, student)
 
     chapters = []
     # Don't include chapters that aren't displayable (e.g. due to error)
@@ -371,7 +637,8 @@ def _progress_summary(student, request, course):
                 for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
                     course_id = course.id
                     (correct, total) = get_score(
-                        course_id, student, module_descriptor, module_creator, scores_cache=submissions_scores
+                        course_id, student, module_descriptor, module_creator, scores_cache=submissions_scores,
+                        student_module_scores=student_module_scores,
                     )
                     if correct is None and total is None:
                         continue
@@ -403,7 +670,40 @@ def _progress_summary(student, request, course):
     return chapters
 
 
-def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=None):
+def get_student_module_scores(course_id, student):
+    """
+    Return a dict of location urls to (grade, max_grade) tuples for all of the
+    student's StudentModules in the course, fetched with a single query.
+
+    A module is in the dict iff the student has state for it, even if it has no
+    grade, so this also answers whether the student has seen a module.
+    """
+    return {
+        module_state_key: (grade, max_grade)
+        for module_state_key, grade, max_grade in StudentModule.objects.filter(
+            student=student,
+            course_id=course_id,
+        ).values_list('module_state_key', 'grade', 'max_grade').iterator()
+    }
+
+
+def get_bulk_student_module_scores(course_id, students):
+    """
+    Return a dict of student ids to the students' scores (as returned by
+    get_student_module_scores) fetched with a single query. Students with no
+    StudentModules in the course map to empty dicts.
+    """
+    scores = {student.id: {} for student in students}
+    rows = StudentModule.objects.filter(
+        student__in=scores.keys(),
+        course_id=course_id,
+    ).values_list('student_id', 'module_state_key', 'grade', 'max_grade')
+    for student_id, module_state_key, grade, max_grade in rows.iterator():
+        scores[student_id][module_state_key] = (grade, max_grade)
+    return scores
+
+
+def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=None, student_module_scores=None):
     """
     Return the score for a user on a problem, as a tuple (correct, total).
     e.g. (5,7) if you got 5 out of 7 points.
@@ -417,6 +717,8 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
            Can return None if user doesn't have access, or if something else went wrong.
     scores_cache: A dict of location names to (earned, possible) point tuples.
            If an entry is found in this cache, it takes precedence.
+    student_module_scores: The user's scores as returned by get_student_module_scores.
+           If None, the problem's StudentModule gets queried.
     """
     scores_cache = scores_cache or {}
 
@@ -443,18 +745,22 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
         # These are not problems, and do not have a score
         return (None, None)
 
-    try:
-        student_module = StudentModule.objects.get(
-            student=user,
-            course_id=course_id,
-            module_state_key=problem_descriptor.location
-        )
-    except StudentModule.DoesNotExist:
-        student_module = None
+    if student_module_scores is not None:
+        grade, max_grade = student_module_scores.get(location_url, (None, None))
+    else:
+        try:
+            student_module = StudentModule.objects.get(
+                student=user,
+                course_id=course_id,
+                module_state_key=problem_descriptor.location
+            )
+            grade, max_grade = student_module.grade, student_module.max_grade
+        except StudentModule.DoesNotExist:
+            grade = max_grade = None
 
-    if student_module is not None and student_module.max_grade is not None:
-        correct = student_module.grade if student_module.grade is not None else 0
-        total = student_module.max_grade
+    if max_grade is not None:
+        correct = grade if grade is not None else 0
+        total = max_grade
     else:
         # If the problem was not in the cache, or hasn't been graded yet,
         # we need to instantiate the problem.
@@ -472,10 +778,16 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
             return (None, None)
 
     # Now we re-weight the problem, if specified
-    weight = problem_descriptor.weight
+    return _weighted_score(correct, total, problem_descriptor.weight, location_url)
+
+
+def _weighted_score(correct, total, weight, location_url):
+    """
+    Return the (correct, total) score re-weighted to the given weight, if any
+    """
     if weight is not None:
         if total == 0:
-            log.exception("Cannot reweight a problem with zero total points. Problem: " + str(student_module))
+            log.exception("Cannot reweight a problem with zero total points. Problem: " + location_url)
             return (correct, total)
         correct = correct * weight / total
         total = weight
@@ -496,11 +808,17 @@ def manual_transaction():
         transaction.commit()
 
 
-def iterate_grades_for(course_id, students):
+def iterate_grades_for(course_id, students, batch_size=BULK_GRADING_BATCH_SIZE):
     """Given a course_id and an iterable of students (User), yield a tuple of:
 
     (student, gradeset, err_msg) for every student enrolled in the course.
 
+    Students are graded in batches of batch_size: each batch's StudentModule
+    scores are fetched with one query rather than per student and the course
+    is shared by all of the students. The grading context (and so the course's
+    version) is looked up once per batch, so a long run picks up course edits
+    between batches.
+
     If an error occurred, gradeset will be an empty dict and err_msg will be an
     exception message. If there was no error, err_msg is an empty string.
 
@@ -521,25 +839,56 @@ def iterate_grades_for(course_id, students):
     # grading that student.
     request = RequestFactory().get('/')
 
-    for student in students:
-        with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=['action:{}'.format(course_id)]):
-            try:
-                request.user = student
-                # Grading calls problem rendering, which calls masquerading,
-                # which checks session vars -- thus the empty session dict below.
-                # It's not pretty, but untangling that is currently beyond the
-                # scope of this feature.
-                request.session = {}
-                gradeset = grade(student, request, course)
-                yield student, gradeset, ""
-            except Exception as exc:  # pylint: disable=broad-except
-                # Keep marching on even if this student couldn't be graded for
-                # some reason, but log it for future reference.
-                log.exception(
-                    'Cannot grade student %s (%s) in course %s because of exception: %s',
-                    student.username,
-                    student.id,
-                    course_id,
-                    exc.message
-                )
-                yield student, {}, exc.message
+    students = iter(students)
+    while True:
+        batch = list(itertools.islice(students, batch_size))
+        if not batch:
+            break
+
+        try:
+            with dog_stats_api.timer('lms.grades.iterate_grades_for.bulk_scores', tags=['action:{}'.format(course_id)]):
+                bulk_scores = get_bulk_student_module_scores(course_id, batch)
+        except Exception:  # pylint: disable=broad-except
+            # each student's grading will fetch their own scores (and report any error)
+            log.exception('Cannot fetch the scores of a batch of students in course %s', course_id)
+            bulk_scores = {}
+
+        try:
+            grading_context = get_grading_context(course)
+        except Exception:  # pylint: disable=broad-except
+            # each student's grading will look it up itself (and report any error)
+            log.exception('Cannot get the grading context of course %s', course_id)
+            grading_context = None
+
+        for student in batch:
+            yield _grade_for_iteration(student, request, course, bulk_scores.get(student.id), grading_context)
+
+
+def _grade_for_iteration(student, request, course, student_module_scores, grading_context):
+    """
+    Return the (student, gradeset, err_msg) tuple for iterate_grades_for
+    """
+    course_id = course.id
+    with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=['action:{}'.format(course_id)]):
+        try:
+            request.user = student
+            # Grading calls problem rendering, which calls masquerading,
+            # which checks session vars -- thus the empty session dict below.
+            # It's not pretty, but untangling that is currently beyond the
+            # scope of this feature.
+            request.session = {}
+            gradeset = grade(
+                student, request, course, student_module_scores=student_module_scores, grading_context=grading_context
+            )
+            return student, gradeset, ""
+        except Exception as exc:  # pylint: disable=broad-except
+            # Keep marching on even if this student couldn't be graded for
+            # some reason, but log it for future reference.
+            log.exception(
+                'Cannot grade student %s (%s) in course %s because of exception: %s',
+                student.username,
+                student.id,
+                course_id,
+                exc.message
+            )
+            return student, {}, exc.message
@@ -0,0 +1,126 @@
+"""
+A command to benchmark the Mongo modulestore round trips made when rendering the courseware index.
+
+It emulates the modulestore access pattern of courseware.views.index (the course to depth 2, then
+the active section and all of its descendants) and reports the number of queries and the wall time
+with level by level child loading vs the single query whole course prefetch.
+"""
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import modulestore
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+from opaque_keys.edx.locations import SlashSeparatedCourseKey
+from request_cache.middleware import RequestCache
+
+
+class Command(BaseCommand):
+    """Benchmark the courseware index's modulestore access w/ and w/o the whole course prefetch."""
+
+    args = "<course_id>"
+    help = "Benchmarks the modulestore queries made to render a course's courseware index page."
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--repeat',
+            type='int',
+            default=5,
+            help="Number of times to load the course in each mode.",
+        ),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError("benchmark_course_prefetch requires one argument: <course_id>")
+        try:
+            course_key = CourseKey.from_string(args[0])
+        except InvalidKeyError:
+            course_key = SlashSeparatedCourseKey.from_deprecated_string(args[0])
+
+        store = modulestore()
+        if hasattr(store, '_get_modulestore_by_type'):
+            store = store._get_modulestore_by_type(ModuleStoreEnum.Type.mongo)  # pylint: disable=protected-access
+        if store.get_course(course_key) is None:
+            raise CommandError("Course {} not found in the mongo modulestore".format(course_key))
+
+        print "{:<12} {:>10} {:>12}".format('mode', 'queries', 'time (ms)')
+        original = store.prefetch_whole_course
+        try:
+            for mode, prefetch in (('by level', False), ('prefetch', True)):
+                store.prefetch_whole_course = prefetch
+                queries, elapsed = time_index_loads(store, course_key, options['repeat'])
+                print "{:<12} {:>10} {:>12.2f}".format(mode, queries, elapsed * 1000)
+        finally:
+            store.prefetch_whole_course = original
+
+
+def time_index_loads(store, course_key, repeat):
+    """
+    Return the number of finds per load and the mean wall time of loading the course as the
+    courseware index does.
+    """
+    counter = FindCounter(store.collection)
+    request_cache = RequestCache()
+    total = 0
+    try:
+        for __ in range(repeat):
+            # each load emulates a fresh request (prefetches are only made during requests)
+            request_cache.process_request(None)
+            try:
+                counter.count = 0
+                start = time.time()
+                load_index(store, course_key)
+                total += time.time() - start
+            finally:
+                request_cache.process_response(None, None)
+    finally:
+        counter.restore()
+    return counter.count, total / repeat
+
+
+def load_index(store, course_key):
+    """
+    Load the course's blocks in the same way courseware.views.index does for the first section
+    """
+    course = store.get_course(course_key, depth=2)
+    chapters = course.get_children()
+    if not chapters:
+        return
+    sections = chapters[0].get_children()
+    if not sections:
+        return
+    section = store.get_item(sections[0].location, depth=None)
+    to_visit = [section]
+    while to_visit:
+        block = to_visit.pop()
+        if block.has_children:
+            to_visit.extend(block.get_children())
+
+
+class FindCounter(object):
+    """
+    Counts the calls to a collection's find (which find_one also uses) until restored
+    """
+    def __init__(self, collection):
+        self.collection = collection
+        self.count = 0
+        self._find = collection.find
+
+        def _counting_find(*args, **kwargs):
+            """
+            Count then delegate to the collection's own find
+            """
+            self.count += 1
+            return self._find(*args, **kwargs)
+
+        collection.find = _counting_find
+
+    def restore(self):
+        """
+        Stop counting
+        """
+        del self.collection.find
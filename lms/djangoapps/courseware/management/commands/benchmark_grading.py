@@ -0,0 +1,88 @@
+"""
+A command to benchmark grading a course's students.
+
+It grades some of the course's enrolled students and reports the mean number of SQL queries and the
+mean wall time per student along with the number of graded modules in the course, so that the
+queries per student can be checked not to grow with the size of the course.
+"""
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+
+from courseware import courses, grades
+from student.models import CourseEnrollment
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+from opaque_keys.edx.locations import SlashSeparatedCourseKey
+
+
+class Command(BaseCommand):
+    """Benchmark the SQL queries and time it takes to grade students."""
+
+    args = "<course_id>"
+    help = "Benchmarks the SQL queries and wall time per student of grading a course."
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--students',
+            type='int',
+            default=10,
+            help="Number of enrolled students to grade.",
+        ),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError("benchmark_grading requires one argument: <course_id>")
+        try:
+            course_key = CourseKey.from_string(args[0])
+        except InvalidKeyError:
+            course_key = SlashSeparatedCourseKey.from_deprecated_string(args[0])
+
+        students = list(CourseEnrollment.users_enrolled_in(course_key)[:options['students']])
+        if not students:
+            raise CommandError("Course {} has no enrolled students".format(course_key))
+
+        course = courses.get_course_by_id(course_key)
+        graded_modules = sum(
+            len(section['xmoduledescriptors'])
+            for sections in course.grading_context['graded_sections'].itervalues()
+            for section in sections
+        )
+
+        queries, elapsed, errors = time_grading(course_key, students)
+        print "graded modules:       {}".format(graded_modules)
+        print "students graded:      {} ({} errors)".format(len(students), errors)
+        print "queries per student:  {:.1f}".format(queries / float(len(students)))
+        print "time per student (ms): {:.2f}".format(elapsed * 1000 / len(students))
+
+
+def time_grading(course_key, students):
+    """
+    Return the total number of SQL queries, the total wall time, and the number of errors of grading
+    the students
+    """
+    previous_use_debug_cursor = connection.use_debug_cursor
+    # record the queries even if DEBUG is off
+    connection.use_debug_cursor = True
+    queries = 0
+    errors = 0
+    elapsed = 0
+    try:
+        gradesets = grades.iterate_grades_for(course_key, students)
+        while True:
+            reset_queries()
+            start = time.time()
+            try:
+                __, __, err_msg = gradesets.next()
+            except StopIteration:
+                break
+            elapsed += time.time() - start
+            queries += len(connection.queries)
+            if err_msg:
+                errors += 1
+    finally:
+        connection.use_debug_cursor = previous_use_debug_cursor
+    return queries, elapsed, errors
@@ -52,23 +52,71 @@ class FieldDataCache(object):
         state will have a StudentModule.
 
         Arguments
-        descriptors: A list of XModuleDescriptors.
+        descriptors: A list of XModuleDescriptors. More can be added later with
+            add_descriptors_to_cache or add_descriptor_descendents; so, one FieldDataCache
+            can serve all of a user's modules in a course.
         course_id: The id of the current course
         user: The user for which to cache data
         select_for_update: True if rows should be locked until end of transaction
         '''
         self.cache = {}
-        self.descriptors = descriptors
+        self.descriptors = []
         self.select_for_update = select_for_update
 
         assert isinstance(course_id, SlashSeparatedCourseKey)
         self.course_id = course_id
         self.user = user
 
-        if user.is_authenticated():
-            for scope, fields in self._fields_to_cache().items():
-                for field_object in self._retrieve_fields(scope, fields):
-                    self.cache[self._cache_key_from_field_object(scope, field_object)] = field_object
+        # What's already been fetched, to only fetch what's new when descriptors get added:
+        # the usage_ids of the descriptors, the usage_ids of the StudentModules added w/ add_student_modules,
+        # the (usage_id, field name)s of user_state_summary fields,
+        # the (block type, field name)s of preferences fields, and the names of user_info fields
+        self._cached_usage_ids = set()
+        self._cached_student_module_ids = set()
+        self._cached_summary_fields = set()
+        self._cached_preferences = set()
+        self._cached_user_info = set()
+
+        self.add_descriptors_to_cache(descriptors)
+
+    def add_descriptors_to_cache(self, descriptors):
+        """
+        Add the descriptors to this cache, fetching the data of those not already in it in a
+        single pass (a query or a few chunked ones per scope). The data already in the cache
+        is kept as is (it may have been modified).
+        """
+        new_descriptors = []
+        for descriptor in descriptors:
+            usage_id = descriptor.scope_ids.usage_id
+            if usage_id not in self._cached_usage_ids:
+                self._cached_usage_ids.add(usage_id)
+                new_descriptors.append(descriptor)
+        if not new_descriptors:
+            return
+        self.descriptors.extend(new_descriptors)
+
+        if self.user.is_authenticated():
+            for scope, fields in self._fields_to_cache(new_descriptors).items():
+                for field_object in self._retrieve_fields(scope, fields, new_descriptors):
+                    self.cache.setdefault(self._cache_key_from_field_object(scope, field_object), field_object)
+
+    def add_student_modules(self, student_modules):
+        """
+        Add StudentModules of this cache's user which have already been fetched (e.g., in bulk
+        w/ other users') to this cache, so that adding their descriptors won't query them again.
+        """
+        for student_module in student_modules:
+            assert student_module.student_id == self.user.id
+            usage_id = student_module.module_state_key.map_into_course(self.course_id)
+            self._cached_student_module_ids.add(usage_id)
+            self.cache.setdefault((Scope.user_state, usage_id), student_module)
+
+    def add_descriptor_descendents(self, descriptor, depth=None, descriptor_filter=lambda descriptor: True):
+        """
+        Add the descriptor and its descendents to this cache. The arguments are as for
+        cache_for_descriptor_descendents.
+        """
+        self.add_descriptors_to_cache(self._get_child_descriptors(descriptor, depth, descriptor_filter))
 
     @classmethod
     def cache_for_descriptor_descendents(cls, course_id, user, descriptor, depth=None,
@@ -84,33 +132,33 @@ class FieldDataCache(object):
             should be cached
         select_for_update: Flag indicating whether the rows should be locked until end of transaction
         """
+        descriptors = cls._get_child_descriptors(descriptor, depth, descriptor_filter)
 
-        def get_child_descriptors(descriptor, depth, descriptor_filter):
-            """
-            Return a list of all child descriptors down to the specified depth
-            that match the descriptor filter. Includes `descriptor`
-
-            descriptor: The parent to search inside
-            depth: The number of levels to descend, or None for infinite depth
-            descriptor_filter(descriptor): A function that returns True
-                if descriptor should be included in the results
-            """
-            if descriptor_filter(descriptor):
-                descriptors = [descriptor]
-            else:
-                descriptors = []
+        return FieldDataCache(descriptors, course_id, user, select_for_update)
 
-            if depth is None or depth > 0:
-                new_depth = depth - 1 if depth is not None else depth
+    @classmethod
+    def _get_child_descriptors(cls, descriptor, depth, descriptor_filter):
+        """
+        Return a list of all child descriptors down to the specified depth
+        that match the descriptor filter. Includes `descriptor`
 
-                for child in descriptor.get_children() + descriptor.get_required_module_descriptors():
-                    descriptors.extend(get_child_descriptors(child, new_depth, descriptor_filter))
+        descriptor: The parent to search inside
+        depth: The number of levels to descend, or None for infinite depth
+        descriptor_filter(descriptor): A function that returns True
+            if descriptor should be included in the results
+        """
+        if descriptor_filter(descriptor):
+            descriptors = [descriptor]
+        else:
+            descriptors = []
 
-            return descriptors
+        if depth is None or depth > 0:
+            new_depth = depth - 1 if depth is not None else depth
 
-        descriptors = get_child_descriptors(descriptor, depth, descriptor_filter)
+            for child in descriptor.get_children() + descriptor.get_required_module_descriptors():
+                descriptors.extend(cls._get_child_descriptors(child, new_depth, descriptor_filter))
 
-        return FieldDataCache(descriptors, course_id, user, select_for_update)
+        return descriptors
 
     def _query(self, model_class, **kwargs):
         """
@@ -137,48 +185,78 @@ class FieldDataCache(object):
         )
         return res
 
-    def _retrieve_fields(self, scope, fields):
+    def _retrieve_fields(self, scope, fields, descriptors):
         """
-        Queries the database for all of the fields in the specified scope
+        Queries the database for the fields in the specified scope of the descriptors
+        which haven't already been fetched
         """
         if scope == Scope.user_state:
+            usage_ids = [
+                descriptor.scope_ids.usage_id for descriptor in descriptors
+                if descriptor.scope_ids.usage_id.map_into_course(self.course_id) not in self._cached_student_module_ids
+            ]
+            if not usage_ids:
+                return []
             return self._chunked_query(
                 StudentModule,
                 'module_state_key__in',
-                (descriptor.scope_ids.usage_id for descriptor in self.descriptors),
+                usage_ids,
                 course_id=self.course_id,
                 student=self.user.pk,
             )
         elif scope == Scope.user_state_summary:
+            field_names = set(field.name for field in fields)
+            usage_ids = set(
+                descriptor.scope_ids.usage_id for descriptor in descriptors
+                if any(
+                    (descriptor.scope_ids.usage_id, field_name) not in self._cached_summary_fields
+                    for field_name in field_names
+                )
+            )
+            self._cached_summary_fields.update(
+                (usage_id, field_name) for usage_id in usage_ids for field_name in field_names
+            )
+            if not usage_ids:
+                return []
             return self._chunked_query(
                 XModuleUserStateSummaryField,
                 'usage_id__in',
-                (descriptor.scope_ids.usage_id for descriptor in self.descriptors),
-                field_name__in=set(field.name for field in fields),
+                usage_ids,
+                field_name__in=field_names,
             )
         elif scope == Scope.preferences:
+            new_preferences = set(
+                (descriptor.scope_ids.block_type, field.name) for descriptor in descriptors for field in fields
+            ) - self._cached_preferences
+            if not new_preferences:
+                return []
+            self._cached_preferences.update(new_preferences)
             return self._chunked_query(
                 XModuleStudentPrefsField,
                 'module_type__in',
-                set(descriptor.scope_ids.block_type for descriptor in self.descriptors),
+                set(block_type for block_type, __ in new_preferences),
                 student=self.user.pk,
-                field_name__in=set(field.name for field in fields),
+                field_name__in=set(field_name for __, field_name in new_preferences),
             )
         elif scope == Scope.user_info:
+            field_names = set(field.name for field in fields) - self._cached_user_info
+            if not field_names:
+                return []
+            self._cached_user_info.update(field_names)
             return self._query(
                 XModuleStudentInfoField,
                 student=self.user.pk,
-                field_name__in=set(field.name for field in fields),
+                field_name__in=field_names,
             )
         else:
             return []
 
-    def _fields_to_cache(self):
+    def _fields_to_cache(self, descriptors):
         """
-        Returns a map of scopes to fields in that scope that should be cached
+        Returns a map of scopes to fields in that scope that should be cached for the descriptors
         """
         scope_map = defaultdict(set)
-        for descriptor in self.descriptors:
+        for descriptor in descriptors:
             for field in descriptor.fields.values():
                 scope_map[field.scope].add(field)
         return scope_map
@@ -12,10 +12,12 @@ file and check it in at the same time as your model changes. To do that,
 ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 """
+import json
+
 from django.contrib.auth.models import User
 from django.conf import settings
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 from xmodule_django.models import CourseKeyField, LocationKeyField
@@ -224,6 +226,56 @@ class XModuleStudentInfoField(models.Model):
         return unicode(repr(self))
 
 
+class PersistentSectionGrade(models.Model):
+    """
+    A student's scores on the modules of one graded section (subsection) of a course
+    as computed by courseware.grades for a version of the course. They're stale once
+    the course version changes or a score event hits any of the section's modules.
+    """
+    class Meta:
+        unique_together = (('student', 'course_id', 'section_id'),)
+
+    student = models.ForeignKey(User, db_index=True)
+    course_id = CourseKeyField(max_length=255, db_index=True)
+
+    # The section's usage key
+    section_id = models.CharField(max_length=255)
+
+    # The course version the scores were computed for (see MixedModuleStore.get_course_version)
+    course_version = models.CharField(max_length=255)
+
+    # The urls of all of the section's modules which can have scores, as a JSON list
+    module_ids = models.TextField()
+
+    # The modules' scores as a JSON list of [correct, total, graded, display_name]
+    scores = models.TextField()
+
+    modified = models.DateTimeField(auto_now=True, db_index=True)
+
+    @classmethod
+    def invalidate(cls, student_id, course_id, module_state_key):
+        """
+        Delete the student's persisted grades for the sections which contain the module
+        """
+        if settings.FEATURES.get('ENABLE_PERSISTENT_GRADES'):
+            cls.objects.filter(
+                student=student_id,
+                course_id=course_id,
+                module_ids__contains=json.dumps(module_state_key.to_deprecated_string()),
+            ).delete()
+
+    def __unicode__(self):
+        return "[PersistentSectionGrade] %s: %s %s" % (self.student_id, self.course_id, self.section_id)
+
+
+@receiver(post_delete, sender=StudentModule)
+def invalidate_persistent_section_grades(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Deleting a StudentModule (e.g., resetting a student's state) deletes its score
+    """
+    PersistentSectionGrade.invalidate(instance.student_id, instance.course_id, instance.module_state_key)
+
+
 class OfflineComputedGrade(models.Model):
     """
     Table of grades computed offline for a given user and course.
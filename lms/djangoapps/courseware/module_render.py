@@ -20,6 +20,7 @@ from capa.xqueue_interface import XQueueInterface
 from courseware.access import has_access, get_user_role
 from courseware.masquerade import setup_masquerade
 from courseware.model_data import FieldDataCache, DjangoKeyValueStore
+from courseware.models import PersistentSectionGrade
 from lms.lib.xblock.field_data import LmsFieldData
 from lms.lib.xblock.runtime import LmsModuleSystem, unquote_slashes, quote_slashes
 from edxmako.shortcuts import render_to_string
@@ -37,7 +38,7 @@ from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from xmodule.modulestore.django import modulestore, ModuleI18nService
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.util.duedate import get_extended_due_date
-from xmodule_modifiers import replace_course_urls, replace_jump_to_id_urls, replace_static_urls, add_staff_markup, wrap_xblock
+from xmodule_modifiers import replace_urls, add_staff_markup, wrap_xblock
 from xmodule.lti_module import LTIModule
 from xmodule.x_module import XModuleDescriptor
 
@@ -330,6 +331,8 @@ def get_module_system_for_user(user, field_data_cache,
         student_module.max_grade = event.get('max_value')
         # Save all changes to the underlying KeyValueStore
         student_module.save()
+        # The sections containing the module need regrading
+        PersistentSectionGrade.invalidate(user_id, course_id, descriptor.location)
 
         # Bin score into range and increment stats
         score_bucket = get_score_bucket(student_module.grade, student_module.max_grade)
@@ -412,27 +415,21 @@ def get_module_system_for_user(user, field_data_cache,
     # prefix is going to have to be specific to the module, not the directory
     # that the xml was loaded from
 
-    # Rewrite urls beginning in /static to point to course-specific content
-    block_wrappers.append(partial(
-        replace_static_urls,
-        getattr(descriptor, 'data_dir', None),
-        course_id=course_id,
-        static_asset_path=static_asset_path or descriptor.static_asset_path
-    ))
-
-    # Allow URLs of the form '/course/' refer to the root of multicourse directory
+    # Rewrite, in one pass over the content:
+    # - urls beginning in /static to point to course-specific content
+    # - URLs of the form '/course/' to refer to the root of multicourse directory
     #   hierarchy of this course
-    block_wrappers.append(partial(replace_course_urls, course_id))
-
-    # this will rewrite intra-courseware links (/jump_to_id/<id>). This format
-    # is an improvement over the /course/... format for studio authored courses,
-    # because it is agnostic to course-hierarchy.
+    # - intra-courseware links (/jump_to_id/<id>). This format
+    #   is an improvement over the /course/... format for studio authored courses,
+    #   because it is agnostic to course-hierarchy.
     # NOTE: module_id is empty string here. The 'module_id' will get assigned in the replacement
     # function, we just need to specify something to get the reverse() to work.
     block_wrappers.append(partial(
-        replace_jump_to_id_urls,
+        replace_urls,
+        getattr(descriptor, 'data_dir', None),
         course_id,
         reverse('jump_to_id', kwargs={'course_id': course_id.to_deprecated_string(), 'module_id': ''}),
+        static_asset_path=static_asset_path or descriptor.static_asset_path
     ))
 
     if settings.FEATURES.get('DISPLAY_DEBUG_INFO_TO_STAFF'):
@@ -1,20 +1,29 @@
 """
 Test grade calculation.
 """
+from django.conf import settings
 from django.http import Http404
+from django.test.client import RequestFactory
 from django.test.utils import override_settings
 from mock import patch
 
+from courseware.models import StudentModule, PersistentSectionGrade
+from courseware.tests.factories import StudentModuleFactory
 from courseware.tests.modulestore_config import TEST_DATA_MIXED_MODULESTORE
 from student.tests.factories import UserFactory
-from xmodule.modulestore.tests.factories import CourseFactory
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
-from courseware.grades import grade, iterate_grades_for
+from courseware.grades import (
+    grade, iterate_grades_for, get_score, get_student_module_scores, get_bulk_student_module_scores,
+    get_grading_context
+)
 
 
-def _grade_with_errors(student, request, course, keep_raw_scores=False):
+def _grade_with_errors(student, request, course, keep_raw_scores=False, student_module_scores=None,
+                       grading_context=None):
     """This fake grade method will throw exceptions for student3 and
     student4, but allow any other students to go through normal grading.
 
@@ -25,7 +34,10 @@ def _grade_with_errors(student, request, course, keep_raw_scores=False):
     if student.username in ['student3', 'student4']:
         raise Exception("I don't like {}".format(student.username))
 
-    return grade(student, request, course, keep_raw_scores=keep_raw_scores)
+    return grade(
+        student, request, course, keep_raw_scores=keep_raw_scores, student_module_scores=student_module_scores,
+        grading_context=grading_context
+    )
 
 
 @override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
@@ -74,6 +86,20 @@ class TestGradeIteration(ModuleStoreTestCase):
             self.assertIsNone(gradeset['grade'])
             self.assertEqual(gradeset['percent'], 0.0)
 
+    def test_batches(self):
+        """Students are graded in order across batches"""
+        all_gradesets = list(iterate_grades_for(self.course.id, iter(self.students), batch_size=2))
+        self.assertEqual([student for student, __, __ in all_gradesets], self.students)
+        self.assertEqual([err_msg for __, __, err_msg in all_gradesets], [""] * len(self.students))
+
+    def test_course_version_per_batch(self):
+        """The course's version is looked up once per batch rather than per student"""
+        store = modulestore()
+        with patch.object(store, 'get_course_version', wraps=store.get_course_version) as mock_version:
+            all_gradesets = list(iterate_grades_for(self.course.id, iter(self.students), batch_size=2))
+        self.assertEqual([err_msg for __, __, err_msg in all_gradesets], [""] * len(self.students))
+        self.assertEqual(mock_version.call_count, 3)
+
     @patch('courseware.grades.grade', _grade_with_errors)
     def test_grading_exception(self):
         """Test that we correctly capture exception messages that bubble up from
@@ -121,3 +147,170 @@ class TestGradeIteration(ModuleStoreTestCase):
                 students_to_errors[student] = err_msg
 
         return students_to_gradesets, students_to_errors
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class TestStudentModuleScores(ModuleStoreTestCase):
+    """
+    Test looking up a student's scores for a whole course at once.
+    """
+    def setUp(self):
+        """
+        Create a course with a few problems and a student who has state for some of them
+        """
+        self.course = CourseFactory.create()
+        self.problems = [
+            ItemFactory.create(parent_location=self.course.location, category='problem')
+            for __ in range(3)
+        ]
+        self.student = UserFactory.create()
+        StudentModuleFactory.create(
+            student=self.student, course_id=self.course.id, module_state_key=self.problems[0].location,
+            grade=1, max_grade=2
+        )
+        StudentModuleFactory.create(
+            student=self.student, course_id=self.course.id, module_state_key=self.problems[1].location
+        )
+        # another student's state mustn't be included
+        StudentModuleFactory.create(
+            course_id=self.course.id, module_state_key=self.problems[2].location, grade=2, max_grade=2
+        )
+
+    def test_one_query(self):
+        with self.assertNumQueries(1):
+            scores = get_student_module_scores(self.course.id, self.student)
+        self.assertEqual(scores, {
+            self.problems[0].location.to_deprecated_string(): (1, 2),
+            self.problems[1].location.to_deprecated_string(): (None, None),
+        })
+
+    def test_get_score_without_queries(self):
+        scores = get_student_module_scores(self.course.id, self.student)
+        with self.assertNumQueries(0):
+            for problem, expected in zip(self.problems, [(1, 2), (None, None), (None, None)]):
+                score = get_score(
+                    self.course.id, self.student, problem, lambda descriptor: None, student_module_scores=scores
+                )
+                self.assertEqual(score, expected)
+
+    def test_bulk_one_query(self):
+        other_student = UserFactory.create()
+        with self.assertNumQueries(1):
+            bulk_scores = get_bulk_student_module_scores(self.course.id, [self.student, other_student])
+        self.assertEqual(bulk_scores[self.student.id], get_student_module_scores(self.course.id, self.student))
+        self.assertEqual(bulk_scores[other_student.id], {})
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class TestGradingContext(ModuleStoreTestCase):
+    """
+    Test grading from the serializable grading context.
+    """
+    def setUp(self):
+        """
+        Create a course with a graded section of problems
+        """
+        course = CourseFactory.create()
+        chapter = ItemFactory.create(parent_location=course.location, category='chapter')
+        self.section = ItemFactory.create(
+            parent_location=chapter.location, category='sequential',
+            metadata={'graded': True, 'format': 'Homework'}
+        )
+        self.problems = [
+            ItemFactory.create(parent_location=self.section.location, category='problem')
+            for __ in range(2)
+        ]
+        self.course = modulestore().get_course(course.id)
+        self.student = UserFactory.create()
+
+    def test_summary(self):
+        grading_context = get_grading_context(self.course)
+        section, = grading_context['graded_sections']['Homework']
+        self.assertEqual(section['location'], unicode(self.section.location))
+        self.assertFalse(section['has_dynamic_children'])
+        # in the order grading visits them
+        self.assertEqual(
+            [module['location'] for module in section['modules']],
+            [problem.location.to_deprecated_string() for problem in reversed(self.problems)]
+        )
+        # the summary gets cached
+        with patch('courseware.grades._summarize_section') as mock_summarize:
+            self.assertEqual(get_grading_context(self.course), grading_context)
+        self.assertFalse(mock_summarize.called)
+
+    def test_summary_without_version(self):
+        # e.g., an XML course
+        with patch('courseware.grades.modulestore') as mock_modulestore:
+            mock_modulestore.return_value.get_course_version.return_value = None
+            grading_context = get_grading_context(self.course)
+            self.assertIsNone(grading_context['course_version'])
+            with patch('courseware.grades._summarize_section') as mock_summarize:
+                self.assertEqual(get_grading_context(self.course), grading_context)
+        self.assertFalse(mock_summarize.called)
+
+    def _create_student_modules(self):
+        """
+        Give the student a score of 1 out of 2 on every problem
+        """
+        for problem in self.problems:
+            StudentModuleFactory.create(
+                student=self.student, course_id=self.course.id, module_state_key=problem.location,
+                grade=1, max_grade=2
+            )
+
+    def _raw_scores(self):
+        """
+        Grade the student and return their (earned, possible) raw scores
+        """
+        request = RequestFactory().get('/')
+        request.user = self.student
+        request.session = {}
+        grade_summary = grade(self.student, request, self.course, keep_raw_scores=True)
+        return [(score.earned, score.possible) for score in grade_summary['raw_scores']]
+
+    def test_grade_without_descriptors(self):
+        self._create_student_modules()
+        with patch('courseware.grades._get_section_scores') as mock_section_scores:
+            self.assertEqual(self._raw_scores(), [(1, 2), (1, 2)])
+        self.assertFalse(mock_section_scores.called)
+
+    @patch.dict(settings.FEATURES, {'ENABLE_PERSISTENT_GRADES': True})
+    def test_persistent_grades(self):
+        self._create_student_modules()
+        self.assertEqual(self._raw_scores(), [(1, 2), (1, 2)])
+        self.assertEqual(PersistentSectionGrade.objects.filter(student=self.student).count(), 1)
+
+        # regrading reuses the persisted scores
+        with patch('courseware.grades._get_scores_from_grading_context') as mock_scores:
+            self.assertEqual(self._raw_scores(), [(1, 2), (1, 2)])
+        self.assertFalse(mock_scores.called)
+
+        # until a score event in the section
+        StudentModule.objects.filter(
+            student=self.student, module_state_key=self.problems[0].location
+        ).update(grade=2)
+        PersistentSectionGrade.invalidate(self.student.id, self.course.id, self.problems[0].location)
+        self.assertEqual(self._raw_scores(), [(1, 2), (2, 2)])
+
+        # or deleting the student's state
+        StudentModule.objects.get(student=self.student, module_state_key=self.problems[1].location).delete()
+        self.assertFalse(PersistentSectionGrade.objects.filter(student=self.student).exists())
+
+    @patch.dict(settings.FEATURES, {'ENABLE_PERSISTENT_GRADES': True})
+    def test_scores_changed_while_grading_not_persisted(self):
+        self._create_student_modules()
+
+        def get_scores_then_score(course_id, student):
+            """
+            Get the student's scores and then have a score event land before they're graded
+            """
+            scores = get_student_module_scores(course_id, student)
+            StudentModule.objects.filter(
+                student=student, module_state_key=self.problems[0].location
+            ).update(grade=2)
+            return scores
+
+        with patch('courseware.grades.get_student_module_scores', get_scores_then_score):
+            self.assertEqual(self._raw_scores(), [(1, 2), (1, 2)])
+        self.assertFalse(PersistentSectionGrade.objects.filter(student=self.student).exists())
+        self.assertEqual(self._raw_scores(), [(1, 2), (2, 2)])
@@ -176,6 +176,55 @@ class TestStudentModuleStorage(OtherUserFailureTestMixin, TestCase):
         self.assertEquals(len(exception_context.exception.saved_field_names), 0)
 
 
+class TestAddDescriptorsToCache(TestCase):
+    """Tests for adding descriptors to an existing FieldDataCache"""
+
+    def setUp(self):
+        student_module = StudentModuleFactory(state=json.dumps({'a_field': 'a_value'}))
+        self.user = student_module.student
+        self.assertEqual(self.user.id, 1)   # check our assumption hard-coded in the key functions above.
+        StudentModuleFactory(
+            student=self.user, module_state_key=location('other_usage_id'), state=json.dumps({'a_field': 'other_value'})
+        )
+        self.fields = [mock_field(Scope.user_state, 'a_field'), mock_field(Scope.preferences, 'a_pref')]
+        self.field_data_cache = FieldDataCache([mock_descriptor(self.fields)], course_id, self.user)
+        self.kvs = DjangoKeyValueStore(self.field_data_cache)
+
+    def _other_descriptor(self):
+        "Return a descriptor of another module of the same type"
+        descriptor = mock_descriptor(self.fields)
+        descriptor.scope_ids = ScopeIds('user1', 'mock_problem', location('def_id'), location('other_usage_id'))
+        return descriptor
+
+    def test_add_cached_descriptor(self):
+        "Test that adding a descriptor already in the cache doesn't query it again"
+        with self.assertNumQueries(0):
+            self.field_data_cache.add_descriptors_to_cache([mock_descriptor(self.fields)])
+        self.assertEquals('a_value', self.kvs.get(user_state_key('a_field')))
+
+    def test_add_new_descriptor(self):
+        "Test that adding a descriptor fetches only its state (its type's preferences are already fetched)"
+        with self.assertNumQueries(1):
+            self.field_data_cache.add_descriptors_to_cache([mock_descriptor(self.fields), self._other_descriptor()])
+        other_key = DjangoKeyValueStore.Key(Scope.user_state, 1, location('other_usage_id'), 'a_field')
+        self.assertEquals('other_value', self.kvs.get(other_key))
+
+    def test_add_student_modules(self):
+        "Test that adding a descriptor whose StudentModule was added doesn't query it"
+        student_module = StudentModule.objects.get(module_state_key=location('other_usage_id'))
+        self.field_data_cache.add_student_modules([student_module])
+        with self.assertNumQueries(0):
+            self.field_data_cache.add_descriptors_to_cache([self._other_descriptor()])
+        other_key = DjangoKeyValueStore.Key(Scope.user_state, 1, location('other_usage_id'), 'a_field')
+        self.assertEquals('other_value', self.kvs.get(other_key))
+
+    def test_add_keeps_modified_data(self):
+        "Test that adding descriptors doesn't replace data modified in the cache"
+        self.kvs.set(user_state_key('a_field'), 'new_value')
+        self.field_data_cache.add_descriptors_to_cache([mock_descriptor(self.fields), self._other_descriptor()])
+        self.assertEquals('new_value', self.kvs.get(user_state_key('a_field')))
+
+
 class TestMissingStudentModule(TestCase):
     def setUp(self):
         self.user = UserFactory.create(username='user')
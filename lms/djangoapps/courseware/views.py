@@ -739,9 +739,11 @@ def _progress(request, course_key, student_id):
     # additional DB lookup (this kills the Progress page in particular).
     student = User.objects.prefetch_related("groups").get(id=student.id)
 
-    courseware_summary = grades.progress_summary(student, request, course)
+    # progress_summary fills one cache of the student's data for the whole course which grade then reuses
+    field_data_cache = FieldDataCache([], course.id, student)
+    courseware_summary = grades.progress_summary(student, request, course, field_data_cache=field_data_cache)
     studio_url = get_studio_url(course_key, 'settings/grading')
-    grade_summary = grades.grade(student, request, course)
+    grade_summary = grades.grade(student, request, course, field_data_cache=field_data_cache)
 
     if courseware_summary is None:
         #This means the student didn't have access to the course (which the instructor requested)
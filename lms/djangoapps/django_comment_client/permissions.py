@@ -6,6 +6,9 @@ import logging
 from types import NoneType
 from django.core import cache
 from opaque_keys.edx.keys import CourseKey
+from request_cache.middleware import RequestCache
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.exceptions import ItemNotFoundError
 
 CACHE = cache.get_cache('default')
 CACHE_LIFESPAN = 60
@@ -34,6 +37,38 @@ def has_permission(user, permission, course_id=None):
     return False
 
 
+def get_user_permissions(user, course_id):
+    """
+    Return the frozenset of names of the permissions the user has in the course: the same
+    answers as has_permission gives, but with the user's roles and their permissions loaded
+    once per request rather than once (or once per cache miss) per permission.
+    """
+    assert isinstance(course_id, (NoneType, CourseKey))
+    request_cache = getattr(RequestCache.get_request_cache(), 'data', None)
+    if request_cache is None:
+        return _load_user_permissions(user, course_id)
+    key = ('django_comment_client.permissions', user.id, course_id)
+    if key not in request_cache:
+        request_cache[key] = _load_user_permissions(user, course_id)
+    return request_cache[key]
+
+
+def _load_user_permissions(user, course_id):
+    """
+    Load the names of the permissions of all of the user's roles in the course
+    """
+    roles = list(user.roles.filter(course_id=course_id).prefetch_related('permissions'))
+    if not roles:
+        return frozenset()
+    course = modulestore().get_course(course_id)
+    if course is None:
+        raise ItemNotFoundError(course_id)
+    permissions = set()
+    for role in roles:
+        permissions.update(role.get_permission_names(course))
+    return frozenset(permissions)
+
+
 CONDITIONS = ['is_open', 'is_author']
 
 
@@ -58,18 +93,23 @@ def _check_condition(user, condition, course_id, data):
     return handlers[condition](user, condition, course_id, data)
 
 
-def _check_conditions_permissions(user, permissions, course_id, **kwargs):
+def _check_conditions_permissions(user, permissions, course_id, user_permissions=None, **kwargs):
     """
     Accepts a list of permissions and proceed if any of the permission is valid.
     Note that ["can_view", "can_edit"] will proceed if the user has either
     "can_view" or "can_edit" permission. To use AND operator in between, wrap them in
     a list.
+
+    If given, user_permissions (from get_user_permissions) answers which permissions
+    the user has rather than cached_has_permission.
     """
 
     def test(user, per, operator="or"):
         if isinstance(per, basestring):
             if per in CONDITIONS:
                 return _check_condition(user, per, course_id, kwargs)
+            if user_permissions is not None:
+                return per in user_permissions
             return cached_has_permission(user, per, course_id=course_id)
         elif isinstance(per, list) and operator in ["and", "or"]:
             results = [test(user, x, operator="and") for x in per]
@@ -109,10 +149,10 @@ VIEW_PERMISSIONS = {
 }
 
 
-def check_permissions_by_view(user, course_id, content, name):
+def check_permissions_by_view(user, course_id, content, name, user_permissions=None):
     assert isinstance(course_id, CourseKey)
     try:
         p = VIEW_PERMISSIONS[name]
     except KeyError:
         logging.warning("Permission for view named %s does not exist in permissions.py" % name)
-    return _check_conditions_permissions(user, p, course_id, content=content)
+    return _check_conditions_permissions(user, p, course_id, user_permissions=user_permissions, content=content)
@@ -37,6 +37,12 @@ class RoleClassTestCase(TestCase):
         self.assertTrue(self.student_2_role.has_permission("delete_thread"))
         self.assertFalse(self.TA_role.has_permission("delete_thread"))
 
+    def testGetPermissionNames(self):
+        course = models.modulestore().get_course(self.course_id)
+        self.student_role.add_permission("create_thread")
+        self.assertEqual(self.student_role.get_permission_names(course), set(["delete_thread", "create_thread"]))
+        self.assertEqual(self.TA_role.get_permission_names(course), set())
+
     def testInheritPermissions(self):
 
         self.TA_role.inherit_permissions(self.student_role)
@@ -15,6 +15,7 @@ from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from courseware.tests.tests import TEST_DATA_MONGO_MODULESTORE
 from edxmako import add_lookup
+from request_cache.middleware import RequestCache
 
 
 class DictionaryTestCase(TestCase):
@@ -78,6 +79,56 @@ class AccessUtilsTestCase(TestCase):
         self.assertFalse(ret)
 
 
+@override_settings(MODULESTORE=TEST_DATA_MONGO_MODULESTORE)
+class AbilityTestCase(ModuleStoreTestCase):
+    def setUp(self):
+        RequestCache().clear_request_cache()
+        self.addCleanup(RequestCache().clear_request_cache)
+        self.course = CourseFactory.create()
+        self.student = UserFactory()
+        self.student_role = RoleFactory(name='Student', course_id=self.course.id)
+        for permission in ['create_comment', 'create_sub_comment', 'vote', 'update_comment']:
+            self.student_role.add_permission(permission)
+        self.student_role.users.add(self.student)
+        self.user_info = {'upvoted_ids': [], 'downvoted_ids': [], 'subscribed_thread_ids': []}
+
+    def _thread(self, thread_id, closed=False):
+        """A thread by someone else with a comment by the student"""
+        return {
+            'id': thread_id, 'type': 'thread', 'closed': closed, 'user_id': str(self.student.id + 1),
+            'children': [
+                {'id': thread_id + '_comment', 'type': 'comment', 'closed': closed, 'user_id': str(self.student.id)}
+            ],
+        }
+
+    def test_get_ability(self):
+        thread = self._thread('open')
+        self.assertEqual(utils.get_ability(self.course.id, thread, self.student), {
+            'editable': False, 'can_reply': True, 'can_endorse': False,
+            'can_delete': False, 'can_openclose': False, 'can_vote': True,
+        })
+        self.assertEqual(utils.get_ability(self.course.id, thread['children'][0], self.student), {
+            'editable': True, 'can_reply': True, 'can_endorse': False,
+            'can_delete': True, 'can_openclose': False, 'can_vote': True,
+        })
+
+        closed_thread = self._thread('closed', closed=True)
+        ability = utils.get_ability(self.course.id, closed_thread, self.student)
+        self.assertFalse(ability['can_reply'])
+        self.assertFalse(ability['can_vote'])
+
+    def test_permissions_loaded_once_per_request(self):
+        threads = [self._thread('thread{}'.format(index)) for index in range(10)]
+        # the student's roles and their permissions
+        with self.assertNumQueries(2):
+            metadata = utils.get_metadata_for_threads(self.course.id, threads, self.student, self.user_info)
+        self.assertEqual(len(metadata), 20)
+        self.assertTrue(metadata['thread0_comment']['ability']['editable'])
+
+        with self.assertNumQueries(0):
+            utils.get_annotated_content_infos(self.course.id, threads[0], self.student, self.user_info)
+
+
 @override_settings(MODULESTORE=TEST_DATA_MONGO_MODULESTORE)
 class CoursewareContextTestCase(ModuleStoreTestCase):
     def setUp(self):
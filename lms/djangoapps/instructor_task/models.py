@@ -20,6 +20,7 @@ import json
 import hashlib
 import os.path
 import urllib
+import zlib
 
 from boto.s3.connection import S3Connection
 from boto.s3.key import Key
@@ -193,10 +194,12 @@ class InstructorTask(models.Model):
 class ReportStore(object):
     """
     Simple abstraction layer that can fetch and store CSV files for reports
-    download. Should probably refactor later to create a ReportFile object that
-    can simply be appended to for the sake of memory efficiency, rather than
-    passing in the whole dataset. Doing that for now just because it's simpler.
+    download. `store_rows` consumes its rows incrementally (they can come from a
+    generator), so a report never needs to be held in memory as a whole.
     """
+    # The number of bytes of encoded CSV data to buffer between writes to the store
+    CHUNK_SIZE = 5 * 1024 * 1024
+
     @classmethod
     def from_config(cls):
         """
@@ -209,6 +212,61 @@ class ReportStore(object):
         elif storage_type.lower() == "localfs":
             return LocalFSReportStore.from_config()
 
+    def csv_chunks(self, rows, compress=False, progress_callback=None):
+        """
+        Generate the CSV encoding of `rows` (each row is an iterable of strings),
+        gzip'd if `compress`, in chunks of about `CHUNK_SIZE` bytes, consuming the
+        rows only as the chunks are needed.
+
+        If given, `progress_callback(num_rows, num_bytes)` gets called after each
+        chunk with the total number of rows and bytes generated so far.
+        """
+        output_buffer = StringIO()
+        output_file = GzipFile(fileobj=output_buffer, mode="wb") if compress else output_buffer
+        writer = csv.writer(output_file)
+        num_rows = 0
+        num_bytes = 0
+
+        def flush():
+            """Empty the buffer, returning its contents"""
+            chunk = output_buffer.getvalue()
+            output_buffer.seek(0)
+            output_buffer.truncate()
+            return chunk
+
+        for row in rows:
+            writer.writerow(row)
+            num_rows += 1
+            if output_buffer.tell() >= self.CHUNK_SIZE:
+                chunk = flush()
+                num_bytes += len(chunk)
+                if progress_callback:
+                    progress_callback(num_rows, num_bytes)
+                yield chunk
+
+        if compress:
+            output_file.close()
+        chunk = flush()
+        num_bytes += len(chunk)
+        if progress_callback:
+            progress_callback(num_rows, num_bytes)
+        if chunk:
+            yield chunk
+
+
+def _iter_lines(chunks):
+    """
+    Generate the lines (each w/ its trailing newline) of the data which `chunks` generates
+    """
+    remainder = ""
+    for chunk in chunks:
+        lines = (remainder + chunk).split("\n")
+        remainder = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    if remainder:
+        yield remainder
+
 
 class S3ReportStore(ReportStore):
     """
@@ -295,21 +353,69 @@ class S3ReportStore(ReportStore):
             }
         )
 
-    def store_rows(self, course_id, filename, rows):
+    def store_rows(self, course_id, filename, rows, progress_callback=None):
         """
         Given a `course_id`, `filename`, and `rows` (each row is an iterable of
-        strings), create a buffer that is a gzip'd csv file, and then `store()`
-        that buffer.
+        strings), store them as a gzip'd csv file. The rows get consumed as the
+        file is uploaded: a file of more than one chunk gets uploaded a chunk at a
+        time as the parts of an S3 multipart upload, which only becomes visible
+        once complete. See `csv_chunks` for `progress_callback`.
 
         Even though we store it in gzip format, browsers will transparently
         download and decompress it. Filenames should end in `.csv`, not `.gz`.
         """
-        output_buffer = StringIO()
-        gzip_file = GzipFile(fileobj=output_buffer, mode="wb")
-        csv.writer(gzip_file).writerows(rows)
-        gzip_file.close()
+        chunks = self.csv_chunks(rows, compress=True, progress_callback=progress_callback)
+        first_chunk = next(chunks, "")
+        second_chunk = next(chunks, None)
+        if second_chunk is None:
+            # small enough to upload at once
+            self.store(course_id, filename, StringIO(first_chunk))
+            return
 
-        self.store(course_id, filename, output_buffer)
+        key = self.key_for(course_id, filename)
+        upload = self.bucket.initiate_multipart_upload(
+            key.key,
+            headers={
+                "Content-Encoding": "gzip",
+                "Content-Type": "text/csv",
+            }
+        )
+        try:
+            upload.upload_part_from_file(StringIO(first_chunk), 1)
+            upload.upload_part_from_file(StringIO(second_chunk), 2)
+            for part_num, chunk in enumerate(chunks, start=3):
+                upload.upload_part_from_file(StringIO(chunk), part_num)
+        except Exception:
+            upload.cancel_upload()
+            raise
+        upload.complete_upload()
+
+    def iter_rows(self, course_id, filename):
+        """
+        Generate the rows of a file stored by `store_rows` (none if there's no
+        such file), downloading and decompressing it a chunk at a time.
+        """
+        key = self.bucket.get_key(self.key_for(course_id, filename).key)
+        if key is None:
+            return
+
+        def decompressed_chunks():
+            """Download and decompress the file a chunk at a time"""
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)  # expect a gzip header
+            for chunk in iter(lambda: key.read(self.CHUNK_SIZE), ""):
+                yield decompressor.decompress(chunk)
+            yield decompressor.flush()
+
+        for row in csv.reader(_iter_lines(decompressed_chunks())):
+            yield row
+
+    def exists(self, course_id, filename):
+        """Whether the file has been stored"""
+        return self.bucket.get_key(self.key_for(course_id, filename).key) is not None
+
+    def delete(self, course_id, filename):
+        """Delete the file, if it exists"""
+        self.bucket.delete_key(self.key_for(course_id, filename).key)
 
     def links_for(self, course_id):
         """
@@ -321,6 +427,8 @@ class S3ReportStore(ReportStore):
             [
                 (key.key.split("/")[-1], key.generate_url(expires_in=300))
                 for key in self.bucket.list(prefix=course_dir.key)
+                # skip partial files (see LocalFSReportStore)
+                if not key.key.split("/")[-1].startswith(".")
             ],
             reverse=True
         )
@@ -378,14 +486,49 @@ class LocalFSReportStore(ReportStore):
         with open(full_path, "wb") as f:
             f.write(buff.getvalue())
 
-    def store_rows(self, course_id, filename, rows):
+    def store_rows(self, course_id, filename, rows, progress_callback=None):
         """
         Given a course_id, filename, and rows (each row is an iterable of strings),
-        write this data out.
+        write this data out a chunk at a time as the rows get consumed. It's
+        written to a hidden file which gets renamed once complete. See
+        `csv_chunks` for `progress_callback`.
         """
-        output_buffer = StringIO()
-        csv.writer(output_buffer).writerows(rows)
-        self.store(course_id, filename, output_buffer)
+        full_path = self.path_to(course_id, filename)
+        directory = os.path.dirname(full_path)
+        if not os.path.exists(directory):
+            os.mkdir(directory)
+
+        partial_path = os.path.join(directory, "." + filename + ".partial")
+        try:
+            with open(partial_path, "wb") as f:
+                for chunk in self.csv_chunks(rows, progress_callback=progress_callback):
+                    f.write(chunk)
+        except Exception:
+            os.remove(partial_path)
+            raise
+        os.rename(partial_path, full_path)
+
+    def iter_rows(self, course_id, filename):
+        """
+        Generate the rows of a file stored by `store_rows` (none if there's no
+        such file), reading it a line at a time.
+        """
+        full_path = self.path_to(course_id, filename)
+        if not os.path.exists(full_path):
+            return
+        with open(full_path, "rb") as f:
+            for row in csv.reader(f):
+                yield row
+
+    def exists(self, course_id, filename):
+        """Whether the file has been stored"""
+        return os.path.exists(self.path_to(course_id, filename))
+
+    def delete(self, course_id, filename):
+        """Delete the file, if it exists"""
+        full_path = self.path_to(course_id, filename)
+        if os.path.exists(full_path):
+            os.remove(full_path)
 
     def links_for(self, course_id):
         """
@@ -402,6 +545,9 @@ class LocalFSReportStore(ReportStore):
             [
                 (filename, ("file://" + urllib.quote(os.path.join(course_dir, filename))))
                 for filename in os.listdir(course_dir)
+                # skip files still being written and the partial reports which
+                # instructor tasks combine into complete ones
+                if not filename.startswith(".")
             ],
             reverse=True
         )
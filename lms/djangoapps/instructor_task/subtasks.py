@@ -237,7 +237,8 @@ def initialize_subtask_info(entry, action_name, total_num, subtask_id_list):
     return task_progress
 
 
-def queue_subtasks_for_query(entry, action_name, create_subtask_fcn, item_queryset, item_fields, items_per_task):
+def queue_subtasks_for_query(entry, action_name, create_subtask_fcn, item_queryset, item_fields, items_per_task,
+                             final_subtask_id=None, queue_final_subtask_fcn=None):
     """
     Generates and queues subtasks to each execute a chunk of "items" generated by a queryset.
 
@@ -251,6 +252,11 @@ def queue_subtasks_for_query(entry, action_name, create_subtask_fcn, item_querys
         `item_fields` : the fields that should be included in the dict that is returned.
             These are in addition to the 'pk' field.
         `items_per_task` : maximum size of chunks to break each query chunk into for use by a subtask.
+        `final_subtask_id` : optional id of one more subtask, which isn't queued here but by the subtask
+            which finds (via update_subtask_status) that it's the only one remaining (e.g., to combine
+            the other subtasks' results).  The InstructorTask only succeeds once it has too.
+        `queue_final_subtask_fcn` : a function of no arguments that queues the final subtask.  It's called
+            here if fewer subtasks got queued than were defined and the queued ones have already completed.
 
     Returns:  the task progress as stored in the InstructorTask object.
 
@@ -265,7 +271,8 @@ def queue_subtasks_for_query(entry, action_name, create_subtask_fcn, item_querys
     # Update the InstructorTask  with information about the subtasks we've defined.
     TASK_LOG.info("Task %s: updating InstructorTask %s with subtask info for %s subtasks to process %s items.",
              task_id, entry.id, total_num_subtasks, total_num_items)  # pylint: disable=E1101
-    progress = initialize_subtask_info(entry, action_name, total_num_items, subtask_id_list)
+    all_subtask_ids = subtask_id_list + ([final_subtask_id] if final_subtask_id is not None else [])
+    progress = initialize_subtask_info(entry, action_name, total_num_items, all_subtask_ids)
 
     # Construct a generator that will return the recipients to use for each subtask.
     # Pass in the desired fields to fetch for each recipient.
@@ -288,12 +295,49 @@ def queue_subtasks_for_query(entry, action_name, create_subtask_fcn, item_querys
         new_subtask = create_subtask_fcn(item_list, subtask_status)
         new_subtask.apply_async()
 
+    # If the query returned fewer items than counted (e.g., students unenrolled meanwhile), some of the
+    # subtasks defined above never got any; remove them so that the InstructorTask can still complete.
+    if num_subtasks < total_num_subtasks:
+        TASK_LOG.info("Task %s: only queued %s of the %s subtasks defined.", task_id, num_subtasks, total_num_subtasks)
+        num_remaining = _remove_unqueued_subtasks(entry.id, subtask_id_list[num_subtasks:])
+        if final_subtask_id is not None and num_remaining == 1:
+            queue_final_subtask_fcn()
+
     # Subtasks have been queued so no exceptions should be raised after this point.
 
     # Return the task progress as stored in the InstructorTask object.
     return progress
 
 
+@transaction.commit_manually
+def _remove_unqueued_subtasks(entry_id, subtask_ids):
+    """
+    Remove the subtasks w/ `subtask_ids`, which were defined but never queued, from the InstructorTask's
+    "subtasks" field, decrementing its 'total'.  If no other subtasks remain, the InstructorTask is done.
+
+    Returns the number of subtasks remaining.  As w/ _update_subtask_status, the InstructorTask is locked
+    while it's updated; so, the count seen here isn't also seen by any subtask completing.
+    """
+    try:
+        entry = InstructorTask.objects.select_for_update().get(pk=entry_id)
+        subtask_dict = json.loads(entry.subtasks)
+        for subtask_id in subtask_ids:
+            del subtask_dict['status'][subtask_id]
+        subtask_dict['total'] -= len(subtask_ids)
+        num_remaining = subtask_dict['total'] - subtask_dict['succeeded'] - subtask_dict['failed']
+        if num_remaining <= 0:
+            entry.task_state = SUCCESS
+        entry.subtasks = json.dumps(subtask_dict)
+        entry.save()
+    except Exception:
+        TASK_LOG.exception("Unexpected error while removing unqueued subtasks of InstructorTask %d.", entry_id)
+        transaction.rollback()
+        raise
+    else:
+        transaction.commit()
+        return num_remaining
+
+
 def _acquire_subtask_lock(task_id):
     """
     Mark the specified task_id as being in progress.
@@ -414,9 +458,11 @@ def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_c
 
     The subtask lock acquired in the call to check_subtask_is_valid() is released here, only when
     the attempting of retries has concluded.
+
+    Returns the number of the InstructorTask's subtasks which have yet to complete.
     """
     try:
-        _update_subtask_status(entry_id, current_task_id, new_subtask_status)
+        return _update_subtask_status(entry_id, current_task_id, new_subtask_status)
     except DatabaseError:
         # If we fail, try again recursively.
         retry_count += 1
@@ -424,7 +470,7 @@ def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_c
             TASK_LOG.info("Retrying to update status for subtask %s of instructor task %d with status %s:  retry %d",
                           current_task_id, entry_id, new_subtask_status, retry_count)
             dog_stats_api.increment('instructor_task.subtask.retry_after_failed_update')
-            update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_count)
+            return update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_count)
         else:
             TASK_LOG.info("Failed to update status after %d retries for subtask %s of instructor task %d with status %s",
                           retry_count, current_task_id, entry_id, new_subtask_status)
@@ -464,6 +510,9 @@ def _update_subtask_status(entry_id, current_task_id, new_subtask_status):
     information for each subtask.  At the moment, the value for each subtask (keyed by its task_id)
     is the value of the SubtaskStatus.to_dict(), but could be expanded in future to store information
     about failure messages, progress made, etc.
+
+    Returns the number of subtasks remaining.  Since the InstructorTask is locked, exactly one subtask
+    sees each count.
     """
     TASK_LOG.info("Preparing to update status for subtask %s for instructor task %d with status %s",
                   current_task_id, entry_id, new_subtask_status)
@@ -531,6 +580,7 @@ def _update_subtask_status(entry_id, current_task_id, new_subtask_status):
     else:
         TASK_LOG.debug("about to commit....")
         transaction.commit()
+        return num_remaining
 
 
 def _statsd_tag(course_id):
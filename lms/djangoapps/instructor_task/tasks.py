@@ -4,7 +4,7 @@ running state of a course.
 
 At present, these tasks all operate on StudentModule objects in one way or another,
 so they share a visitor architecture.  Each task defines an "update function" that
-takes a module_descriptor, a particular StudentModule object, and xmodule_instance_args.
+takes a module_descriptor, a chunk of StudentModule objects, and xmodule_instance_args.
 
 A task may optionally specify a "filter function" that takes a query for StudentModule
 objects, and adds additional filter clauses.
@@ -27,10 +27,12 @@ from instructor_task.tasks_helper import (
     run_main_task,
     BaseInstructorTask,
     perform_module_state_update,
-    rescore_problem_module_state,
-    reset_attempts_module_state,
-    delete_problem_module_state,
+    rescore_problem_module_states,
+    reset_attempts_module_states,
+    delete_problem_module_states,
     push_grades_to_s3,
+    grade_report_shard,
+    merge_grade_report_shards,
 )
 from bulk_email.tasks import perform_delegate_email_batches
 
@@ -56,7 +58,7 @@ def rescore_problem(entry_id, xmodule_instance_args):
     """
     # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
     action_name = ugettext_noop('rescored')
-    update_fcn = partial(rescore_problem_module_state, xmodule_instance_args)
+    update_fcn = partial(rescore_problem_module_states, xmodule_instance_args)
 
     def filter_fcn(modules_to_update):
         """Filter that matches problems which are marked as being done"""
@@ -83,7 +85,7 @@ def reset_problem_attempts(entry_id, xmodule_instance_args):
     """
     # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
     action_name = ugettext_noop('reset')
-    update_fcn = partial(reset_attempts_module_state, xmodule_instance_args)
+    update_fcn = partial(reset_attempts_module_states, xmodule_instance_args)
     visit_fcn = partial(perform_module_state_update, update_fcn, None)
     return run_main_task(entry_id, visit_fcn, action_name)
 
@@ -105,7 +107,7 @@ def delete_problem_state(entry_id, xmodule_instance_args):
     """
     # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
     action_name = ugettext_noop('deleted')
-    update_fcn = partial(delete_problem_module_state, xmodule_instance_args)
+    update_fcn = partial(delete_problem_module_states, xmodule_instance_args)
     visit_fcn = partial(perform_module_state_update, update_fcn, None)
     return run_main_task(entry_id, visit_fcn, action_name)
 
@@ -139,3 +141,21 @@ def calculate_grades_csv(entry_id, xmodule_instance_args):
     action_name = ugettext_noop('graded')
     task_fn = partial(push_grades_to_s3, xmodule_instance_args)
     return run_main_task(entry_id, task_fn, action_name)
+
+
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=E1102
+def calculate_grades_csv_shard(entry_id, report_name, shard_num, student_ids, merge_subtask_id, subtask_status_dict):
+    """
+    Grade a shard of a course's students, storing their rows as a partial grade report.
+
+    Queued by calculate_grades_csv for courses with more than GRADES_DOWNLOAD_STUDENTS_PER_TASK students.
+    """
+    return grade_report_shard(entry_id, report_name, shard_num, student_ids, merge_subtask_id, subtask_status_dict)
+
+
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=E1102
+def merge_grades_csv(entry_id, report_name, subtask_status_dict):
+    """
+    Combine the partial grade reports of the calculate_grades_csv_shard subtasks into the complete one.
+    """
+    return merge_grade_report_shards(entry_id, report_name, subtask_status_dict)
@@ -4,13 +4,18 @@ running state of a course.
 
 """
 import json
+import traceback
 import urllib
+from collections import defaultdict
 from datetime import datetime
+from itertools import chain, count
 from time import time
+from uuid import uuid4
 
 from celery import Task, current_task
 from celery.utils.log import get_task_logger
 from celery.states import SUCCESS, FAILURE
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import transaction, reset_queries
 from dogapi import dog_stats_api
@@ -20,10 +25,16 @@ from xmodule.modulestore.django import modulestore
 from track.views import task_track
 
 from courseware.grades import iterate_grades_for
-from courseware.models import StudentModule
+from courseware.models import StudentModule, StudentModuleHistory
 from courseware.model_data import FieldDataCache
 from courseware.module_render import get_module_for_descriptor_internal
 from instructor_task.models import ReportStore, InstructorTask, PROGRESS
+from instructor_task.subtasks import (
+    SubtaskStatus,
+    queue_subtasks_for_query,
+    check_subtask_is_valid,
+    update_subtask_status,
+)
 from student.models import CourseEnrollment
 
 # define different loggers for use within tasks and on client side
@@ -37,6 +48,11 @@ UPDATE_STATUS_SUCCEEDED = 'succeeded'
 UPDATE_STATUS_FAILED = 'failed'
 UPDATE_STATUS_SKIPPED = 'skipped'
 
+# the number of StudentModules to fetch and update at a time
+MODULE_STATE_UPDATE_CHUNK_SIZE = 100
+# the minimum number of seconds between updates of a task's progress
+PROGRESS_UPDATE_INTERVAL = 2
+
 
 class BaseInstructorTask(Task):
     """
@@ -218,12 +234,14 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     If a `filter_fcn` is not None, it is applied to the query that has been constructed.  It takes one
     argument, which is the query being filtered, and returns the filtered version of the query.
 
-    The `update_fcn` is called on each StudentModule that passes the resulting filtering.
-    It is passed three arguments:  the module_descriptor for the module pointed to by the
-    module_state_key, the particular StudentModule to update, and the xmodule_instance_args being
-    passed through.  If the value returned by the update function evaluates to a boolean True,
-    the update is successful; False indicates the update on the particular student module failed.
-    A raised exception indicates a fatal condition -- that no other student modules should be considered.
+    The `update_fcn` is called on chunks of at most MODULE_STATE_UPDATE_CHUNK_SIZE StudentModules
+    that pass the resulting filtering, fetched along with their students.  It is passed two
+    arguments:  the module_descriptor for the module pointed to by the module_state_key, and the
+    list of StudentModules to update.  It returns a list of the status of each StudentModule's
+    update (UPDATE_STATUS_SUCCEEDED, UPDATE_STATUS_FAILED or UPDATE_STATUS_SKIPPED).  A raised
+    exception indicates a fatal condition -- that no other student modules should be considered.
+
+    The task's progress gets updated at most every PROGRESS_UPDATE_INTERVAL seconds.
 
     The return value is a dict containing the task's results, with the following keys:
 
@@ -292,30 +310,52 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
 
     task_progress = get_task_progress()
     _get_current_task().update_state(state=PROGRESS, meta=task_progress)
-    for module_to_update in modules_to_update:
-        num_attempted += 1
+    last_update_time = time()
+    chunks = _iterate_in_chunks(modules_to_update.select_related('student'), MODULE_STATE_UPDATE_CHUNK_SIZE)
+    for modules_chunk in chunks:
+        num_attempted += len(modules_chunk)
         # There is no try here:  if there's an error, we let it throw, and the task will
         # be marked as FAILED, with a stack trace.
-        with dog_stats_api.timer('instructor_tasks.module.time.step', tags=[u'action:{name}'.format(name=action_name)]):
-            update_status = update_fcn(module_descriptor, module_to_update)
-            if update_status == UPDATE_STATUS_SUCCEEDED:
-                # If the update_fcn returns true, then it performed some kind of work.
-                # Logging of failures is left to the update_fcn itself.
-                num_succeeded += 1
-            elif update_status == UPDATE_STATUS_FAILED:
-                num_failed += 1
-            elif update_status == UPDATE_STATUS_SKIPPED:
-                num_skipped += 1
-            else:
-                raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
-
-        # update task status:
+        tags = [u'action:{name}'.format(name=action_name)]
+        with dog_stats_api.timer('instructor_tasks.module.time.chunk', tags=tags):
+            for update_status in update_fcn(module_descriptor, modules_chunk):
+                if update_status == UPDATE_STATUS_SUCCEEDED:
+                    # If the update_fcn returns true, then it performed some kind of work.
+                    # Logging of failures is left to the update_fcn itself.
+                    num_succeeded += 1
+                elif update_status == UPDATE_STATUS_FAILED:
+                    num_failed += 1
+                elif update_status == UPDATE_STATUS_SKIPPED:
+                    num_skipped += 1
+                else:
+                    raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
+
+        # update task status, but not so often as to flood the result backend:
         task_progress = get_task_progress()
-        _get_current_task().update_state(state=PROGRESS, meta=task_progress)
+        if time() - last_update_time >= PROGRESS_UPDATE_INTERVAL:
+            _get_current_task().update_state(state=PROGRESS, meta=task_progress)
+            last_update_time = time()
 
     return task_progress
 
 
+def _iterate_in_chunks(queryset, chunk_size):
+    """
+    Generate lists of at most chunk_size of the queryset's objects in order of their primary keys,
+    fetching a chunk at a time.  Since each chunk is fetched after the last one's primary key,
+    deleting the objects of a chunk doesn't affect the later chunks.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        chunk_queryset = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(chunk_queryset[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
 def _get_task_id_from_xmodule_args(xmodule_instance_args):
     """Gets task_id from `xmodule_instance_args` dict, or returns default value if missing."""
     return xmodule_instance_args.get('task_id', UNKNOWN_TASK_ID) if xmodule_instance_args is not None else UNKNOWN_TASK_ID
@@ -343,16 +383,21 @@ def _get_track_function_for_task(student, xmodule_instance_args=None, source_pag
 
 
 def _get_module_instance_for_task(course_id, student, module_descriptor, xmodule_instance_args=None,
-                                  grade_bucket_type=None):
+                                  grade_bucket_type=None, student_module=None):
     """
     Fetches a StudentModule instance for a given `course_id`, `student` object, and `module_descriptor`.
 
     `xmodule_instance_args` is used to provide information for creating a track function and an XQueue callback.
     These are passed, along with `grade_bucket_type`, to get_module_for_descriptor_internal, which sidesteps
     the need for a Request object when instantiating an xmodule instance.
+
+    `student_module`, if given, is the student's already fetched StudentModule for the descriptor.
     """
     # reconstitute the problem's corresponding XModule:
-    field_data_cache = FieldDataCache.cache_for_descriptor_descendents(course_id, student, module_descriptor)
+    field_data_cache = FieldDataCache([], course_id, student)
+    if student_module is not None:
+        field_data_cache.add_student_modules([student_module])
+    field_data_cache.add_descriptor_descendents(module_descriptor)
 
     # get request-related tracking information from args passthrough, and supplement with task-specific
     # information:
@@ -394,7 +439,10 @@ def rescore_problem_module_state(xmodule_instance_args, module_descriptor, stude
     course_id = student_module.course_id
     student = student_module.student
     usage_key = student_module.module_state_key
-    instance = _get_module_instance_for_task(course_id, student, module_descriptor, xmodule_instance_args, grade_bucket_type='rescore')
+    instance = _get_module_instance_for_task(
+        course_id, student, module_descriptor, xmodule_instance_args,
+        grade_bucket_type='rescore', student_module=student_module
+    )
 
     if instance is None:
         # Either permissions just changed, or someone is trying to be clever
@@ -427,57 +475,106 @@ def rescore_problem_module_state(xmodule_instance_args, module_descriptor, stude
         return UPDATE_STATUS_SUCCEEDED
 
 
-@transaction.autocommit
-def reset_attempts_module_state(xmodule_instance_args, _module_descriptor, student_module):
+def rescore_problem_module_states(xmodule_instance_args, module_descriptor, student_modules):
+    """
+    Rescores the problem submissions of the `student_modules` (see rescore_problem_module_state),
+    all w/ the same descriptor.
+
+    Returns the list of their update statuses.
+    """
+    return [
+        rescore_problem_module_state(xmodule_instance_args, module_descriptor, student_module)
+        for student_module in student_modules
+    ]
+
+
+@transaction.commit_on_success
+def reset_attempts_module_states(xmodule_instance_args, _module_descriptor, student_modules):
     """
-    Resets problem attempts to zero for specified `student_module`.
+    Resets problem attempts to zero for the specified `student_modules`, updating those whose
+    states end up the same (e.g., which only had attempts) in a single UPDATE, and recording
+    their history as saving each would.
 
-    Returns a status of UPDATE_STATUS_SUCCEEDED if a problem has non-zero attempts
-    that are being reset, and UPDATE_STATUS_SKIPPED otherwise.
+    Returns the list of their update statuses: UPDATE_STATUS_SUCCEEDED for each problem with
+    non-zero attempts being reset, and UPDATE_STATUS_SKIPPED otherwise.
     """
-    update_status = UPDATE_STATUS_SKIPPED
-    problem_state = json.loads(student_module.state) if student_module.state else {}
-    if 'attempts' in problem_state:
-        old_number_of_attempts = problem_state["attempts"]
-        if old_number_of_attempts > 0:
+    update_statuses = []
+    # the (StudentModule, old number of attempts) of each problem being reset
+    reset_modules = []
+    # new state -> the StudentModules to update to it
+    modules_by_state = defaultdict(list)
+    modified = datetime.now(UTC)
+    for student_module in student_modules:
+        update_status = UPDATE_STATUS_SKIPPED
+        problem_state = json.loads(student_module.state) if student_module.state else {}
+        if problem_state.get('attempts', 0) > 0:
+            reset_modules.append((student_module, problem_state["attempts"]))
             problem_state["attempts"] = 0
-            # convert back to json and save
+            # convert back to json
             student_module.state = json.dumps(problem_state)
-            student_module.save()
-            # get request-related tracking information from args passthrough,
-            # and supplement with task-specific information:
-            track_function = _get_track_function_for_task(student_module.student, xmodule_instance_args)
-            event_info = {"old_attempts": old_number_of_attempts, "new_attempts": 0}
-            track_function('problem_reset_attempts', event_info)
+            student_module.modified = modified
+            modules_by_state[student_module.state].append(student_module)
             update_status = UPDATE_STATUS_SUCCEEDED
+        update_statuses.append(update_status)
+
+    for state, state_modules in modules_by_state.iteritems():
+        StudentModule.objects.filter(pk__in=[student_module.pk for student_module in state_modules]).update(
+            state=state, modified=modified
+        )
+    # updating doesn't send post_save; so, record the history here
+    StudentModuleHistory.objects.bulk_create([
+        StudentModuleHistory(
+            student_module=student_module,
+            version=None,
+            created=student_module.modified,
+            state=student_module.state,
+            grade=student_module.grade,
+            max_grade=student_module.max_grade,
+        )
+        for student_module, __ in reset_modules
+        if student_module.module_type in StudentModuleHistory.HISTORY_SAVING_TYPES
+    ])
 
-    return update_status
+    for student_module, old_number_of_attempts in reset_modules:
+        # get request-related tracking information from args passthrough,
+        # and supplement with task-specific information:
+        track_function = _get_track_function_for_task(student_module.student, xmodule_instance_args)
+        event_info = {"old_attempts": old_number_of_attempts, "new_attempts": 0}
+        track_function('problem_reset_attempts', event_info)
 
+    return update_statuses
 
-@transaction.autocommit
-def delete_problem_module_state(xmodule_instance_args, _module_descriptor, student_module):
+
+@transaction.commit_on_success
+def delete_problem_module_states(xmodule_instance_args, _module_descriptor, student_modules):
     """
-    Delete the StudentModule entry.
+    Delete the StudentModule entries in a single DELETE.
 
-    Always returns UPDATE_STATUS_SUCCEEDED, indicating success, if it doesn't raise an exception due to database error.
+    Returns UPDATE_STATUS_SUCCEEDED for each, indicating success, if it doesn't raise an exception due to
+    database error.
     """
-    student_module.delete()
-    # get request-related tracking information from args passthrough,
-    # and supplement with task-specific information:
-    track_function = _get_track_function_for_task(student_module.student, xmodule_instance_args)
-    track_function('problem_delete_state', {})
-    return UPDATE_STATUS_SUCCEEDED
+    StudentModule.objects.filter(pk__in=[student_module.pk for student_module in student_modules]).delete()
+    for student_module in student_modules:
+        # get request-related tracking information from args passthrough,
+        # and supplement with task-specific information:
+        track_function = _get_track_function_for_task(student_module.student, xmodule_instance_args)
+        track_function('problem_delete_state', {})
+    return [UPDATE_STATUS_SUCCEEDED] * len(student_modules)
 
 
-def push_grades_to_s3(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
+def push_grades_to_s3(_xmodule_instance_args, entry_id, course_id, _task_input, action_name):
     """
     For a given `course_id`, generate a grades CSV file for all students that
     are enrolled, and store using a `ReportStore`. Once created, the files can
     be accessed by instantiating another `ReportStore` (via
-    `ReportStore.from_config()`) and calling `link_for()` on it. Writes are
-    buffered, so we'll never write part of a CSV file to S3 -- i.e. any files
+    `ReportStore.from_config()`) and calling `link_for()` on it. The CSV gets
+    written as the students get graded, so memory use doesn't grow with the
+    enrollment, but the stores only make complete files visible -- i.e. any files
     that are visible in ReportStore will be complete ones.
 
+    Courses with more than `settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK` students
+    get graded in parallel by subtasks instead (see `_queue_grade_report_shards`).
+
     As we start to add more CSV downloads, it will probably be worthwhile to
     make a more general CSVDoc class instead of building out the rows like we
     do here.
@@ -486,45 +583,116 @@ def push_grades_to_s3(_xmodule_instance_args, _entry_id, course_id, _task_input,
     status_interval = 100
 
     enrolled_students = CourseEnrollment.users_enrolled_in(course_id)
-    num_total = enrolled_students.count()
-    num_attempted = 0
-    num_succeeded = 0
-    num_failed = 0
-    curr_step = "Calculating Grades"
+    # the counts of students and of the rows and bytes of the grade report written so far
+    counts = {
+        'total': enrolled_students.count(),
+        'attempted': 0,
+        'succeeded': 0,
+        'failed': 0,
+        'rows_written': 0,
+        'bytes_written': 0,
+    }
+    report_name = _grade_report_name(course_id, start_time)
+
+    students_per_task = settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK
+    if students_per_task and counts['total'] > students_per_task:
+        return _queue_grade_report_shards(entry_id, action_name, enrolled_students, report_name, students_per_task)
+
+    curr_step = ["Calculating Grades"]
 
     def update_task_progress():
         """Return a dict containing info about current task"""
         current_time = datetime.now(UTC)
         progress = {
             'action_name': action_name,
-            'attempted': num_attempted,
-            'succeeded': num_succeeded,
-            'failed': num_failed,
-            'total': num_total,
             'duration_ms': int((current_time - start_time).total_seconds() * 1000),
-            'step': curr_step,
+            'step': curr_step[0],
         }
+        progress.update(counts)
         _get_current_task().update_state(state=PROGRESS, meta=progress)
 
         return progress
 
-    # Loop over all our students and build our CSV lists in memory
-    header = None
-    rows = []
-    err_rows = [["id", "username", "error_msg"]]
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students):
-        # Periodically update task status (this is a cache write)
-        if num_attempted % status_interval == 0:
+    def record_bytes_written(num_rows, num_bytes):
+        """Record the rows and bytes of the grade report written so far"""
+        counts['rows_written'] = num_rows
+        counts['bytes_written'] = num_bytes
+
+    def record_student_graded(succeeded):
+        """Count the student, periodically updating the task status (this is a cache write)"""
+        if counts['attempted'] % status_interval == 0:
             update_task_progress()
-        num_attempted += 1
+        counts['attempted'] += 1
+        counts['succeeded' if succeeded else 'failed'] += 1
+
+    # The students who couldn't be graded (there should be few enough to keep in memory)
+    err_rows = []
+
+    # Grade the students while writing out the CSV
+    report_store = ReportStore.from_config()
+    report_store.store_rows(
+        course_id,
+        u"{}.csv".format(report_name),
+        _iterate_grade_report_rows(course_id, enrolled_students, err_rows, record_student_graded),
+        progress_callback=record_bytes_written
+    )
+
+    # If there are any error rows, write them out as well
+    if err_rows:
+        curr_step[0] = "Uploading CSVs"
+        update_task_progress()
+        report_store.store_rows(
+            course_id,
+            u"{}_err.csv".format(report_name),
+            [GRADE_REPORT_ERROR_HEADER] + err_rows
+        )
+
+    # One last update before we close out...
+    return update_task_progress()
+
+
+# The header of the CSV of the students who couldn't be graded
+GRADE_REPORT_ERROR_HEADER = ["id", "username", "error_msg"]
+# the error_msg for the students of a grade report shard which failed
+GRADE_REPORT_SHARD_FAILED_MSG = "grade report shard failed"
+
+
+def _grade_report_name(course_id, start_time):
+    """
+    Return the name of the grade report files (w/o the extension) generated at `start_time`
+    """
+    timestamp_str = start_time.strftime("%Y-%m-%d-%H%M")
+    course_id_prefix = urllib.quote(course_id.to_deprecated_string().replace("/", "_"))
+    return u"{}_grade_report_{}".format(course_id_prefix, timestamp_str)
+
+
+def _partial_grade_report_filenames(report_name, shard_num):
+    """
+    Return the filenames of a shard's partial grade report and partial error report. They
+    start w/ a '.' so ReportStores don't list them.
+    """
+    return (
+        u".{}.part{:05d}.csv".format(report_name, shard_num),
+        u".{}_err.part{:05d}.csv".format(report_name, shard_num),
+    )
+
+
+def _iterate_grade_report_rows(course_id, students, err_rows, student_graded):
+    """
+    Grade the students, yielding the rows of their grade report (starting w/ its header once a
+    student's been graded) and appending a row for each student who couldn't be graded to
+    `err_rows`. `student_graded(succeeded)` gets called for each student as they're graded.
+    """
+    header = None
+    for student, gradeset, err_msg in iterate_grades_for(course_id, students):
+        student_graded(bool(gradeset))
 
         if gradeset:
             # We were able to successfully grade this student for this course.
-            num_succeeded += 1
             if not header:
                 # Encode the header row in utf-8 encoding in case there are unicode characters
                 header = [section['label'].encode('utf-8') for section in gradeset[u'section_breakdown']]
-                rows.append(["id", "email", "username", "grade"] + header)
+                yield ["id", "email", "username", "grade"] + header
 
             percents = {
                 section['label']: section.get('percent', 0.0)
@@ -539,35 +707,208 @@ def push_grades_to_s3(_xmodule_instance_args, _entry_id, course_id, _task_input,
             # possible for a student to have a 0.0 show up in their row but
             # still have 100% for the course.
             row_percents = [percents.get(label, 0.0) for label in header]
-            rows.append([student.id, student.email, student.username, gradeset['percent']] + row_percents)
+            yield [student.id, student.email, student.username, gradeset['percent']] + row_percents
         else:
             # An empty gradeset means we failed to grade a student.
-            num_failed += 1
             err_rows.append([student.id, student.username, err_msg])
 
-    # By this point, we've got the rows we're going to stuff into our CSV files.
-    curr_step = "Uploading CSVs"
-    update_task_progress()
 
-    # Generate parts of the file name
-    timestamp_str = start_time.strftime("%Y-%m-%d-%H%M")
-    course_id_prefix = urllib.quote(course_id.to_deprecated_string().replace("/", "_"))
+def _queue_grade_report_shards(entry_id, action_name, enrolled_students, report_name, students_per_task):
+    """
+    Queue subtasks which each grade a shard of at most `students_per_task` of the enrolled students
+    in parallel, storing their rows as partial grade reports, and which then get combined into the
+    complete reports by a final subtask (queued by the last shard to complete).
+    """
+    # avoid a circular import: the tasks are defined in terms of the functions here
+    from instructor_task.tasks import calculate_grades_csv_shard
+
+    entry = InstructorTask.objects.get(pk=entry_id)
+
+    # Check to see if the shards have already been defined. As w/ bulk email, the same
+    # task can get called again when there's a loss of connection while it's being queued.
+    if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+        TASK_LOG.warning(u"Task %s has already queued its grade report shards! InstructorTask = %s",
+                         entry.task_id, entry)
+        return json.loads(entry.task_output)
+
+    merge_subtask_id = str(uuid4())
+    # only the shards which get queued are numbered (and stay among the InstructorTask's subtasks)
+    shard_nums = count()
+
+    def _create_grade_report_shard_subtask(student_list, initial_subtask_status):
+        """Creates a subtask to grade the students in student_list"""
+        return calculate_grades_csv_shard.subtask(
+            (
+                entry_id,
+                report_name,
+                next(shard_nums),
+                [student['pk'] for student in student_list],
+                merge_subtask_id,
+                initial_subtask_status.to_dict(),
+            ),
+            task_id=initial_subtask_status.task_id,
+            routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+        )
+
+    return queue_subtasks_for_query(
+        entry,
+        action_name,
+        _create_grade_report_shard_subtask,
+        enrolled_students,
+        [],
+        students_per_task,
+        final_subtask_id=merge_subtask_id,
+        queue_final_subtask_fcn=lambda: _queue_grade_report_merge(entry_id, report_name, merge_subtask_id),
+    )
+
+
+def _queue_grade_report_merge(entry_id, report_name, merge_subtask_id):
+    """
+    Queue the subtask which combines the shards' partial grade reports
+    """
+    # avoid a circular import: the tasks are defined in terms of the functions here
+    from instructor_task.tasks import merge_grades_csv
+
+    merge_grades_csv.apply_async(
+        (entry_id, report_name, SubtaskStatus.create(merge_subtask_id).to_dict()),
+        task_id=merge_subtask_id,
+        routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+    )
 
-    # Perform the actual upload
+
+def grade_report_shard(entry_id, report_name, shard_num, student_ids, merge_subtask_id, subtask_status_dict):
+    """
+    Grade the students w/ `student_ids`, storing their rows as the shard's partial grade
+    report (and partial error report). Once all the shards are done, queue the subtask which
+    combines them.
+
+    If the shard fails, all of its students go in its partial error report instead, and its
+    partial grade report is left empty; so, every shard which completes leaves a partial grade
+    report for the merge to check for.
+
+    Returns the subtask status in a form that can be serialized by Celery into JSON.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    course_id = InstructorTask.objects.get(pk=entry_id).course_id
+    # keep the order in which they were sharded
+    users = User.objects.in_bulk(student_ids)
+    students = [users[student_id] for student_id in student_ids if student_id in users]
+    counts = {'succeeded': 0, 'failed': 0}
+
+    def record_student_graded(succeeded):
+        """Count the student"""
+        counts['succeeded' if succeeded else 'failed'] += 1
+
+    def update_status():
+        """Update the shard's status, queueing the merge if only it remains (i.e., this was the last shard)"""
+        if update_subtask_status(entry_id, current_task_id, subtask_status) == 1:
+            _queue_grade_report_merge(entry_id, report_name, merge_subtask_id)
+
+    err_rows = []
+    filename, err_filename = _partial_grade_report_filenames(report_name, shard_num)
     report_store = ReportStore.from_config()
-    report_store.store_rows(
-        course_id,
-        u"{}_grade_report_{}.csv".format(course_id_prefix, timestamp_str),
-        rows
+    try:
+        report_store.store_rows(
+            course_id, filename, _iterate_grade_report_rows(course_id, students, err_rows, record_student_graded)
+        )
+        if err_rows:
+            report_store.store_rows(course_id, err_filename, err_rows)
+    except Exception:
+        # Since the rows which got written aren't used, count all the students as having failed.
+        TASK_LOG.exception(u"Grade report shard %s of instructor task %d: failed unexpectedly!",
+                           current_task_id, entry_id)
+        try:
+            # the error rows first, as the grade report marks the shard as having completed
+            report_store.store_rows(course_id, err_filename, [
+                [student_id, users[student_id].username if student_id in users else '', GRADE_REPORT_SHARD_FAILED_MSG]
+                for student_id in student_ids
+            ])
+            report_store.store_rows(course_id, filename, [])
+        except Exception:  # pylint: disable=broad-except
+            # the merge will find the partial grade report missing and fail the task
+            TASK_LOG.exception(u"Grade report shard %s of instructor task %d: failed to record its failure!",
+                               current_task_id, entry_id)
+        subtask_status.increment(failed=len(student_ids), state=FAILURE)
+        update_status()
+        raise
+
+    subtask_status.increment(
+        succeeded=counts['succeeded'],
+        failed=counts['failed'] + len(student_ids) - len(students),
+        state=SUCCESS,
     )
+    update_status()
+    return subtask_status.to_dict()
+
 
-    # If there are any error rows (don't count the header), write them out as well
-    if len(err_rows) > 1:
+def merge_grade_report_shards(entry_id, report_name, subtask_status_dict):
+    """
+    Combine the shards' partial grade reports (and partial error reports) into the complete
+    ones, a chunk at a time, in the order the students were sharded, and delete them.
+
+    If any shard's partial grade report is missing, its students would be missing from the
+    reports; so, no report gets stored and the InstructorTask fails.
+
+    Returns the subtask status in a form that can be serialized by Celery into JSON.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    entry = InstructorTask.objects.get(pk=entry_id)
+    course_id = entry.course_id
+    # all but this subtask are shards (the total only counts the shards which got queued)
+    num_shards = json.loads(entry.subtasks)['total'] - 1
+    partial_filenames = [_partial_grade_report_filenames(report_name, shard_num) for shard_num in range(num_shards)]
+    report_store = ReportStore.from_config()
+
+    def merged_rows(filenames, has_header):
+        """Generate the rows of the partial reports, w/ only the first of their headers if `has_header`"""
+        header_written = False
+        for filename in filenames:
+            rows = report_store.iter_rows(course_id, filename)
+            if has_header:
+                header = next(rows, None)
+                if header is not None and not header_written:
+                    header_written = True
+                    yield header
+            for row in rows:
+                yield row
+
+    try:
+        missing = [filename for filename, __ in partial_filenames if not report_store.exists(course_id, filename)]
+        if missing:
+            raise ValueError(u"Missing partial grade reports: {}".format(u", ".join(missing)))
         report_store.store_rows(
             course_id,
-            u"{}_grade_report_{}_err.csv".format(course_id_prefix, timestamp_str),
-            err_rows
+            u"{}.csv".format(report_name),
+            merged_rows([filename for filename, __ in partial_filenames], has_header=True)
+        )
+        err_rows = merged_rows([err_filename for __, err_filename in partial_filenames], has_header=False)
+        first_err_row = next(err_rows, None)
+        if first_err_row is not None:
+            report_store.store_rows(
+                course_id,
+                u"{}_err.csv".format(report_name),
+                chain([GRADE_REPORT_ERROR_HEADER, first_err_row], err_rows)
+            )
+        for filenames in partial_filenames:
+            for filename in filenames:
+                report_store.delete(course_id, filename)
+    except Exception as exc:
+        TASK_LOG.exception(u"Merging the grade report of instructor task %d: failed unexpectedly!", entry_id)
+        subtask_status.increment(state=FAILURE)
+        update_subtask_status(entry_id, current_task_id, subtask_status)
+        # the InstructorTask is done once its subtasks are, but it didn't produce its report
+        InstructorTask.objects.filter(pk=entry_id).update(
+            task_state=FAILURE,
+            task_output=InstructorTask.create_output_for_failure(exc, traceback.format_exc()),
         )
+        raise
 
-    # One last update before we close out...
-    return update_task_progress()
+    subtask_status.increment(state=SUCCESS)
+    update_subtask_status(entry_id, current_task_id, subtask_status)
+    return subtask_status.to_dict()
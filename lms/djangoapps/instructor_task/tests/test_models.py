@@ -0,0 +1,94 @@
+"""
+Unit tests for the streaming ReportStores.
+"""
+import csv
+import os
+import shutil
+import tempfile
+from cStringIO import StringIO
+from gzip import GzipFile
+
+from django.test import TestCase
+from mock import Mock, patch
+from opaque_keys.edx.locations import SlashSeparatedCourseKey
+
+from instructor_task.models import LocalFSReportStore, S3ReportStore
+
+
+COURSE_ID = SlashSeparatedCourseKey('edX', 'streaming', '2014')
+
+
+def _rows(num_rows):
+    """Generate some CSV rows"""
+    for index in xrange(num_rows):
+        yield [str(index), 'student{}'.format(index), '0.5']
+
+
+class TestLocalFSReportStore(TestCase):
+    """Tests for writing reports a chunk at a time to the local filesystem"""
+
+    def setUp(self):
+        self.root_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root_path)
+        self.report_store = LocalFSReportStore(self.root_path)
+        self.report_store.CHUNK_SIZE = 100
+
+    def test_store_rows(self):
+        progress = []
+        self.report_store.store_rows(
+            COURSE_ID, 'report.csv', _rows(50), progress_callback=lambda *args: progress.append(args)
+        )
+        with open(self.report_store.path_to(COURSE_ID, 'report.csv'), 'rb') as report:
+            self.assertEqual(list(csv.reader(report)), list(_rows(50)))
+        # progress gets reported a chunk at a time
+        self.assertGreater(len(progress), 1)
+        self.assertEqual(progress[-1], (50, os.path.getsize(self.report_store.path_to(COURSE_ID, 'report.csv'))))
+        self.assertEqual([filename for filename, __ in self.report_store.links_for(COURSE_ID)], ['report.csv'])
+
+    def test_failure_leaves_no_file(self):
+        def failing_rows():
+            """Fail after a few rows"""
+            for row in _rows(10):
+                yield row
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            self.report_store.store_rows(COURSE_ID, 'report.csv', failing_rows())
+        self.assertEqual(os.listdir(os.path.dirname(self.report_store.path_to(COURSE_ID, 'report.csv'))), [])
+
+
+class TestS3ReportStore(TestCase):
+    """Tests for uploading reports to S3 a chunk at a time"""
+
+    def setUp(self):
+        with patch('instructor_task.models.S3Connection'):
+            self.report_store = S3ReportStore('bucket', 'root')
+        self.report_store.CHUNK_SIZE = 100
+        self.upload = self.report_store.bucket.initiate_multipart_upload.return_value
+        self.parts = []
+        self.upload.upload_part_from_file.side_effect = lambda fp, part_num: self.parts.append((part_num, fp.read()))
+
+    def test_multipart_upload(self):
+        # enough rows for zlib to produce several chunks of compressed data
+        with patch.object(self.report_store, 'store') as mock_store:
+            self.report_store.store_rows(COURSE_ID, 'report.csv', _rows(20000))
+        self.assertFalse(mock_store.called)
+        self.assertEqual([part_num for part_num, __ in self.parts], range(1, len(self.parts) + 1))
+        self.assertTrue(self.upload.complete_upload.called)
+        report = GzipFile(fileobj=StringIO(''.join(data for __, data in self.parts)))
+        self.assertEqual(list(csv.reader(report)), list(_rows(20000)))
+
+    def test_single_chunk(self):
+        self.report_store.CHUNK_SIZE = 1024 * 1024
+        with patch.object(self.report_store, 'store') as mock_store:
+            self.report_store.store_rows(COURSE_ID, 'report.csv', _rows(5))
+        self.assertFalse(self.report_store.bucket.initiate_multipart_upload.called)
+        report = GzipFile(fileobj=StringIO(mock_store.call_args[0][2].getvalue()))
+        self.assertEqual(list(csv.reader(report)), list(_rows(5)))
+
+    def test_failure_cancels_upload(self):
+        self.upload.upload_part_from_file.side_effect = Exception()
+        with self.assertRaises(Exception):
+            self.report_store.store_rows(COURSE_ID, 'report.csv', _rows(20000))
+        self.assertTrue(self.upload.cancel_upload.called)
+        self.assertFalse(self.upload.complete_upload.called)
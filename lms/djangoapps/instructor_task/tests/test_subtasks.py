@@ -1,13 +1,15 @@
 """
 Unit tests for instructor_task subtasks.
 """
+import json
 from uuid import uuid4
 
 from mock import Mock, patch
 
 from student.models import CourseEnrollment
 
-from instructor_task.subtasks import queue_subtasks_for_query
+from instructor_task.models import InstructorTask
+from instructor_task.subtasks import initialize_subtask_info, queue_subtasks_for_query
 from instructor_task.tests.factories import InstructorTaskFactory
 from instructor_task.tests.test_base import InstructorTaskCourseTestCase
 
@@ -79,3 +81,45 @@ class TestSubtasks(InstructorTaskCourseTestCase):
         self.assertEqual(len(mock_create_subtask_fcn_args[0][0][0]), 3)
         self.assertEqual(len(mock_create_subtask_fcn_args[1][0][0]), 3)
         self.assertEqual(len(mock_create_subtask_fcn_args[2][0][0]), 5)
+
+    def test_queue_fewer_subtasks_than_defined(self):
+        """Test that subtasks left without items when students unenroll during queueing don't keep the task open."""
+        instructor_task = InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_id=str(uuid4()),
+            task_key='dummy_task_key',
+            task_type='grade_course',
+        )
+        self._enroll_students_in_course(self.course.id, 7)
+        task_queryset = CourseEnrollment.objects.filter(course_id=self.course.id)
+        final_subtask_id = str(uuid4())
+
+        def initialize_and_unenroll(*args):
+            """Initialize the subtask info, then unenroll students so the 3 subtasks defined only need 2."""
+            progress = initialize_subtask_info(*args)
+            for enrollment in task_queryset[:2]:
+                enrollment.delete()
+            return progress
+
+        mock_create_subtask_fcn = Mock()
+        mock_queue_final_subtask_fcn = Mock()
+        with patch('instructor_task.subtasks.initialize_subtask_info', side_effect=initialize_and_unenroll):
+            queue_subtasks_for_query(
+                entry=instructor_task,
+                action_name='action_name',
+                create_subtask_fcn=mock_create_subtask_fcn,
+                item_queryset=task_queryset,
+                item_fields=[],
+                items_per_task=3,
+                final_subtask_id=final_subtask_id,
+                queue_final_subtask_fcn=mock_queue_final_subtask_fcn,
+            )
+
+        self.assertEqual(mock_create_subtask_fcn.call_count, 2)
+        subtask_dict = json.loads(InstructorTask.objects.get(pk=instructor_task.id).subtasks)
+        # the 2 queued subtasks and the final one
+        self.assertEqual(subtask_dict['total'], 3)
+        self.assertEqual(len(subtask_dict['status']), 3)
+        self.assertIn(final_subtask_id, subtask_dict['status'])
+        # the queued subtasks haven't completed yet, so it's up to the last of them to queue the final subtask
+        self.assertFalse(mock_queue_final_subtask_fcn.called)
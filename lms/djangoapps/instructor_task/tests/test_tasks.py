@@ -6,24 +6,28 @@ paths actually work.
 
 """
 import json
+import shutil
+import tempfile
 from uuid import uuid4
 
 from mock import Mock, MagicMock, patch
 
 from celery.states import SUCCESS, FAILURE
+from django.test import TestCase
 
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from opaque_keys.edx.locations import i4xEncoder
 
-from courseware.models import StudentModule
+from courseware.models import StudentModule, StudentModuleHistory
 from courseware.tests.factories import StudentModuleFactory
 from student.tests.factories import UserFactory, CourseEnrollmentFactory
 
-from instructor_task.models import InstructorTask
+from instructor_task.models import InstructorTask, LocalFSReportStore
 from instructor_task.tests.test_base import InstructorTaskModuleTestCase
 from instructor_task.tests.factories import InstructorTaskFactory
 from instructor_task.tasks import rescore_problem, reset_problem_attempts, delete_problem_state
-from instructor_task.tasks_helper import UpdateProblemModuleStateError
+from instructor_task.tasks_helper import UpdateProblemModuleStateError, grade_report_shard, merge_grade_report_shards
+from instructor_task.subtasks import initialize_subtask_info
 
 PROBLEM_URL_NAME = "test_urlname"
 
@@ -335,6 +339,16 @@ class TestResetAttemptsInstructorTask(TestInstructorTasks):
         # check that entries were reset
         self._assert_num_attempts(students, 0)
 
+    def test_reset_in_chunks(self):
+        input_state = json.dumps({'attempts': 3})
+        num_students = 10
+        students = self._create_students_with_state(num_students, input_state)
+        with patch('instructor_task.tasks_helper.MODULE_STATE_UPDATE_CHUNK_SIZE', 3):
+            self._test_run_with_task(reset_problem_attempts, 'reset', num_students)
+        self._assert_num_attempts(students, 0)
+        # saving used to record the history; so, updating in bulk records it too
+        self.assertEquals(StudentModuleHistory.objects.filter(state=json.dumps({'attempts': 0})).count(), num_students)
+
     def test_reset_with_zero_attempts(self):
         initial_attempts = 0
         input_state = json.dumps({'attempts': initial_attempts})
@@ -438,3 +452,112 @@ class TestDeleteStateInstructorTask(TestInstructorTasks):
                 StudentModule.objects.get(course_id=self.course.id,
                                           student=student,
                                           module_state_key=self.location)
+
+
+class TestGradeReportShards(TestCase):
+    """
+    Tests for grading a course's students in parallel shards and merging their partial grade reports.
+    """
+    def setUp(self):
+        self.root_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root_path)
+        self.report_store = LocalFSReportStore(self.root_path)
+        patcher = patch('instructor_task.tasks_helper.ReportStore.from_config', return_value=self.report_store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.entry = InstructorTaskFactory.create(task_id=str(uuid4()), task_type='grade_course')
+        self.course_id = self.entry.course_id
+        self.merge_subtask_id = str(uuid4())
+        initialize_subtask_info(self.entry, 'graded', 4, [str(uuid4()), str(uuid4()), self.merge_subtask_id])
+
+    def _gradesets(self, students, course_id):
+        """Fake grading the students: the one named 'bad' fails"""
+        self.assertEqual(course_id, self.course_id)
+        for student in students:
+            if student.username == 'bad':
+                yield student, {}, 'grading failed'
+            else:
+                yield student, {'percent': 0.5, 'section_breakdown': [{'label': u'HW 01', 'percent': 0.5}]}, ''
+
+    def test_last_shard_queues_merge(self):
+        students = [UserFactory.create(username='good'), UserFactory.create(username='bad')]
+        with patch('instructor_task.tasks_helper.iterate_grades_for', side_effect=lambda course_id, students:
+                   self._gradesets(students, course_id)):
+            with patch('instructor_task.tasks_helper.check_subtask_is_valid'):
+                with patch('instructor_task.tasks_helper.update_subtask_status', return_value=1) as mock_update:
+                    with patch('instructor_task.tasks.merge_grades_csv.apply_async') as mock_merge:
+                        status = grade_report_shard(
+                            self.entry.id, 'report', 1, [student.id for student in students],
+                            self.merge_subtask_id, {'task_id': 'shard1'},
+                        )
+        self.assertEqual((status['succeeded'], status['failed'], status['state']), (1, 1, SUCCESS))
+        self.assertTrue(mock_update.called)
+        self.assertEqual(mock_merge.call_args[1]['task_id'], self.merge_subtask_id)
+        self.assertEqual(
+            list(self.report_store.iter_rows(self.course_id, '.report.part00001.csv')),
+            [['id', 'email', 'username', 'grade', 'HW 01'],
+             [str(students[0].id), students[0].email, 'good', '0.5', '0.5']]
+        )
+        self.assertEqual(
+            list(self.report_store.iter_rows(self.course_id, '.report_err.part00001.csv')),
+            [[str(students[1].id), 'bad', 'grading failed']]
+        )
+
+    def test_failed_shard_reports_its_students(self):
+        students = [UserFactory.create(username='good'), UserFactory.create(username='bad')]
+        student_ids = [student.id for student in students] + [-1]
+        with patch('instructor_task.tasks_helper.iterate_grades_for', side_effect=Exception('grading is down')):
+            with patch('instructor_task.tasks_helper.check_subtask_is_valid'):
+                with patch('instructor_task.tasks_helper.update_subtask_status', return_value=2) as mock_update:
+                    with self.assertRaises(Exception):
+                        grade_report_shard(
+                            self.entry.id, 'report', 0, student_ids, self.merge_subtask_id, {'task_id': 'shard0'},
+                        )
+        status = mock_update.call_args[0][2]
+        self.assertEqual((status.failed, status.state), (3, FAILURE))
+        # every student is in the error report and the empty grade report marks the shard as done
+        self.assertEqual(
+            list(self.report_store.iter_rows(self.course_id, '.report_err.part00000.csv')),
+            [[str(students[0].id), 'good', 'grade report shard failed'],
+             [str(students[1].id), 'bad', 'grade report shard failed'],
+             ['-1', '', 'grade report shard failed']]
+        )
+        self.assertTrue(self.report_store.exists(self.course_id, '.report.part00000.csv'))
+        self.assertEqual(list(self.report_store.iter_rows(self.course_id, '.report.part00000.csv')), [])
+
+    def test_merge_fails_if_partial_missing(self):
+        header = ['id', 'email', 'username', 'grade', 'HW 01']
+        self.report_store.store_rows(
+            self.course_id, '.report.part00000.csv', [header, ['1', 'a@b.c', 'a', '0.5', '0.5']]
+        )
+        with patch('instructor_task.tasks_helper.check_subtask_is_valid'):
+            with patch('instructor_task.tasks_helper.update_subtask_status'):
+                with self.assertRaises(ValueError):
+                    merge_grade_report_shards(self.entry.id, 'report', {'task_id': self.merge_subtask_id})
+        self.assertEqual(InstructorTask.objects.get(pk=self.entry.id).task_state, FAILURE)
+        self.assertEqual(self.report_store.links_for(self.course_id), [])
+
+    def test_merge(self):
+        header = ['id', 'email', 'username', 'grade', 'HW 01']
+        self.report_store.store_rows(
+            self.course_id, '.report.part00000.csv', [header, ['1', 'a@b.c', 'a', '0.5', '0.5']]
+        )
+        self.report_store.store_rows(
+            self.course_id, '.report.part00001.csv', [header, ['2', 'b@b.c', 'b', '1.0', '1.0']]
+        )
+        self.report_store.store_rows(self.course_id, '.report_err.part00001.csv', [['3', 'c', 'failed']])
+        with patch('instructor_task.tasks_helper.check_subtask_is_valid'):
+            with patch('instructor_task.tasks_helper.update_subtask_status'):
+                status = merge_grade_report_shards(self.entry.id, 'report', {'task_id': self.merge_subtask_id})
+        self.assertEqual(status['state'], SUCCESS)
+        self.assertEqual(
+            list(self.report_store.iter_rows(self.course_id, 'report.csv')),
+            [header, ['1', 'a@b.c', 'a', '0.5', '0.5'], ['2', 'b@b.c', 'b', '1.0', '1.0']]
+        )
+        self.assertEqual(
+            list(self.report_store.iter_rows(self.course_id, 'report_err.csv')),
+            [['id', 'username', 'error_msg'], ['3', 'c', 'failed']]
+        )
+        # only the complete reports remain
+        self.assertEqual([filename for filename, __ in self.report_store.links_for(self.course_id)],
+                         ['report_err.csv', 'report.csv'])
@@ -220,6 +220,10 @@ FEATURES = {
     # only edX superusers can perform the downloads)
     'ALLOW_COURSE_STAFF_GRADE_DOWNLOADS': False,
 
+    # Persist students' section scores and reuse them when grading until a score
+    # event in the section or a change to the course makes them stale
+    'ENABLE_PERSISTENT_GRADES': False,
+
     'ENABLED_PAYMENT_REPORTS': ["refund_report", "itemized_purchase_report", "university_revenue_share", "certificate_status"],
 
     # Turn off account locking if failed login attempts exceeds a limit
@@ -477,6 +481,11 @@ XBLOCK_SELECT_FUNCTION = prefer_xmodules
 
 MODULESTORE_BRANCH = 'published-only'
 CONTENTSTORE = None
+
+# A local on-disk cache of static assets too large for memcached, e.g.
+# {'DIRECTORY': '/tmp/static_content_cache', 'MAX_SIZE': 1024 * 1024 * 1024} (bytes).
+# None disables it; large assets then get streamed from the contentstore each time.
+STATIC_CONTENT_DISK_CACHE = None
 DOC_STORE_CONFIG = {
     'host': 'localhost',
     'db': 'xmodule',
@@ -497,6 +506,8 @@ MODULESTORE = {
                         'default_class': 'xmodule.hidden_module.HiddenDescriptor',
                         'fs_root': DATA_DIR,
                         'render_template': 'edxmako.shortcuts.render_to_string',
+                        # during requests, load whole courses in one query shared via the request cache
+                        'prefetch_whole_course': True,
                     }
                 },
                 {
@@ -1363,6 +1374,10 @@ GRADES_DOWNLOAD = {
     'ROOT_PATH': '/tmp/edx-s3/grades',
 }
 
+# Courses with more enrolled students than this get graded in parallel by subtasks
+# of at most this many students each (None to always grade in a single task)
+GRADES_DOWNLOAD_STUDENTS_PER_TASK = 1000
+
 ######################## PROGRESS SUCCESS BUTTON ##############################
 # The following fields are available in the URL: {course_id} {student_id}
 PROGRESS_SUCCESS_BUTTON_URL = 'http://<domain>/<path>/{course_id}'